@@ -0,0 +1,463 @@
+"""
+Replay benchmark of response decoding on recorded API payloads.
+
+Replays the responses recorded in the functional tests' VCR cassettes
+(tests/functional/clients/cassettes, written when the functional tests run
+with a DIFFBOT_TOKEN) from a local HTTP server, scaled up and concurrent,
+through DiffbotSearchClient and DiffbotEnhanceClient. Two phases are timed:
+
+- end-to-end: every recorded search and enhance call, `--repeat` times, with
+  `--concurrency` calls in flight, through the full session stack
+  (scheduler, limiter, aiohttp) against the local server;
+- decode: BaseDiffbotResponse.create and the response model wrapping of
+  every recorded response, without any I/O.
+
+Each run is appended to a JSON-lines results file together with the git
+commit, and compared with the latest run of another commit on the same
+workload, so changes to the response models can be judged on real payload
+shapes:
+
+    uv run python benchmarks/replay.py --repeat 200 --concurrency 32
+
+Requires PyYAML, which comes with the dev dependencies (pytest-vcr).
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import platform
+import random
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, cast
+
+import aiolimiter
+import yaml
+from aiohttp import web
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.scheduler import RequestScheduler
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.clients.session import DiffbotSession
+from diffbot_kg.clients.transport import AiohttpTransport, TransportResponse
+from diffbot_kg.models.response import (
+    DiffbotBulkJobCreateResponse,
+    DiffbotBulkJobStatusResponse,
+    DiffbotEntitiesResponse,
+    DiffbotListBulkJobsResponse,
+)
+from diffbot_kg.models.response.base import BaseDiffbotResponse
+from yarl import URL
+
+ROOT = Path(__file__).resolve().parent.parent
+CASSETTES = ROOT / "tests" / "functional" / "clients" / "cassettes"
+RESULTS = ROOT / "benchmarks" / "results" / "replay.jsonl"
+
+# Headers describing the recorded transfer rather than the payload; the
+# local server sets its own.
+_TRANSFER_HEADERS = {
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+    "connection",
+    "date",
+    "server",
+}
+
+
+@dataclass
+class Recording:
+    """One recorded request and its response."""
+
+    method: str
+    url: URL
+    params: dict[str, Any]
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    source: str = ""
+
+    @property
+    def kind(self) -> str | None:
+        """The client call that replays this recording, if any."""
+
+        path = self.url.path.rstrip("/")
+        if path.endswith("/dql"):
+            return "search"
+        if path.endswith("/enhance"):
+            return "enhance"
+        return None
+
+    @property
+    def model(self) -> type[BaseDiffbotResponse] | None:
+        """The response model the clients wrap this response in."""
+
+        path = self.url.path.rstrip("/")
+        if path.endswith(("/dql", "/enhance")):
+            return DiffbotEntitiesResponse
+        if path.endswith("/enhance/bulk"):
+            return DiffbotBulkJobCreateResponse
+        if path.endswith("/enhance/bulk/status"):
+            return DiffbotListBulkJobsResponse
+        if path.endswith("/status"):
+            return DiffbotBulkJobStatusResponse
+        return None
+
+    @property
+    def content_type(self) -> str:
+        value = self.headers.get("content-type", "application/octet-stream")
+        return value.split(";")[0].strip()
+
+
+def load_cassettes(directory: Path) -> list[Recording]:
+    """
+    Load the recorded interactions of every cassette in a directory.
+
+    Args:
+        directory (Path): The cassette directory.
+
+    Returns:
+        list[Recording]: The successful (2xx) interactions, in file order.
+    """
+
+    recordings = []
+    for path in sorted(directory.glob("**/*.yaml")):
+        cassette = yaml.safe_load(path.read_text()) or {}
+        for interaction in cassette.get("interactions", []):
+            recording = _recording(interaction, path.name)
+            if 200 <= recording.status < 300:
+                recordings.append(recording)
+    return recordings
+
+
+def _recording(interaction: dict, source: str) -> Recording:
+    request, response = interaction["request"], interaction["response"]
+
+    headers = {
+        name.lower(): values[0] if isinstance(values, list) else values
+        for name, values in (response.get("headers") or {}).items()
+    }
+    body = (response.get("body") or {}).get("string") or b""
+    if isinstance(body, str):
+        body = body.encode()
+    elif headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+    headers = {k: v for k, v in headers.items() if k not in _TRANSFER_HEADERS}
+
+    url = URL(request["uri"])
+    params: dict[str, Any] = {k: v for k, v in url.query.items() if k != "token"}
+    request_body = request.get("body")
+    if isinstance(request_body, bytes | str) and request_body:
+        try:
+            sent = json.loads(request_body)
+        except ValueError:
+            sent = None
+        if isinstance(sent, dict):
+            params.update(sent)
+
+    return Recording(
+        method=request["method"].upper(),
+        url=url.with_query(None),
+        params=params,
+        status=response["status"]["code"],
+        headers=headers,
+        body=body,
+        source=source,
+    )
+
+
+class ReplayServer:
+    """A local HTTP server answering requests with recorded responses."""
+
+    def __init__(self, recordings: list[Recording]) -> None:
+        self._by_path: dict[tuple[str, str], list[Recording]] = {}
+        self._next: dict[tuple[str, str], int] = {}
+        for recording in recordings:
+            key = (recording.method, recording.url.path.rstrip("/"))
+            self._by_path.setdefault(key, []).append(recording)
+
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        key = (request.method, request.path.rstrip("/"))
+        candidates = self._by_path.get(key)
+        if not candidates:
+            return web.Response(status=404)
+
+        # Prefer the recording of the same query; cycle through the rest.
+        query = {k: v for k, v in request.query.items() if k != "token"}
+        for recording in candidates:
+            if {k: str(v) for k, v in recording.params.items()} == query:
+                break
+        else:
+            i = self._next.get(key, 0)
+            self._next[key] = i + 1
+            recording = candidates[i % len(candidates)]
+
+        return web.Response(
+            status=recording.status, headers=recording.headers, body=recording.body
+        )
+
+
+class _LocalTransport(AiohttpTransport):
+    """An AiohttpTransport that sends every request to the replay server."""
+
+    def __init__(self, port: int) -> None:
+        super().__init__()
+        self.port = port
+
+    def request(self, method: str, url: str | URL, **kwargs: Any) -> Awaitable[Any]:
+        url = URL(url).with_scheme("http").with_host("127.0.0.1").with_port(self.port)
+        return super().request(method, url, **kwargs)
+
+
+@dataclass
+class PhaseResult:
+    """Timings of one benchmark phase."""
+
+    calls: int = 0
+    bytes: int = 0
+    entities: int = 0
+    seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, float]:
+        latencies = sorted(self.latencies) or [0.0]
+        return {
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "entities": self.entities,
+            "seconds": round(self.seconds, 6),
+            "calls_per_s": round(self.calls / self.seconds, 1) if self.seconds else 0,
+            "mb_per_s": round(self.bytes / self.seconds / 1e6, 2)
+            if self.seconds
+            else 0,
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 3),
+        }
+
+
+async def run_end_to_end(
+    recordings: list[Recording], repeat: int, concurrency: int, seed: int
+) -> PhaseResult:
+    """Replay the search and enhance calls through the clients."""
+
+    workload = [r for r in recordings if r.kind is not None] * repeat
+    # A seeded shuffle, so runs replay the same order; not security sensitive.
+    random.Random(seed).shuffle(workload)  # nosec B311
+    result = PhaseResult()
+    if not workload:
+        return result
+
+    server = ReplayServer(recordings)
+    await server.start()
+    session = DiffbotSession(
+        transport=_LocalTransport(server.port),
+        limiter=aiolimiter.AsyncLimiter(max_rate=1e9, time_period=1),
+        scheduler=RequestScheduler(max_in_flight=concurrency),
+    )
+    search = DiffbotSearchClient("replay", session=session)
+    enhance = DiffbotEnhanceClient("replay", session=session)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(recording: Recording) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            if recording.kind == "search":
+                resp = await search.search(dict(recording.params))
+            else:
+                resp = await enhance.enhance(dict(recording.params))
+            result.entities += len(cast(DiffbotEntitiesResponse, resp).entities)
+            result.latencies.append(time.perf_counter() - start)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(call(r) for r in workload))
+        result.seconds = time.perf_counter() - start
+    finally:
+        await session.close()
+        await server.stop()
+
+    result.calls = len(workload)
+    result.bytes = sum(len(r.body) for r in workload)
+    return result
+
+
+async def run_decode(recordings: list[Recording], repeat: int) -> PhaseResult:
+    """Decode and wrap every recorded response, without I/O."""
+
+    result = PhaseResult()
+    for recording in recordings * repeat:
+        resp = TransportResponse.from_bytes(
+            recording.body,
+            recording.status,
+            recording.content_type,
+            headers=recording.headers,
+        )
+
+        start = time.perf_counter()
+        decoded = await BaseDiffbotResponse.create(resp)  # type: ignore[arg-type]
+        if (model := recording.model) is not None:
+            decoded.__class__ = model
+            if model is DiffbotEntitiesResponse:
+                entities = cast(DiffbotEntitiesResponse, decoded).entities
+                result.entities += len(entities)
+        elapsed = time.perf_counter() - start
+
+        result.latencies.append(elapsed)
+        result.seconds += elapsed
+        result.calls += 1
+        result.bytes += len(recording.body)
+    return result
+
+
+def workload_digest(recordings: list[Recording]) -> str:
+    """A short hash identifying the recorded payloads."""
+
+    digest = hashlib.sha256()
+    for recording in recordings:
+        digest.update(f"{recording.method} {recording.url}\n".encode())
+        digest.update(recording.body)
+    return digest.hexdigest()[:12]
+
+
+def git_commit() -> dict[str, Any]:
+    def git(*args: str) -> str:
+        # Only runs git, from PATH, to record the benchmarked commit.
+        return subprocess.run(  # nosec B603 B607
+            ["git", *args],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    try:
+        return {
+            "commit": git("rev-parse", "--short", "HEAD"),
+            "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        }
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "subject": None, "dirty": None}
+
+
+def previous_run(path: Path, record: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    The latest run to compare with: of another commit, or of the clean tree
+    if this run has uncommitted changes, on the same workload.
+    """
+
+    if not path.exists():
+        return None
+
+    previous = None
+    for line in path.read_text().splitlines():
+        run = json.loads(line)
+        if run.get("workload") == record["workload"] and (
+            run.get("commit") != record["commit"]
+            or (record["dirty"] and not run.get("dirty"))
+        ):
+            previous = run
+    return previous
+
+
+def report(record: dict[str, Any], previous: dict[str, Any] | None) -> str:
+    dirty = " (dirty)" if record["dirty"] else ""
+    header = (
+        f"{record['commit'] or 'unknown commit'}{dirty}: {record['recordings']}"
+        f" recordings, workload {record['workload']}"
+    )
+    lines = [header]
+    for phase in ("end_to_end", "decode"):
+        stats = record[phase]
+        line = (
+            f"  {phase:<10} {stats['calls']:>8} calls {stats['seconds']:>9.3f}s"
+            f" {stats['calls_per_s']:>10} calls/s {stats['mb_per_s']:>8} MB/s"
+            f"  p50 {stats['p50_ms']}ms  p99 {stats['p99_ms']}ms"
+        )
+        if previous is not None and previous[phase]["calls_per_s"]:
+            change = stats["calls_per_s"] / previous[phase]["calls_per_s"] - 1
+            line += f"  {change:+.1%} vs {previous['commit']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--cassettes", type=Path, default=CASSETTES)
+    parser.add_argument("--results", type=Path, default=RESULTS)
+    parser.add_argument(
+        "--repeat", type=int, default=100, help="Replays of each recorded call."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="End-to-end calls in flight."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Workload shuffle seed.")
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not append to the results file."
+    )
+    return parser
+
+
+async def run(args: argparse.Namespace) -> int:
+    recordings = load_cassettes(args.cassettes)
+    if not recordings:
+        print(
+            f"No recorded interactions in {args.cassettes}; run the functional"
+            " tests with a DIFFBOT_TOKEN to record them.",
+            file=sys.stderr,
+        )
+        return 1
+
+    end_to_end = await run_end_to_end(
+        recordings, args.repeat, args.concurrency, args.seed
+    )
+    decode = await run_decode(recordings, args.repeat)
+
+    record = {
+        **git_commit(),
+        "at": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "workload": workload_digest(recordings),
+        "recordings": len(recordings),
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+        "end_to_end": end_to_end.summary(),
+        "decode": decode.summary(),
+    }
+    print(report(record, previous_run(args.results, record)))
+
+    if not args.no_save:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with args.results.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    return asyncio.run(run(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Callable, Iterator, Self
+
+_MISSING = 2**64 - 1
+_INDEX_MAGIC = b"DBKIDX1\0"
+
+InputKey = str | Callable[[dict], Any]
+
+# Bulk job statuses that will never turn into COMPLETE.
+FAILED_BULKJOB_STATES = frozenset({"FAILED", "STOPPED", "CANCELLED", "ERROR"})
+
+
+def input_key(result: dict, key: InputKey) -> Any:
+    """
+    Return the key of the input a bulk job result was made for.
+
+    Args:
+        result (dict): The result, as one line of the bulk job results.
+        key (str | Callable[[dict], Any]): The name of an input param (read
+            from `request_ctx.query`), or a function of the result.
+
+    Returns:
+        Any: The key, or None if the result has none.
+    """
+
+    if callable(key):
+        return key(result)
+    return ((result.get("request_ctx") or {}).get("query") or {}).get(key)
+
+
+def job_index(result: dict, default: int) -> int:
+    """
+    Return the jobIdx of a bulk job result: the position of its input.
+
+    Args:
+        result (dict): The result, as one line of the bulk job results.
+        default (int): The index to assume if the result has none, usually
+            the line number.
+
+    Returns:
+        int: The jobIdx.
+    """
+
+    query_ctx = (result.get("request_ctx") or {}).get("query_ctx") or {}
+    return int(query_ctx.get("jobIdx", default))
+
+
+class BulkJobIndexWriter:
+    """
+    Builds the offset index of a bulk job results file while it is written.
+
+    Feed every line with the offset it was written at, then call write().
+    """
+
+    def __init__(self, key: InputKey | None = None) -> None:
+        self.key = key
+        self.offsets = array("Q")
+        self.keys: dict[str, int] = {}
+        self._lines = 0
+
+    def add(self, line: bytes, offset: int) -> None:
+        """
+        Index one result line.
+
+        Args:
+            line (bytes): The JSON line, without its newline.
+            offset (int): The byte offset of the line in the file.
+        """
+
+        if not line.strip():
+            return
+
+        result = json.loads(line)
+        job_idx = job_index(result, self._lines)
+        self._lines += 1
+
+        if job_idx >= len(self.offsets):
+            self.offsets.extend([_MISSING] * (job_idx + 1 - len(self.offsets)))
+        self.offsets[job_idx] = offset
+
+        if self.key is not None and (key := input_key(result, self.key)) is not None:
+            self.keys[str(key)] = job_idx
+
+    def write(self, path: str | os.PathLike) -> None:
+        """
+        Write the index files for a results file.
+
+        Args:
+            path (str | PathLike): The results file; the index is written to
+                "<path>.idx" and the key index, if any, to "<path>.keys.json".
+        """
+
+        path = Path(path)
+        with open(BulkJobResultFile.index_path(path), "wb") as f:
+            f.write(_INDEX_MAGIC)
+            self.offsets.tofile(f)
+
+        if self.key is not None:
+            with open(BulkJobResultFile.keys_path(path), "w") as f:
+                json.dump(self.keys, f, separators=(",", ":"))
+
+
+class BulkJobResultFile(Sequence[dict | None]):
+    """
+    A downloaded bulk job results file with random access by jobIdx.
+
+    The raw JSON-lines results are memory-mapped alongside an index of the
+    byte offset of each result (8 bytes per job), so any single result is
+    read and decoded without scanning the file or calling the API. Indexing
+    returns None for jobs that have no result line.
+
+    Use `DiffbotEnhanceClient.download_bulkjob_results` to create one.
+    """
+
+    suffix = ".jsonl"
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """
+        Opens a results file and its index.
+
+        Args:
+            path (str | PathLike): The results file.
+
+        Raises:
+            FileNotFoundError: If the file or its index does not exist.
+            ValueError: If the index is not a bulk job results index.
+        """
+
+        self.path = Path(path)
+
+        raw = self.index_path(self.path).read_bytes()
+        if not raw.startswith(_INDEX_MAGIC):
+            raise ValueError(f"{self.index_path(self.path)} is not a results index")
+        self._offsets = array("Q")
+        self._offsets.frombytes(raw[len(_INDEX_MAGIC) :])
+
+        self._file = open(self.path, "rb")  # noqa: SIM115
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        self._keys: dict[str, int] | None = None
+
+    @classmethod
+    def open(cls, directory: str | os.PathLike, bulkjobId: str) -> Self:
+        """
+        Open the results of a bulk job downloaded into a directory.
+
+        Args:
+            directory (str | PathLike): The download directory.
+            bulkjobId (str): The ID of the bulk job.
+
+        Returns:
+            BulkJobResultFile: The results.
+        """
+
+        return cls(cls.path_for(directory, bulkjobId))
+
+    @classmethod
+    def path_for(cls, directory: str | os.PathLike, bulkjobId: str) -> Path:
+        """Return the results file of a bulk job within a download directory."""
+
+        return Path(directory) / f"{bulkjobId}{cls.suffix}"
+
+    @staticmethod
+    def index_path(path: Path) -> Path:
+        return path.with_name(path.name + ".idx")
+
+    @staticmethod
+    def keys_path(path: Path) -> Path:
+        return path.with_name(path.name + ".keys.json")
+
+    @property
+    def bulkjobId(self) -> str:
+        return self.path.name.removesuffix(self.suffix)
+
+    def __getitem__(self, jobIdx):  # type: ignore[override]
+        if isinstance(jobIdx, slice):
+            return [self[i] for i in range(*jobIdx.indices(len(self)))]
+
+        offset = self._offsets[jobIdx]
+        if offset == _MISSING or self._map is None:
+            return None
+
+        end = self._map.find(b"\n", offset)
+        return json.loads(self._map[offset : None if end == -1 else end])
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __iter__(self) -> Iterator[dict | None]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def by_key(self, key: Any) -> dict | None:
+        """
+        Return the result for an input key.
+
+        Args:
+            key (Any): The key, as indexed with the `key` given at download.
+
+        Returns:
+            dict | None: The result, or None if no input had that key.
+
+        Raises:
+            FileNotFoundError: If the results were downloaded without a key.
+        """
+
+        if self._keys is None:
+            self._keys = json.loads(self.keys_path(self.path).read_text())
+
+        job_idx = self._keys.get(str(key))
+        return None if job_idx is None else self[job_idx]
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,419 @@
+r"""
+Command-line tools for bulk exports and enhancement.
+
+    diffbot-kg search-export 'type:Organization location.country.name:"Germany"' \
+        -o orgs.jsonl.gz --concurrency 4 --checkpoint orgs.ckpt
+    diffbot-kg enhance-file companies.csv -o enhanced.jsonl --mode bulk
+
+The token is read from --token or the DIFFBOT_TOKEN environment variable.
+Interrupted runs resume where they stopped when rerun with the same
+--checkpoint file.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.scheduler import RequestScheduler
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.clients.session import DiffbotSession
+from diffbot_kg.export import FileSink, JsonLinesSink, ParquetSink
+from diffbot_kg.tracing import Tracer
+
+log = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """A small JSON state file, replaced atomically on every save."""
+
+    def __init__(self, path: str | os.PathLike | None, **identity: Any) -> None:
+        """
+        Loads a checkpoint, or starts an empty one.
+
+        Args:
+            path (str | PathLike | None): The file; None disables checkpoints.
+            **identity: Values that must match to resume (e.g. the query).
+
+        Raises:
+            SystemExit: If the file belongs to a different run.
+        """
+
+        self.path = Path(path) if path else None
+        self.state: dict[str, Any] = {"identity": identity}
+
+        if self.path is not None and self.path.exists():
+            saved = json.loads(self.path.read_text())
+            if saved.get("identity") != identity:
+                raise SystemExit(f"{self.path} is a checkpoint of a different run")
+            self.state = saved
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.state.get(key, default)
+
+    def save(self, **values: Any) -> None:
+        self.state.update(values)
+        if self.path is None:
+            return
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    """Prints a single updating progress line to stderr."""
+
+    def __init__(self, label: str, total: int | None = None, quiet: bool = False):
+        self.label = label
+        self.total = total
+        self.quiet = quiet
+        self.done = 0
+        self._started = time.monotonic()
+
+    def update(self, n: int) -> None:
+        self.done += n
+        if self.quiet:
+            return
+
+        rate = self.done / max(time.monotonic() - self._started, 1e-9)
+        total = f"/{self.total}" if self.total is not None else ""
+        sys.stderr.write(f"\r{self.label}: {self.done}{total} ({rate:.1f}/s)")
+        sys.stderr.flush()
+
+    def finish(self) -> None:
+        if not self.quiet:
+            sys.stderr.write("\n")
+
+
+def _session(args: argparse.Namespace) -> DiffbotSession:
+    return DiffbotSession(
+        scheduler=RequestScheduler(max_in_flight=args.concurrency),
+        tracer=Tracer() if args.trace else None,
+    )
+
+
+async def _close(session: DiffbotSession, args: argparse.Namespace) -> None:
+    if session.is_open:
+        await session.close()
+    if session.tracer is not None:
+        session.tracer.dump(args.trace)
+
+
+def _token(args: argparse.Namespace) -> str:
+    token = args.token or os.environ.get("DIFFBOT_TOKEN")
+    if not token:
+        raise SystemExit("A token is required: pass --token or set DIFFBOT_TOKEN")
+    return token
+
+
+def _export_sink(path: Path, first_index: int) -> FileSink:
+    if path.suffix == ".parquet":
+        return ParquetSink(path, numbered=True, first_index=first_index)
+    return JsonLinesSink(
+        path, compress=path.suffix == ".gz", numbered=True, first_index=first_index
+    )
+
+
+async def search_export(args: argparse.Namespace) -> None:
+    """
+    Export every entity matching a query, fetching pages concurrently.
+
+    Pages are fetched `--concurrency` at a time and written in order, one
+    numbered file per `--pages-per-file` pages. The checkpoint records the
+    completed files, so a rerun continues with the next page.
+    """
+
+    checkpoint = Checkpoint(
+        args.checkpoint,
+        command="search-export",
+        query=args.query,
+        output=str(args.output),
+        page_size=args.page_size,
+    )
+    files: list[str] = checkpoint.get("files", [])
+    offset: int = checkpoint.get("next_offset", 0)
+    sink = _export_sink(args.output, first_index=len(files))
+
+    session = _session(args)
+    client = DiffbotSearchClient(_token(args), session=session)
+
+    async def page(offset: int) -> tuple[list[dict], int]:
+        resp = await client.search(
+            {"query": args.query, "from": offset, "size": args.page_size}
+        )
+        return resp.entities, resp.content.get("hits", 0)
+
+    try:
+        # The first page of each file also tells how many pages remain.
+        entities, hits = await page(offset)
+        progress = Progress("entities", hits, args.quiet)
+        progress.update(offset)
+
+        while entities:
+            end = min(hits, offset + args.page_size * args.pages_per_file)
+            rest = await asyncio.gather(
+                *(page(o) for o in range(offset + args.page_size, end, args.page_size))
+            )
+            for page_entities in [entities, *(e for e, _ in rest)]:
+                if page_entities:
+                    await asyncio.to_thread(sink.write, page_entities)
+                progress.update(len(page_entities))
+
+            if (path := await asyncio.to_thread(sink.rotate)) is not None:
+                files.append(str(path))
+            offset = end
+            checkpoint.save(files=files, next_offset=offset)
+
+            if offset >= hits:
+                break
+            entities, hits = await page(offset)
+    except BaseException:
+        sink.abort()
+        raise
+    finally:
+        await _close(session, args)
+
+    progress.finish()
+    for path in files:
+        print(path)
+
+
+def _read_inputs(path: Path) -> Iterator[dict]:
+    """Read enhance inputs from a CSV file with a header, or JSON lines."""
+
+    with open(path, newline="") as f:
+        if path.suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if v not in ("", None)}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class _ResultWriter:
+    """Appends JSON lines to the output, truncating to the checkpointed size."""
+
+    def __init__(self, path: Path, size: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "ab")  # noqa: SIM115
+        self._file.truncate(size)
+        self._file.seek(size)
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+
+    def commit(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def enhance_file(args: argparse.Namespace) -> None:
+    """
+    Enhance every input of a CSV or JSON-lines file into a JSON-lines file.
+
+    In `concurrent` mode inputs go through enhance_stream and each output
+    line holds the input, its index and the response data (or the error).
+    In `bulk` mode inputs are submitted as bulk jobs of `--bulk-size` and
+    the bulk job result lines are written as returned. The checkpoint records
+    how many inputs are done and the output size, plus any submitted bulk
+    job, which a rerun waits for instead of resubmitting.
+    """
+
+    checkpoint = Checkpoint(
+        args.checkpoint,
+        command="enhance-file",
+        input=str(args.input),
+        output=str(args.output),
+        mode=args.mode,
+    )
+    done: int = checkpoint.get("done", 0)
+    writer = _ResultWriter(args.output, checkpoint.get("bytes", 0))
+
+    session = _session(args)
+    client = DiffbotEnhanceClient(_token(args), session=session)
+    progress = Progress("inputs", quiet=args.quiet)
+    progress.update(done)
+
+    inputs = _read_inputs(args.input)
+    for _ in range(done):
+        next(inputs, None)
+
+    try:
+        if args.mode == "concurrent":
+            await _enhance_concurrent(
+                args, client, inputs, done, writer, checkpoint, progress
+            )
+        else:
+            await _enhance_bulk(
+                args, client, inputs, done, writer, checkpoint, progress
+            )
+    finally:
+        writer.close()
+        await _close(session, args)
+
+    progress.finish()
+
+
+async def _enhance_concurrent(
+    args: argparse.Namespace,
+    client: DiffbotEnhanceClient,
+    inputs: Iterator[dict],
+    done: int,
+    writer: _ResultWriter,
+    checkpoint: Checkpoint,
+    progress: Progress,
+) -> None:
+    """
+    Enhance the inputs through enhance_stream, writing one line per input.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        client (DiffbotEnhanceClient): The client to enhance with.
+        inputs (Iterator[dict]): The inputs not done yet.
+        done (int): How many inputs a previous run completed.
+        writer (_ResultWriter): The output file.
+        checkpoint (Checkpoint): Saved every `--checkpoint-every` inputs.
+        progress (Progress): Updated once per input.
+    """
+
+    stream = client.enhance_stream(inputs, concurrency=args.concurrency, ordered=True)
+    async for result in stream:
+        record: dict[str, Any] = {"index": done + result.index, "input": result.params}
+        if result.ok:
+            record["data"] = result.response.content.get("data", [])
+        else:
+            record["error"] = repr(result.error)
+        writer.write(record)
+        progress.update(1)
+
+        if (result.index + 1) % args.checkpoint_every == 0:
+            checkpoint.save(done=done + result.index + 1, bytes=writer.commit())
+
+    checkpoint.save(done=progress.done, bytes=writer.commit())
+
+
+async def _enhance_bulk(
+    args: argparse.Namespace,
+    client: DiffbotEnhanceClient,
+    inputs: Iterator[dict],
+    done: int,
+    writer: _ResultWriter,
+    checkpoint: Checkpoint,
+    progress: Progress,
+) -> None:
+    """
+    Enhance the inputs as bulk jobs of `--bulk-size`, one job at a time.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        client (DiffbotEnhanceClient): The client to submit jobs with.
+        inputs (Iterator[dict]): The inputs not done yet, including those of
+            a checkpointed job, which are skipped rather than resubmitted.
+        done (int): How many inputs a previous run completed.
+        writer (_ResultWriter): The output file.
+        checkpoint (Checkpoint): Saved after each job is submitted and written.
+        progress (Progress): Updated once per job.
+    """
+
+    while True:
+        job = checkpoint.get("job")
+        if job is None:
+            chunk = list(itertools.islice(inputs, args.bulk_size))
+            if not chunk:
+                return
+
+            created = await client.create_bulkjob(chunk)
+            job = {"id": created.jobId, "count": len(chunk)}
+            checkpoint.save(job=job)
+        else:
+            # Resuming: the job's inputs were already submitted.
+            for _ in range(job["count"]):
+                next(inputs, None)
+
+        status = await client.wait_for_bulkjob(job["id"], interval=args.poll_interval)
+        if not status.complete:
+            raise SystemExit(f"Bulk job {job['id']} ended unsuccessfully")
+
+        async for result in client.stream_bulkjob_results(job["id"]):
+            writer.write(result)
+
+        done += job["count"]
+        progress.update(job["count"])
+        checkpoint.save(done=done, bytes=writer.commit(), job=None)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="diffbot-kg", description="Bulk tools for the Diffbot Knowledge Graph."
+    )
+    parser.add_argument("--token", help="API token (default: $DIFFBOT_TOKEN)")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument("--checkpoint", type=Path, help="checkpoint file for resuming")
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace of the run")
+    parser.add_argument("-q", "--quiet", action="store_true", help="hide progress")
+    parser.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser(
+        "search-export", help="export a DQL query to JSON lines or Parquet"
+    )
+    export.add_argument("query", help="the DQL query")
+    export.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        required=True,
+        help="output file name (.jsonl, .jsonl.gz or .parquet); files are numbered",
+    )
+    export.add_argument("--page-size", type=int, default=50)
+    export.add_argument(
+        "--pages-per-file", type=int, default=20, help="pages per output file"
+    )
+    export.set_defaults(run=search_export)
+
+    enhance = commands.add_parser(
+        "enhance-file", help="enhance the inputs of a CSV or JSON-lines file"
+    )
+    enhance.add_argument("input", type=Path, help="CSV with a header, or JSON lines")
+    enhance.add_argument("-o", "--output", type=Path, required=True)
+    enhance.add_argument("--mode", choices=("concurrent", "bulk"), default="concurrent")
+    enhance.add_argument(
+        "--bulk-size", type=int, default=500, help="inputs per bulk job"
+    )
+    enhance.add_argument(
+        "--poll-interval", type=float, default=10, help="bulk job poll seconds"
+    )
+    enhance.add_argument(
+        "--checkpoint-every", type=int, default=100, help="inputs per checkpoint"
+    )
+    enhance.set_defaults(run=enhance_file)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    try:
+        asyncio.run(args.run(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
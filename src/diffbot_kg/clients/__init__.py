@@ -1,2 +1,6 @@
+from diffbot_kg.clients.coalesce import EnhanceCoalescer  # noqa: F401
 from diffbot_kg.clients.enhance import DiffbotEnhanceClient  # noqa: F401
+from diffbot_kg.clients.limiter import FileRateLimiter, RemoteRateLimiter  # noqa: F401
+from diffbot_kg.clients.scheduler import Priority, request_priority  # noqa: F401
 from diffbot_kg.clients.search import DiffbotSearchClient  # noqa: F401
+from diffbot_kg.clients.transport import HttpxTransport, MemoryTransport  # noqa: F401
@@ -1,8 +1,18 @@
-from typing import Any
+import contextlib
+from http import HTTPMethod
+from typing import Any, AsyncIterator
 
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
 from yarl import URL
 
+from diffbot_kg.clients.scheduler import Priority, request_priority
 from diffbot_kg.clients.session import BaseDiffbotResponse, DiffbotSession
+from diffbot_kg.store import EntityStore
+from diffbot_kg.tracing import span
+
+# Marks responses answered from the local store instead of the API.
+LOCAL_HEADER = "X-Diffbot-Local"
 
 
 class BaseDiffbotKGClient:
@@ -11,14 +21,32 @@ class BaseDiffbotKGClient:
     """
 
     url = URL("https://kg.diffbot.com/kg/v3/")
+    max_get_url_length = 3000
 
-    def __init__(self, token, **default_params) -> None:
+    def __init__(
+        self,
+        token,
+        *,
+        session: DiffbotSession | None = None,
+        priority: Priority | str | None = None,
+        store: EntityStore | None = None,
+        **default_params,
+    ) -> None:
         """
         Initializes a new instance of the BaseDiffbotKGClient class (only
         callable by subclasses).
 
         Args:
             token (str): The API token for authentication.
+            session (DiffbotSession, optional): A session to share with other
+                clients, so that all of them are scheduled and rate limited
+                together. Defaults to a new session.
+            priority (Priority | str, optional): The priority class of this
+                client's requests. Defaults to the priority of the calling
+                context (interactive unless set with request_priority()).
+            store (EntityStore, optional): A local store that retrieved
+                entities are written into, and that answers lookups in
+                read-through mode. Defaults to None.
             **default_params: Default parameters for API requests.
 
         Raises:
@@ -26,7 +54,9 @@ class BaseDiffbotKGClient:
         """
 
         self.default_params = {"token": token, **default_params}
-        self.s = DiffbotSession()
+        self.s = session or DiffbotSession()
+        self.priority = Priority(priority) if priority else None
+        self.store = store
 
     def _merge_params(self, params) -> dict[str, Any]:
         """
@@ -47,7 +77,7 @@ class BaseDiffbotKGClient:
         return params
 
     async def _get(
-        self, url: str | URL, params=None, headers=None
+        self, url: str | URL, params=None, headers=None, raw: bool = False
     ) -> BaseDiffbotResponse:
         """
         Sends a GET request to the Diffbot API.
@@ -56,6 +86,8 @@ class BaseDiffbotKGClient:
             url (str | URL): The URL to send the request to.
             params (dict, optional): The query parameters for the request. Defaults to None.
             headers (dict, optional): The headers for the request. Defaults to None.
+            raw (bool, optional): Return the body undecoded, as a
+                RawDiffbotResponse. Defaults to False.
 
         Returns:
             BaseDiffbotResponse: The response from the API.
@@ -65,8 +97,11 @@ class BaseDiffbotKGClient:
 
         params = self._merge_params(params)
 
-        # sourcery skip: inline-immediately-returned-variable
-        resp = await self.s.get(url, params=params, headers=headers)
+        with request_priority(self.priority):
+            # sourcery skip: inline-immediately-returned-variable
+            resp = await self.s.get(
+                url, params=params, headers=headers, **self._raw_kwargs(raw)
+            )
         return resp
 
     async def _post(
@@ -75,6 +110,7 @@ class BaseDiffbotKGClient:
         params: dict | None = None,
         json: dict | list[dict] | None = None,
         headers=None,
+        raw: bool = False,
     ) -> BaseDiffbotResponse:
         """
         Sends a POST request to the Diffbot API.
@@ -83,6 +119,8 @@ class BaseDiffbotKGClient:
             url (str | URL): The URL to send the request to.
             params (dict, optional): The query parameters for the request. Defaults to None.
             data (dict, optional): The data for the request body. Defaults to None.
+            raw (bool, optional): Return the body undecoded, as a
+                RawDiffbotResponse. Defaults to False.
 
         Returns:
             BaseDiffbotResponse: The response from the API.
@@ -95,12 +133,15 @@ class BaseDiffbotKGClient:
             **(headers or {}),
         }
 
-        # sourcery skip: inline-immediately-returned-variable
-        resp = await self.s.post(url, params=params, headers=headers, json=json)
+        with request_priority(self.priority):
+            # sourcery skip: inline-immediately-returned-variable
+            resp = await self.s.post(
+                url, params=params, headers=headers, json=json, **self._raw_kwargs(raw)
+            )
         return resp
 
     async def _get_or_post(
-        self, url: str | URL, params: dict | None = None
+        self, url: str | URL, params: dict | None = None, raw: bool = False
     ) -> BaseDiffbotResponse:
         """
         Sends a GET or POST request to the Diffbot API, depending on the length of the URL.
@@ -108,6 +149,8 @@ class BaseDiffbotKGClient:
         Args:
             url (str | URL): The URL to send the request to.
             params (dict, optional): The query parameters for the request. Defaults to None.
+            raw (bool, optional): Return the body undecoded, as a
+                RawDiffbotResponse. Defaults to False.
 
         Returns:
             BaseDiffbotResponse: The response from the API.
@@ -115,15 +158,104 @@ class BaseDiffbotKGClient:
 
         params = self._merge_params(params)
 
-        url_len = len(bytes(str(url % params), encoding="ascii"))
-
         # sourcery skip: remove-unnecessary-else
-        if url_len <= 3000:
-            return await self._get(url, params=params)
+        if self._url_length(url, params) <= self.max_get_url_length:
+            return await self._get(url, params=params, **self._raw_kwargs(raw))
         else:
             token = params.pop("token", None) if params else None
             json, params = params, {"token": token}
-            return await self._post(url, params=params, json=json)
+            return await self._post(
+                url, params=params, json=json, **self._raw_kwargs(raw)
+            )
+
+    def _span(self, name: str, **args: Any) -> contextlib.AbstractContextManager[dict]:
+        """Record an operation as a span if the session has a tracer."""
+
+        return span(self.s.tracer, name, "client", **args)
+
+    @staticmethod
+    def _raw_kwargs(raw: bool) -> dict[str, bool]:
+        # Only pass `raw` down when set, keeping decoded calls unchanged.
+        return {"raw": True} if raw else {}
+
+    @contextlib.asynccontextmanager
+    async def _stream(
+        self, url: str | URL, params=None
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Sends a GET request and yields the response with its body unread.
+
+        Args:
+            url (str | URL): The URL to send the request to.
+            params (dict, optional): The query parameters for the request. Defaults to None.
+
+        Yields:
+            aiohttp.ClientResponse: The response; its body can be read
+                incrementally from `content`.
+        """
+
+        params = self._merge_params(params)
+
+        with request_priority(self.priority):
+            resp = await self.s.open_stream(HTTPMethod.GET, url, params=params)
+
+        try:
+            yield resp
+        finally:
+            resp.release()
+
+    def _store_entities(self, resp: BaseDiffbotResponse) -> None:
+        """
+        Writes the entities of a response into the local store, if any.
+
+        Args:
+            resp (BaseDiffbotResponse): A response with a `data` list of
+                `{"entity": ...}` items, or a JSON-lines response of such
+                results (bulk job results).
+        """
+
+        if self.store is None or isinstance(resp.content, str):
+            return
+
+        results = [resp.content] if isinstance(resp.content, dict) else resp.content
+        self.store.put_many(
+            item["entity"]
+            for result in results
+            for item in result.get("data") or []
+            if "id" in item.get("entity", {})
+        )
+
+    @staticmethod
+    def _local_response(data: list[dict]) -> BaseDiffbotResponse:
+        """
+        Builds a response for data answered from the local store.
+
+        Args:
+            data (list[dict]): The `{"entity": ...}` items.
+
+        Returns:
+            BaseDiffbotResponse: A 200 response marked with the LOCAL_HEADER
+                (`X-Diffbot-Local`) header.
+        """
+
+        headers = CIMultiDictProxy(CIMultiDict({LOCAL_HEADER: "true"}))
+        return BaseDiffbotResponse(200, headers, {"hits": len(data), "data": data})
+
+    def _url_length(self, url: str | URL, params: dict | None = None) -> int:
+        """
+        Computes the length in bytes of a GET request URL.
+
+        Args:
+            url (str | URL): The URL of the request.
+            params (dict, optional): The query parameters (merged with the
+                default parameters). Defaults to None.
+
+        Returns:
+            int: The length of the encoded URL.
+        """
+
+        params = self._merge_params(params)
+        return len(bytes(str(URL(url) % params), encoding="ascii"))
 
     async def close(self):
         await self.s.close()
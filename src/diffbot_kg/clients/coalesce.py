@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING
+
+from diffbot_kg.bulkjob import job_index
+from diffbot_kg.models.response import DiffbotEntitiesResponse
+
+if TYPE_CHECKING:
+    from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+
+log = logging.getLogger(__name__)
+
+_Waiter = tuple[dict, asyncio.Future[DiffbotEntitiesResponse]]
+
+# Enhance params that apply to a whole bulk job (its query params) rather
+# than to one input; every other param is part of the input.
+JOB_PARAMS = frozenset(
+    {
+        "size",
+        "threshold",
+        "refresh",
+        "search",
+        "useCache",
+        "filter",
+        "jsonmode",
+        "nonCanonicalFacts",
+        "nonCanonicalFactsOnly",
+    }
+)
+
+
+def split_job_params(params: dict) -> tuple[dict, dict]:
+    """
+    Split enhance params into a bulk job input and the job-level params.
+
+    Args:
+        params (dict): The params of an enhance() call.
+
+    Returns:
+        tuple[dict, dict]: The input fields, and the params in JOB_PARAMS.
+    """
+
+    job = {k: v for k, v in params.items() if k in JOB_PARAMS}
+    return {k: v for k, v in params.items() if k not in JOB_PARAMS}, job
+
+
+class EnhanceCoalescer:
+    """
+    Coalesces concurrent single-record enhance calls into batches.
+
+    Calls arriving within `window` seconds of each other, up to `max_batch`
+    of them, are collected into one batch. A batch of at least `min_bulk`
+    inputs is submitted as a single bulk job, and each result is routed back
+    to its caller by jobIdx. This takes a handful of requests (create, status
+    polls, results) instead of one rate-limited slot per input, at the cost
+    of bulk job latency. Smaller batches are sent as concurrent enhance calls.
+
+    Job-level params (JOB_PARAMS, e.g. `size` or `threshold`) are sent as the
+    bulk job's query params, so a batch is split by them first: only calls
+    with the same job-level params share a bulk job.
+
+    Enable it with `DiffbotEnhanceClient.coalesce()`; existing `enhance()`
+    call sites then go through the coalescer unchanged.
+    """
+
+    def __init__(
+        self,
+        client: "DiffbotEnhanceClient",
+        window: float = 0.05,
+        max_batch: int = 500,
+        min_bulk: int = 50,
+        poll_interval: float = 5,
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Initializes a new EnhanceCoalescer.
+
+        Args:
+            client (DiffbotEnhanceClient): The client that sends the batches.
+            window (float, optional): Seconds to wait for more calls after the
+                first call of a batch. Defaults to 0.05.
+            max_batch (int, optional): Send a batch as soon as it has this many
+                calls. Defaults to 500.
+            min_bulk (int, optional): The smallest batch submitted as a bulk
+                job; smaller batches are sent as individual calls. Defaults
+                to 50.
+            poll_interval (float, optional): Seconds between bulk job status
+                polls. Defaults to 5.
+            timeout (float, optional): Maximum seconds to wait for a bulk job.
+                Defaults to no limit.
+
+        Raises:
+            ValueError: If max_batch or min_bulk is below one.
+        """
+
+        if max_batch < 1 or min_bulk < 1:
+            raise ValueError("max_batch and min_bulk must be at least 1")
+
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self.min_bulk = min_bulk
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        self._batch: list[_Waiter] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def enhance(self, params: dict) -> DiffbotEntitiesResponse:
+        """
+        Enhance one input as part of the next batch.
+
+        Args:
+            params (dict): The enhance params.
+
+        Returns:
+            DiffbotEntitiesResponse: The response for this input.
+        """
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[DiffbotEntitiesResponse] = loop.create_future()
+        self._batch.append((params, future))
+
+        if len(self._batch) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Send the current batch now, without waiting for the window."""
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        """Send any pending batch and wait for all batches to finish."""
+
+        self.flush()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "EnhanceCoalescer":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def _send(self, batch: list[_Waiter]) -> None:
+        # Callers that gave up while the batch was collected are dropped.
+        batch = [(params, future) for params, future in batch if not future.done()]
+        if not batch:
+            return
+
+        groups: dict[str, list[_Waiter]] = {}
+        for params, future in batch:
+            _, job_params = split_job_params(params)
+            key = json.dumps(job_params, sort_keys=True, default=str)
+            groups.setdefault(key, []).append((params, future))
+
+        await asyncio.gather(*(self._send_group(group) for group in groups.values()))
+
+    async def _send_group(self, batch: list[_Waiter]) -> None:
+        try:
+            if len(batch) >= self.min_bulk:
+                await self._send_bulk(batch)
+            else:
+                await self._send_each(batch)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _send_each(self, batch: list[_Waiter]) -> None:
+        async def one(params: dict, future: asyncio.Future) -> None:
+            try:
+                resp = await self.client.fetch_enhance(params)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(resp)
+
+        await asyncio.gather(*(one(params, future) for params, future in batch))
+
+    async def _send_bulk(self, batch: list[_Waiter]) -> None:
+        client = self.client
+        inputs = [split_job_params(params)[0] for params, _ in batch]
+        _, job_params = split_job_params(batch[0][0])
+        created = await client.create_bulkjob(inputs, params=job_params or None)
+        bulkjobId = created.jobId
+        log.debug("Coalesced %d enhance calls into bulk job %s", len(batch), bulkjobId)
+
+        status = await client.wait_for_bulkjob(
+            bulkjobId, interval=self.poll_interval, timeout=self.timeout
+        )
+        if not status.complete:
+            state = status.content["content"].get("status")
+            raise RuntimeError(f"Bulk job {bulkjobId} ended with status {state}")
+
+        line = 0
+        async for result in client.stream_bulkjob_results(bulkjobId):
+            job_idx = job_index(result, line)
+            line += 1
+            if not 0 <= job_idx < len(batch):
+                continue
+
+            future = batch[job_idx][1]
+            if not future.done():
+                future.set_result(client.bulkjob_result_response(result, bulkjobId))
+
+        for job_idx, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_exception(
+                    RuntimeError(f"Bulk job {bulkjobId} has no result for {job_idx}")
+                )
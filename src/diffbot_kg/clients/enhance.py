@@ -1,14 +1,40 @@
-from typing import cast
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Literal,
+    cast,
+    overload,
+)
+
+from multidict import CIMultiDict, CIMultiDictProxy
 
+from diffbot_kg.bulkjob import (
+    FAILED_BULKJOB_STATES,
+    BulkJobIndexWriter,
+    BulkJobResultFile,
+    InputKey,
+)
 from diffbot_kg.clients.base import BaseDiffbotKGClient
+from diffbot_kg.clients.coalesce import EnhanceCoalescer
+from diffbot_kg.models.enhance import EnhanceResult
 from diffbot_kg.models.response import (
     DiffbotBulkJobCreateResponse,
     DiffbotBulkJobStatusResponse,
     DiffbotCoverageReportResponse,
     DiffbotEntitiesResponse,
     DiffbotListBulkJobsResponse,
+    RawDiffbotResponse,
 )
+from diffbot_kg.models.response.base import aiter_lines
 from diffbot_kg.models.response.bulkjob_results import DiffbotBulkJobResultsResponse
+from diffbot_kg.models.response.coverage_report import CoverageRow, aiter_coverage_rows
+from diffbot_kg.webhook import WebhookReceiver
 
 
 class DiffbotEnhanceClient(BaseDiffbotKGClient):
@@ -28,30 +54,252 @@ class DiffbotEnhanceClient(BaseDiffbotKGClient):
     bulk_job_coverage_report_url = bulk_job_url / "report/{bulkjobId}/{reportId}"
     bulk_job_stop_url = bulk_job_url / "{bulkjobId}/stop"
 
-    async def enhance(self, params) -> DiffbotEntitiesResponse:
+    coalescer: EnhanceCoalescer | None = None
+    webhook: WebhookReceiver | None = None
+
+    @overload
+    async def enhance(
+        self, params, raw: Literal[False] = False
+    ) -> DiffbotEntitiesResponse: ...
+
+    @overload
+    async def enhance(self, params, raw: Literal[True]) -> RawDiffbotResponse: ...
+
+    async def enhance(
+        self, params, raw: bool = False
+    ) -> DiffbotEntitiesResponse | RawDiffbotResponse:
         """
         Enhance content using the Diffbot Enhance API.
 
+        With coalesce() enabled, the call is batched with concurrent calls.
+
         Args:
             params (dict): The parameters for enhancing the content.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse,
+                bypassing the store. Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
+        if raw:
+            resp = await self._get(self.enhance_url, params=params, raw=True)
+            return cast(RawDiffbotResponse, resp)
+
+        if (
+            self.store is not None
+            and (local := self.store.answer_enhance(params)) is not None
+        ):
+            resp = self._local_response([{"score": 1.0, "entity": local}])
+        elif self.coalescer is not None:
+            return await self.coalescer.enhance(params)
+        else:
+            return await self.fetch_enhance(params)
+
+        resp.__class__ = DiffbotEntitiesResponse
+        return cast(DiffbotEntitiesResponse, resp)
+
+    async def fetch_enhance(self, params) -> DiffbotEntitiesResponse:
+        """
+        Send one enhance call, bypassing the store lookup and any coalescer.
+
+        The entities returned are still written to the store. The coalescer
+        sends its small batches through this.
+
+        Args:
+            params (dict): The parameters for enhancing the content.
+
+        Returns:
+            DiffbotEntitiesResponse: The response from the Diffbot API.
+        """
+
         resp = await self._get(self.enhance_url, params=params)
+        self._store_entities(resp)
+
         resp.__class__ = DiffbotEntitiesResponse
         return cast(DiffbotEntitiesResponse, resp)
 
+    def bulkjob_result_response(
+        self, result: dict, bulkjobId: str
+    ) -> DiffbotEntitiesResponse:
+        """
+        Wrap one bulk job result as the enhance() response for its input.
+
+        The result's entities are written to the store. The coalescer answers
+        the calls of a bulk batch through this.
+
+        Args:
+            result (dict): A bulk job result, as yielded by stream_bulkjob_results().
+            bulkjobId (str): The ID of the bulk job, set as the
+                X-Diffbot-BulkJob header.
+
+        Returns:
+            DiffbotEntitiesResponse: The response enhance() would have returned.
+        """
+
+        data = result.get("data") or []
+        headers = CIMultiDictProxy(CIMultiDict({"X-Diffbot-BulkJob": bulkjobId}))
+        resp = DiffbotEntitiesResponse(200, headers, {"hits": len(data), "data": data})
+        self._store_entities(resp)
+        return resp
+
+    def coalesce(
+        self,
+        window: float = 0.05,
+        max_batch: int = 500,
+        min_bulk: int = 50,
+        poll_interval: float = 5,
+        timeout: float | None = None,
+    ) -> EnhanceCoalescer:
+        """
+        Route enhance() calls through an EnhanceCoalescer.
+
+        Concurrent calls are then collected into batches, and large batches
+        are sent as bulk jobs, without changing any call site. Calls with
+        `raw=True` bypass the coalescer. Close the coalescer (or use it as an
+        async context manager) to send the last batch before shutting down.
+
+        Args:
+            window (float, optional): Seconds to wait for more calls after the
+                first call of a batch. Defaults to 0.05.
+            max_batch (int, optional): Send a batch as soon as it has this many
+                calls. Defaults to 500.
+            min_bulk (int, optional): The smallest batch submitted as a bulk
+                job. Defaults to 50.
+            poll_interval (float, optional): Seconds between bulk job status
+                polls. Defaults to 5.
+            timeout (float, optional): Maximum seconds to wait for a bulk job.
+                Defaults to no limit.
+
+        Returns:
+            EnhanceCoalescer: The coalescer now in use.
+        """
+
+        self.coalescer = EnhanceCoalescer(
+            self, window, max_batch, min_bulk, poll_interval, timeout
+        )
+        return self.coalescer
+
+    async def enhance_stream(
+        self,
+        inputs: Iterable[dict] | AsyncIterable[dict],
+        concurrency: int = 8,
+        ordered: bool = False,
+        reorder_buffer: int | None = None,
+    ) -> AsyncIterator[EnhanceResult]:
+        """
+        Enhance a stream of params, with a bounded number of calls in flight.
+
+        Inputs are read lazily, so the stream may be unbounded (e.g. fed by a
+        message queue): a new input is only read when a call finishes, and
+        none while the consumer has not taken the previous result. Calls go
+        through the session limiter like any other request. A failed call is
+        yielded as a result with `error` set instead of ending the stream.
+
+        Args:
+            inputs (Iterable[dict] | AsyncIterable[dict]): The enhance params.
+            concurrency (int, optional): Maximum calls in flight. Defaults to 8.
+            ordered (bool, optional): Yield results in input order instead of
+                completion order. Defaults to False.
+            reorder_buffer (int, optional): In ordered mode, the maximum number
+                of inputs started but not yet yielded; a slow call stalls new
+                calls once this many are waiting on it. Defaults to four times
+                the concurrency.
+
+        Yields:
+            EnhanceResult: The result of each input.
+
+        Raises:
+            ValueError: If concurrency or reorder_buffer is below one.
+        """
+
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        if reorder_buffer is None:
+            reorder_buffer = concurrency * 4
+        if reorder_buffer < 1:
+            raise ValueError("reorder_buffer must be at least 1")
+
+        source = _aiter(inputs)
+        pending: set[asyncio.Task[EnhanceResult]] = set()
+        finished: dict[int, EnhanceResult] = {}
+        started = 0
+        yielded = 0
+        exhausted = False
+
+        try:
+            while True:
+                while (
+                    not exhausted
+                    and len(pending) < concurrency
+                    and (not ordered or started - yielded < reorder_buffer)
+                ):
+                    try:
+                        params = await anext(source)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+
+                    pending.add(
+                        asyncio.create_task(self._enhance_result(started, params))
+                    )
+                    started += 1
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=lambda t: t.result().index):
+                    result = task.result()
+                    if not ordered:
+                        yielded += 1
+                        yield result
+                    else:
+                        finished[result.index] = result
+
+                while yielded in finished:
+                    yield finished.pop(yielded)
+                    yielded += 1
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await source.aclose()
+
+    async def _enhance_result(self, index: int, params: dict) -> EnhanceResult:
+        try:
+            with self._span("enhance", index=index):
+                return EnhanceResult(index, params, await self.enhance(params))
+        except Exception as e:
+            return EnhanceResult(index, params, error=e)
+
+    @overload
     async def create_bulkjob(
-        self, json: list[dict], params=None
-    ) -> DiffbotBulkJobCreateResponse:
+        self, json: list[dict], params=None, raw: Literal[False] = False
+    ) -> DiffbotBulkJobCreateResponse: ...
+
+    @overload
+    async def create_bulkjob(
+        self, json: list[dict], params=None, *, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def create_bulkjob(
+        self, json: list[dict], params=None, raw: bool = False
+    ) -> DiffbotBulkJobCreateResponse | RawDiffbotResponse:
         """
         Create a bulk job for enhancing multiple content items.
 
+        With a `webhook` receiver attached, its URL is registered as the
+        job's callback.
+
         Args:
             data (list[dict]): The content items to enhance.
             params (dict): The parameters for creating the bulk job.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotBulkJobResponse: The response from the Diffbot API.
@@ -60,63 +308,255 @@ class DiffbotEnhanceClient(BaseDiffbotKGClient):
         if json is None or not json:
             raise ValueError("data must be provided")
 
-        resp = await self._post(self.bulk_job_url, params=params, json=json)
+        if self.webhook is not None:
+            params = {self.webhook.param: str(self.webhook.url), **(params or {})}
+
+        resp = await self._post(self.bulk_job_url, params=params, json=json, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotBulkJobCreateResponse
+        if self.webhook is not None:
+            self.webhook.expect(cast(DiffbotBulkJobCreateResponse, resp).jobId)
         return cast(DiffbotBulkJobCreateResponse, resp)
 
-    async def bulkjob_status(self, bulkjobId: str) -> DiffbotBulkJobStatusResponse:
+    @overload
+    async def bulkjob_status(
+        self, bulkjobId: str, raw: Literal[False] = False
+    ) -> DiffbotBulkJobStatusResponse: ...
+
+    @overload
+    async def bulkjob_status(
+        self, bulkjobId: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def bulkjob_status(
+        self, bulkjobId: str, raw: bool = False
+    ) -> DiffbotBulkJobStatusResponse | RawDiffbotResponse:
         """
         Poll the status of an Enhance Bulkjob by its ID.
 
         Args:
             bulkjobId (str): The ID of the bulk job.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
         url = self.bulk_job_status_url.human_repr().format(bulkjobId=bulkjobId)
-        resp = await self._get(url)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotBulkJobStatusResponse
         return cast(DiffbotBulkJobStatusResponse, resp)
 
-    async def list_bulkjobs(self) -> DiffbotListBulkJobsResponse:
+    async def wait_for_bulkjob(
+        self,
+        bulkjobId: str,
+        interval: float = 10,
+        timeout: float | None = None,
+    ) -> DiffbotBulkJobStatusResponse:
+        """
+        Poll an Enhance Bulkjob until it completes or ends unsuccessfully.
+
+        With a `webhook` receiver attached, the status is checked when a
+        notification arrives, and otherwise only every `fallback_interval`
+        seconds of the receiver instead of every `interval`.
+
+        Args:
+            bulkjobId (str): The ID of the bulk job.
+            interval (float, optional): Seconds between polls. Defaults to 10.
+            timeout (float, optional): Maximum seconds to wait. Defaults to
+                no limit.
+
+        Returns:
+            DiffbotBulkJobStatusResponse: The last status; check `complete`.
+
+        Raises:
+            TimeoutError: If the job is still running after `timeout`.
+        """
+
+        webhook = self.webhook
+        try:
+            async with asyncio.timeout(timeout):
+                with self._span("wait_for_bulkjob", bulkjobId=bulkjobId) as span:
+                    polls = 0
+                    while True:
+                        status = await self.bulkjob_status(bulkjobId)
+                        polls += 1
+                        state = status.content["content"].get("status")
+                        if status.complete or state in FAILED_BULKJOB_STATES:
+                            span.update(polls=polls, status=state)
+                            return status
+
+                        if webhook is not None:
+                            await webhook.notified(
+                                bulkjobId, timeout=webhook.fallback_interval
+                            )
+                        else:
+                            await asyncio.sleep(interval)
+        finally:
+            if webhook is not None:
+                webhook.forget(bulkjobId)
+
+    @overload
+    async def list_bulkjobs(
+        self, raw: Literal[False] = False
+    ) -> DiffbotListBulkJobsResponse: ...
+
+    @overload
+    async def list_bulkjobs(self, raw: Literal[True]) -> RawDiffbotResponse: ...
+
+    async def list_bulkjobs(
+        self, raw: bool = False
+    ) -> DiffbotListBulkJobsResponse | RawDiffbotResponse:
         """
         Poll the status of all Enhance Bulkjobs for a token.
 
+        Args:
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
+
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
-        resp = await self._get(self.list_bulk_jobs_url)
+        resp = await self._get(self.list_bulk_jobs_url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotListBulkJobsResponse
         return cast(DiffbotListBulkJobsResponse, resp)
 
-    async def bulkjob_results(self, bulkjobId: str) -> DiffbotBulkJobResultsResponse:
+    @overload
+    async def bulkjob_results(
+        self, bulkjobId: str, raw: Literal[False] = False
+    ) -> DiffbotBulkJobResultsResponse: ...
+
+    @overload
+    async def bulkjob_results(
+        self, bulkjobId: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def bulkjob_results(
+        self, bulkjobId: str, raw: bool = False
+    ) -> DiffbotBulkJobResultsResponse | RawDiffbotResponse:
         """
         Download the results of a completed Enhance Bulkjob by its ID.
 
         Args:
             bulkjobId (str): The ID of the bulk job.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse,
+                bypassing the store. Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
         url = self.bulk_job_results_url.human_repr().format(bulkjobId=bulkjobId)
-        resp = await self._get(url)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
+        self._store_entities(resp)
         resp.__class__ = DiffbotBulkJobResultsResponse
         return cast(DiffbotBulkJobResultsResponse, resp)
 
+    async def stream_bulkjob_results(self, bulkjobId: str) -> AsyncIterator[dict]:
+        """
+        Stream the results of a completed Enhance Bulkjob one at a time,
+        decoding each JSON line as it downloads.
+
+        Args:
+            bulkjobId (str): The ID of the bulk job.
+
+        Yields:
+            dict: The result of each job, as in DiffbotBulkJobResultsResponse.content.
+        """
+
+        url = self.bulk_job_results_url.human_repr().format(bulkjobId=bulkjobId)
+        async with self._stream(url) as resp:
+            async for line in aiter_lines(resp.content.iter_any()):
+                if line.strip():
+                    yield json.loads(line)
+
+    async def download_bulkjob_results(
+        self,
+        bulkjobId: str,
+        directory: str | os.PathLike,
+        key: InputKey | None = None,
+    ) -> BulkJobResultFile:
+        """
+        Download the results of a completed Enhance Bulkjob to disk with an
+        offset index, for later random access by jobIdx without the network.
+
+        The raw JSON lines are saved as "<directory>/<bulkjobId>.jsonl" next
+        to a ".idx" index; both appear only once the download is complete.
+        Reopen them later with `BulkJobResultFile.open(directory, bulkjobId)`.
+
+        Args:
+            bulkjobId (str): The ID of the bulk job.
+            directory (str | PathLike): Where to save the results.
+            key (str | Callable[[dict], Any], optional): An input param (e.g.
+                "customId") or function of each result to index results by,
+                for BulkJobResultFile.by_key. Defaults to no key index.
+
+        Returns:
+            BulkJobResultFile: The downloaded results.
+        """
+
+        path = BulkJobResultFile.path_for(directory, bulkjobId)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part = path.with_name(path.name + ".part")
+        index = BulkJobIndexWriter(key)
+
+        url = self.bulk_job_results_url.human_repr().format(bulkjobId=bulkjobId)
+        try:
+            with open(part, "wb") as f:
+                async with self._stream(url) as resp:
+                    async for line in aiter_lines(resp.content.iter_any()):
+                        index.add(line, f.tell())
+                        f.write(line + b"\n")
+
+            index.write(part)
+            for sidecar in (BulkJobResultFile.index_path, BulkJobResultFile.keys_path):
+                if sidecar(part).exists():
+                    os.replace(sidecar(part), sidecar(path))
+            os.replace(part, path)
+        finally:
+            for leftover in (
+                part,
+                BulkJobResultFile.index_path(part),
+                BulkJobResultFile.keys_path(part),
+            ):
+                Path(leftover).unlink(missing_ok=True)
+
+        return BulkJobResultFile(path)
+
+    @overload
+    async def bulkjob_coverage_report(
+        self, bulkjobId: str, reportId: str, raw: Literal[False] = False
+    ) -> DiffbotCoverageReportResponse: ...
+
+    @overload
     async def bulkjob_coverage_report(
-        self, bulkjobId: str, reportId: str
-    ) -> DiffbotCoverageReportResponse:
+        self, bulkjobId: str, reportId: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def bulkjob_coverage_report(
+        self, bulkjobId: str, reportId: str, raw: bool = False
+    ) -> DiffbotCoverageReportResponse | RawDiffbotResponse:
         """
         Download the coverage report of a completed Enhance Bulkjob by its ID and report ID.
 
         Args:
             bulkjobId (str): The ID of the bulk job.
             reportId (str): The ID of the report.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
@@ -126,21 +566,60 @@ class DiffbotEnhanceClient(BaseDiffbotKGClient):
             bulkjobId=bulkjobId, reportId=reportId
         )
 
-        resp = await self._get(url)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotCoverageReportResponse
         return cast(DiffbotCoverageReportResponse, resp)
 
+    async def stream_bulkjob_coverage_report(
+        self, bulkjobId: str, reportId: str
+    ) -> AsyncIterator[CoverageRow]:
+        """
+        Stream the rows of a bulk job coverage report, parsing them as the
+        report downloads instead of holding its full text.
+
+        Args:
+            bulkjobId (str): The ID of the bulk job.
+            reportId (str): The ID of the report.
+
+        Yields:
+            CoverageRow: The rows of the report.
+        """
+
+        url = self.bulk_job_coverage_report_url.human_repr().format(
+            bulkjobId=bulkjobId, reportId=reportId
+        )
+
+        async with self._stream(url) as resp:
+            async for row in aiter_coverage_rows(resp.content.iter_any()):
+                yield row
+
+    @overload
+    async def single_bulkjob_result(
+        self, bulkjobId: str, jobIdx: int, raw: Literal[False] = False
+    ) -> DiffbotEntitiesResponse: ...
+
+    @overload
+    async def single_bulkjob_result(
+        self, bulkjobId: str, jobIdx: int, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
     async def single_bulkjob_result(
         self,
         bulkjobId: str,
         jobIdx: int,
-    ) -> DiffbotEntitiesResponse:
+        raw: bool = False,
+    ) -> DiffbotEntitiesResponse | RawDiffbotResponse:
         """
         Download the result of a single job within a bulkjob by specifying the index of the job.
 
         Args:
             bulkjobId (str): The ID of the bulk job.
             jobIdx (int): The index of the job within the bulk job.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotEntitiesResponse: The response from the Diffbot API.
@@ -149,25 +628,55 @@ class DiffbotEnhanceClient(BaseDiffbotKGClient):
         url = self.bulk_job_single_result_url.human_repr().format(
             bulkjobId=bulkjobId, jobIdx=jobIdx
         )
-        resp = await self._get(url)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotEntitiesResponse
         return cast(DiffbotEntitiesResponse, resp)
 
+    @overload
+    async def stop_bulkjob(
+        self, bulkJobId: str, raw: Literal[False] = False
+    ) -> DiffbotBulkJobStatusResponse: ...
+
+    @overload
+    async def stop_bulkjob(
+        self, bulkJobId: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
     async def stop_bulkjob(
         self,
         bulkJobId: str,
-    ) -> DiffbotBulkJobStatusResponse:
+        raw: bool = False,
+    ) -> DiffbotBulkJobStatusResponse | RawDiffbotResponse:
         """
         Stop an active Enhance Bulkjob by its ID.
 
         Args:
             bulkjobId (str): The ID of the bulk job.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotEntitiesResponse: The response from the Diffbot API.
         """
 
         url = self.bulk_job_stop_url.human_repr().format(bulkjobId=bulkJobId)
-        resp = await self._get(url)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotBulkJobStatusResponse
         return cast(DiffbotBulkJobStatusResponse, resp)
+
+
+async def _aiter(
+    items: Iterable[dict] | AsyncIterable[dict],
+) -> AsyncGenerator[dict, None]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
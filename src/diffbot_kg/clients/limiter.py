@@ -0,0 +1,261 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from typing import Protocol
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter(Protocol):
+    """
+    A rate limiter usable with `async with`, like aiolimiter.AsyncLimiter.
+
+    Entering the context waits until the request may be sent.
+    """
+
+    async def __aenter__(self) -> object: ...
+
+    async def __aexit__(self, *args) -> None: ...
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+
+    The bucket holds up to `max_rate` tokens and refills at `max_rate` per
+    `time_period`. Each reservation takes one token; when the bucket is
+    empty the balance goes negative and the reservation is told how long to
+    wait until its token will have been refilled. Requests therefore leave
+    in reservation order at the configured rate, without polling.
+
+    The state is two floats, so it can be kept anywhere processes can share
+    it (a locked file, a server).
+    """
+
+    def __init__(
+        self,
+        max_rate: float = 5,
+        time_period: float = 1,
+        tokens: float | None = None,
+        updated: float | None = None,
+    ) -> None:
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self.tokens = max_rate if tokens is None else tokens
+        self.updated = time.time() if updated is None else updated
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+
+        return self.max_rate / self.time_period
+
+    def reserve(self, now: float | None = None) -> float:
+        """
+        Take one token.
+
+        Args:
+            now (float, optional): The current Unix time. Defaults to now.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+
+        now = time.time() if now is None else now
+        elapsed = max(now - self.updated, 0)
+        self.tokens = min(self.max_rate, self.tokens + elapsed * self.rate) - 1
+        self.updated = now
+        return max(-self.tokens / self.rate, 0)
+
+
+class _ReservingLimiter(abc.ABC):
+    """Base class of limiters that sleep for a reservation from a shared bucket."""
+
+    async def acquire(self) -> None:
+        wait = await self._reserve()
+        if wait > 0:
+            log.debug("Rate limited: waiting %.3fs", wait)
+            await asyncio.sleep(wait)
+
+    @abc.abstractmethod
+    async def _reserve(self) -> float:
+        """Take one token, returning the seconds to wait before sending."""
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *args) -> None:
+        return None
+
+
+class FileRateLimiter(_ReservingLimiter):
+    """
+    Rate limiter shared by all processes on a host through a locked file.
+
+    Every process (gunicorn or Celery worker, multiprocessing child) that
+    opens a FileRateLimiter on the same path draws from one token bucket, so
+    the aggregate rate stays at `max_rate` per `time_period` however many
+    workers run. The bucket state is 16 bytes, updated under an exclusive
+    `flock`; the lock is held only for the read-modify-write, never while
+    waiting. Requires a POSIX system.
+    """
+
+    def __init__(
+        self, path: str | os.PathLike, max_rate: float = 5, time_period: float = 1
+    ) -> None:
+        """
+        Initializes a new FileRateLimiter.
+
+        Args:
+            path (str | PathLike): The state file; created if missing. Use
+                the same path in every process that shares the limit.
+            max_rate (float, optional): Requests per time period. Defaults to 5.
+            time_period (float, optional): The period in seconds. Defaults to 1.
+        """
+
+        self.path = os.fspath(path)
+        self.max_rate = max_rate
+        self.time_period = time_period
+
+    async def _reserve(self) -> float:
+        return await asyncio.to_thread(self.reserve)
+
+    def reserve(self) -> float:
+        """
+        Take one token from the shared bucket, blocking only on the file lock.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+
+        import fcntl
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 16, 0)
+            if len(raw) == 16:
+                tokens, updated = struct.unpack("<dd", raw)
+                bucket = TokenBucket(self.max_rate, self.time_period, tokens, updated)
+            else:
+                bucket = TokenBucket(self.max_rate, self.time_period)
+
+            wait = bucket.reserve()
+            os.pwrite(fd, struct.pack("<dd", bucket.tokens, bucket.updated), 0)
+            return wait
+        finally:
+            os.close(fd)
+
+
+class RemoteRateLimiter(_ReservingLimiter):
+    """
+    Rate limiter shared across hosts through a RateLimitServer.
+
+    Each request first asks the server for a reservation (one small POST)
+    and then waits as long as the server says. Reservation round trips are
+    not themselves rate limited.
+
+    Reservations are sent over an aiohttp session that is opened on first
+    use. A DiffbotSession closes it when the DiffbotSession is closed. If you
+    use the limiter without a DiffbotSession, call close() yourself. A closed
+    limiter opens a new connection on its next reservation, so one limiter
+    can be shared by sessions that close at different times.
+    """
+
+    def __init__(self, url: str | URL, key: str = "default") -> None:
+        """
+        Initializes a new RemoteRateLimiter.
+
+        Args:
+            url (str | URL): The base URL of the RateLimitServer.
+            key (str, optional): The bucket to draw from, for servers shared
+                by several tokens. Defaults to "default".
+        """
+
+        self.url = URL(url)
+        self.key = key
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _reserve(self) -> float:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+        async with self._session.post(
+            self.url / "reserve", params={"key": self.key}
+        ) as resp:
+            resp.raise_for_status()
+            return float((await resp.json())["wait"])
+
+    async def close(self) -> None:
+        """Close the connection to the server."""
+
+        if self._session is not None:
+            await self._session.close()
+
+
+class RateLimitServer:
+    """
+    A minimal HTTP server handing out token bucket reservations.
+
+    `POST /reserve?key=...` answers `{"wait": seconds}`. Run one per
+    deployment (`python -m diffbot_kg.clients.limiter`) and point every
+    worker's RemoteRateLimiter at it.
+    """
+
+    def __init__(self, max_rate: float = 5, time_period: float = 1) -> None:
+        """
+        Initializes a new RateLimitServer.
+
+        Args:
+            max_rate (float, optional): Requests per time period, per key.
+                Defaults to 5.
+            time_period (float, optional): The period in seconds. Defaults to 1.
+        """
+
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application serving reservations."""
+
+        app = web.Application()
+        app.router.add_post("/reserve", self._handle_reserve)
+        return app
+
+    async def _handle_reserve(self, request: web.Request) -> web.Response:
+        key = request.query.get("key", "default")
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.max_rate, self.time_period)
+
+        return web.Response(
+            text=json.dumps({"wait": bucket.reserve()}),
+            content_type="application/json",
+        )
+
+    def run(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        """Serve until interrupted."""
+
+        web.run_app(self.app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared Diffbot rate limit server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=5)
+    parser.add_argument("--period", type=float, default=1)
+    args = parser.parse_args()
+
+    RateLimitServer(args.rate, args.period).run(args.host, args.port)
@@ -0,0 +1,247 @@
+import asyncio
+import contextlib
+import contextvars
+from collections import deque
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Iterator, Mapping
+
+_current_priority: contextvars.ContextVar["Priority | None"] = contextvars.ContextVar(
+    "diffbot_kg_request_priority", default=None
+)
+
+
+class Priority(StrEnum):
+    """Priority classes understood by the RequestScheduler."""
+
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    BACKGROUND = "background"
+
+
+@contextlib.contextmanager
+def request_priority(priority: Priority | str | None) -> Iterator[None]:
+    """
+    Run every request issued within the block (and within any task created
+    from it) under the given priority class.
+
+    Args:
+        priority (Priority | str | None): The priority class. None leaves the
+            surrounding priority untouched.
+    """
+
+    if priority is None:
+        yield
+        return
+
+    token = _current_priority.set(Priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """Return the priority class of the current context."""
+
+    return _current_priority.get() or Priority.INTERACTIVE
+
+
+@dataclass(frozen=True)
+class ClassPolicy:
+    """
+    Scheduling policy of a single priority class.
+
+    Attributes:
+        weight (float): Relative share of dispatches when classes compete.
+        max_in_flight (int | None): Maximum number of concurrently dispatched
+            requests of this class. None means unlimited.
+    """
+
+    weight: float = 1.0
+    max_in_flight: int | None = None
+
+
+@dataclass(frozen=True)
+class QueueStats:
+    """Point-in-time queue statistics of a single priority class."""
+
+    queued: int
+    in_flight: int
+    dispatched: int
+    max_queued: int
+
+
+DEFAULT_POLICIES: Mapping[Priority, ClassPolicy] = {
+    Priority.INTERACTIVE: ClassPolicy(weight=8, max_in_flight=None),
+    Priority.BATCH: ClassPolicy(weight=2, max_in_flight=None),
+    Priority.BACKGROUND: ClassPolicy(weight=1, max_in_flight=None),
+}
+
+
+class _PriorityClass:
+    def __init__(self, policy: ClassPolicy) -> None:
+        self.policy = policy
+        self.waiters: deque[asyncio.Future] = deque()
+        self.in_flight = 0
+        self.dispatched = 0
+        self.max_queued = 0
+        self.vtime = 0.0
+
+    @property
+    def eligible(self) -> bool:
+        limit = self.policy.max_in_flight
+        return bool(self.waiters) and (limit is None or self.in_flight < limit)
+
+
+class RequestScheduler:
+    """
+    Weighted fair queue placed in front of the session's rate limiter.
+
+    Each request waits in the queue of its priority class until the class is
+    below its in-flight limit and wins the fair-queuing pick. Classes are
+    picked by virtual time: every dispatch advances the class's clock by
+    1/weight, and the class with the smallest clock goes next. An idle class
+    does not bank credit while it has nothing queued.
+
+    By default no class and no total is limited, so requests are dispatched
+    as soon as they arrive and the scheduler only reorders them. Set a global
+    in-flight limit to cap the total number of dispatched requests, so the
+    number of requests queued on the rate limiter ahead of an interactive
+    request stays bounded, and per-class limits to keep batch work from
+    taking every slot. A DiffbotSession created without a scheduler uses one
+    with a global limit (DEFAULT_MAX_IN_FLIGHT in diffbot_kg.clients.session).
+    """
+
+    def __init__(
+        self,
+        policies: Mapping[Priority, ClassPolicy] | None = None,
+        max_in_flight: int | None = None,
+    ) -> None:
+        """
+        Initializes a new RequestScheduler.
+
+        Args:
+            policies (Mapping[Priority, ClassPolicy], optional): Per-class
+                policies. Classes that are not given keep their default
+                policy. Defaults to None.
+            max_in_flight (int, optional): Maximum number of dispatched
+                requests across all classes. Defaults to None (unlimited).
+
+        Raises:
+            ValueError: If a weight is not positive or an in-flight limit is
+                below one.
+        """
+
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        merged = {**DEFAULT_POLICIES, **(policies or {})}
+
+        for priority, policy in merged.items():
+            if policy.weight <= 0:
+                raise ValueError(f"weight for {priority} must be positive")
+            if policy.max_in_flight is not None and policy.max_in_flight < 1:
+                raise ValueError(f"max_in_flight for {priority} must be at least 1")
+
+        self._classes = {Priority(p): _PriorityClass(pol) for p, pol in merged.items()}
+        self._vclock = 0.0
+        self._max_in_flight = max_in_flight
+
+    async def acquire(self, priority: Priority | str | None = None) -> Priority:
+        """
+        Wait until a request of the given class may be dispatched.
+
+        Args:
+            priority (Priority | str, optional): The priority class. Defaults
+                to the priority of the current context.
+
+        Returns:
+            Priority: The class the slot was granted in; pass it to release().
+        """
+
+        priority = Priority(priority) if priority else current_priority()
+        cls = self._classes[priority]
+
+        fut = asyncio.get_running_loop().create_future()
+        if not cls.waiters:
+            # Do not let a class bank credit while it was idle.
+            cls.vtime = max(cls.vtime, self._vclock)
+        cls.waiters.append(fut)
+        cls.max_queued = max(cls.max_queued, len(cls.waiters))
+        self._dispatch()
+
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted just before cancellation; hand the slot on.
+                self.release(priority)
+            else:
+                with contextlib.suppress(ValueError):
+                    cls.waiters.remove(fut)
+            raise
+
+        return priority
+
+    def release(self, priority: Priority) -> None:
+        """
+        Return a slot obtained from acquire().
+
+        Args:
+            priority (Priority): The class returned by acquire().
+        """
+
+        self._classes[priority].in_flight -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority | str | None = None):
+        """Async context manager wrapping acquire() and release()."""
+
+        granted = await self.acquire(priority)
+        try:
+            yield granted
+        finally:
+            self.release(granted)
+
+    def stats(self) -> dict[Priority, QueueStats]:
+        """
+        Return queue-depth statistics for every priority class.
+
+        Returns:
+            dict[Priority, QueueStats]: The statistics keyed by class.
+        """
+
+        return {
+            priority: QueueStats(
+                queued=len(cls.waiters),
+                in_flight=cls.in_flight,
+                dispatched=cls.dispatched,
+                max_queued=cls.max_queued,
+            )
+            for priority, cls in self._classes.items()
+        }
+
+    @property
+    def in_flight(self) -> int:
+        """The number of dispatched requests across all classes."""
+
+        return sum(cls.in_flight for cls in self._classes.values())
+
+    def _dispatch(self) -> None:
+        while self._max_in_flight is None or self.in_flight < self._max_in_flight:
+            eligible = [cls for cls in self._classes.values() if cls.eligible]
+            if not eligible:
+                return
+
+            cls = min(eligible, key=lambda c: c.vtime)
+            fut = cls.waiters.popleft()
+            if fut.done():
+                continue
+
+            cls.in_flight += 1
+            cls.dispatched += 1
+            self._vclock = cls.vtime
+            cls.vtime += 1 / cls.policy.weight
+            fut.set_result(None)
@@ -1,10 +1,33 @@
-from typing import cast
+import asyncio
+import logging
+from typing import (
+    AsyncIterator,
+    Collection,
+    Iterable,
+    Literal,
+    MutableMapping,
+    cast,
+    overload,
+)
 
+from diffbot_kg import dql
 from diffbot_kg.clients.base import BaseDiffbotKGClient
 from diffbot_kg.models.response import (
     DiffbotCoverageReportResponse,
     DiffbotEntitiesResponse,
+    DiffbotFacetResponse,
+    RawDiffbotResponse,
 )
+from diffbot_kg.models.response.coverage_report import CoverageRow, aiter_coverage_rows
+from diffbot_kg.models.response.facet import FacetTable
+from diffbot_kg.models.lookup import EntityLookupResult
+from diffbot_kg.partition import Partition
+from diffbot_kg.traversal import KnowledgeGraphTraversal
+
+log = logging.getLogger(__name__)
+
+# Page size of the sub-searches of search_split when the search has no `size`.
+SPLIT_PAGE_SIZE = 50
 
 
 class DiffbotSearchClient(BaseDiffbotKGClient):
@@ -16,51 +39,527 @@ class DiffbotSearchClient(BaseDiffbotKGClient):
     report_url = search_url / "report"
     report_by_id_url = report_url / "{id}"
 
-    async def search(self, params: dict) -> DiffbotEntitiesResponse:
+    @overload
+    async def search(
+        self, params: dict, raw: Literal[False] = False
+    ) -> DiffbotEntitiesResponse: ...
+
+    @overload
+    async def search(self, params: dict, raw: Literal[True]) -> RawDiffbotResponse: ...
+
+    async def search(
+        self, params: dict, raw: bool = False
+    ) -> DiffbotEntitiesResponse | RawDiffbotResponse:
         """Search Diffbot's Knowledge Graph.
 
         Args:
             params (dict): Dict of params to send in request
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse,
+                bypassing the store. Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
-        # No change needed here; the issue will be addressed in the session handling
-        resp = await self._get_or_post(self.search_url, params=params)
+        if raw:
+            resp = await self._get_or_post(self.search_url, params=params, raw=True)
+            return cast(RawDiffbotResponse, resp)
+
+        if (
+            self.store is not None
+            and (local := self.store.answer_search(params)) is not None
+        ):
+            resp = self._local_response([{"entity": e} for e in local])
+        else:
+            resp = await self._get_or_post(self.search_url, params=params)
+            self._store_entities(resp)
+
         resp.__class__ = DiffbotEntitiesResponse
         return cast(DiffbotEntitiesResponse, resp)
 
+    @overload
+    async def facet(
+        self,
+        query: str,
+        field: str,
+        params: dict | None = None,
+        raw: Literal[False] = False,
+    ) -> DiffbotFacetResponse: ...
+
+    @overload
+    async def facet(
+        self, query: str, field: str, params: dict | None = None, *, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def facet(
+        self, query: str, field: str, params: dict | None = None, raw: bool = False
+    ) -> DiffbotFacetResponse | RawDiffbotResponse:
+        """Count the values of a field over the entities matching a query.
+
+        The counts are aggregated server-side; no entities are downloaded.
+
+        Args:
+            query (str): The DQL query string.
+            field (str): The field to facet on, e.g. "industries". A facet
+                spec may be prepended in brackets, e.g. "[year]:foundingDate"
+                is sent as `facet[year]:foundingDate`.
+            params (dict, optional): Extra params to send in request, e.g.
+                `size` for the number of buckets. Defaults to None.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
+
+        Returns:
+            DiffbotFacetResponse: The response from the Diffbot API.
+        """
+
+        sep = "" if field.startswith("[") else ":"
+        params = {**(params or {}), "query": f"{query} facet{sep}{field}"}
+
+        resp = await self._get_or_post(self.search_url, params=params, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
+        resp.__class__ = DiffbotFacetResponse
+        return cast(DiffbotFacetResponse, resp)
+
+    async def facets(
+        self,
+        queries: str | Iterable[str],
+        fields: Iterable[str],
+        params: dict | None = None,
+    ) -> FacetTable:
+        """Run facet queries for several fields (and queries) concurrently.
+
+        Args:
+            queries (str | Iterable[str]): One or more DQL query strings.
+                Counts from several queries are summed per field and value.
+            fields (Iterable[str]): The fields to facet on.
+            params (dict, optional): Extra params sent with every request.
+                Defaults to None.
+
+        Returns:
+            FacetTable: The value counts per field.
+        """
+
+        queries = [queries] if isinstance(queries, str) else list(queries)
+        pairs = [(q, f) for q in queries for f in fields]
+
+        responses = await asyncio.gather(
+            *(self.facet(q, f, params=params) for q, f in pairs)
+        )
+        return FacetTable.from_responses(
+            (f, resp) for (_, f), resp in zip(pairs, responses, strict=True)
+        )
+
+    def plan_search(self, params: dict, max_values: int | None = None) -> list[dict]:
+        """Split a search with a large `or()` list into sub-searches.
+
+        The largest `or()` value list in the query is split so that every
+        sub-search fits in a GET request (see `_get_or_post`) and, if given,
+        holds at most `max_values` values.
+
+        Args:
+            params (dict): Dict of params to send in request
+            max_values (int, optional): Maximum number of `or()` values per
+                sub-search. Defaults to None.
+
+        Returns:
+            list[dict]: The params of each sub-search.
+        """
+
+        query = params.get("query")
+        if not query:
+            return [params]
+
+        def measure(q: str) -> int:
+            merged = self._merge_params({**params, "query": q})
+            return self._url_length(self.search_url, merged)
+
+        queries = dql.split_or_query(
+            query, measure, self.max_get_url_length, max_values=max_values
+        )
+        return [{**params, "query": q} for q in queries]
+
+    async def search_split(
+        self, params: dict, max_values: int | None = None
+    ) -> DiffbotEntitiesResponse:
+        """Search with a large `or()` list as concurrent sub-searches.
+
+        The sub-searches from `plan_search` run concurrently through the
+        session's scheduler and rate limiter, and their results are merged,
+        keeping the first occurrence of each entity id. Each sub-search is
+        paged (by `size`, or SPLIT_PAGE_SIZE) until its hits are exhausted,
+        or until it has `size` entities, as no more can be kept after
+        merging. A `size` is applied to the merged results. An offset
+        (`from`) or a sort order cannot be applied across sub-searches, so a
+        search that needs splitting must not have either.
+
+        Args:
+            params (dict): Dict of params to send in request
+            max_values (int, optional): Maximum number of `or()` values per
+                sub-search. Defaults to None.
+
+        Returns:
+            DiffbotEntitiesResponse: The merged response. `hits` is the sum
+                of the sub-search hits, less the duplicates dropped.
+
+        Raises:
+            ValueError: If the search needs splitting and has an offset or
+                a sort order.
+        """
+
+        plan = self.plan_search(params, max_values=max_values)
+        if len(plan) == 1:
+            return await self.search(plan[0])
+
+        ordered = [k for k in ("from", "sortBy", "revSortBy") if params.get(k)]
+        if dql.is_sorted(params["query"]):
+            ordered.append("a sortBy clause")
+        if ordered:
+            raise ValueError(
+                f"Cannot merge {len(plan)} sub-searches with {', '.join(ordered)};"
+                " page or sort a split search after merging"
+            )
+
+        size = params.get("size")
+        limit = None if size is None else int(size)
+        with self._span("search_split", requests=len(plan)):
+            responses = await asyncio.gather(
+                *(self._search_pages(p, limit) for p in plan)
+            )
+        return _merge_entity_responses(responses, size=limit)
+
+    async def _search_pages(
+        self, params: dict, limit: int | None
+    ) -> DiffbotEntitiesResponse:
+        """Page through one search until its hits, or `limit` entities, run out."""
+
+        page_size = limit or SPLIT_PAGE_SIZE
+        first = await self.search({**params, "size": page_size})
+        data = list(first.data)
+        hits = first.content.get("hits", len(data))
+
+        page = first.data
+        while page and len(data) < hits and (limit is None or len(data) < limit):
+            resp = await self.search({**params, "from": len(data), "size": page_size})
+            page = resp.data
+            data.extend(page)
+
+        content = {**first.content, "data": data}
+        return DiffbotEntitiesResponse(first.status, first.headers, content)
+
+    async def get_entities(
+        self,
+        ids: Iterable[str],
+        cache: MutableMapping[str, dict] | None = None,
+        batch_size: int = 100,
+    ) -> EntityLookupResult:
+        """Look up entities by Diffbot id in as few requests as possible.
+
+        Ids found in `cache` are answered without a request. The rest are
+        packed into `id:or(...)` queries of at most `batch_size` ids, each
+        small enough to be sent as a GET request, and the batches run
+        concurrently. Entities fetched are written back to `cache`.
+
+        Args:
+            ids (Iterable[str]): The Diffbot ids; duplicates are ignored.
+            cache (MutableMapping[str, dict], optional): An id-to-entity
+                cache. Defaults to the client's store in read-through mode.
+            batch_size (int, optional): Maximum number of ids per request,
+                which is also the page size requested. Defaults to 100.
+
+        Returns:
+            EntityLookupResult: The entities keyed by id and the missing ids.
+        """
+
+        ids = list(dict.fromkeys(ids))
+        result = EntityLookupResult()
+
+        if cache is None and self.store is not None and self.store.read_through:
+            cache = self.store
+
+        if cache is not None:
+            for entity_id in ids:
+                if (entity := cache.get(entity_id)) is not None:
+                    result.entities[entity_id] = entity
+
+        pending = [i for i in ids if i not in result.entities]
+        if pending:
+            # Measured with the largest page size, which never encodes
+            # shorter than the size of a batch.
+            query = dql.or_clause("id", pending)
+            plan = self.plan_search(
+                {"query": query, "size": batch_size}, max_values=batch_size
+            )
+            for params in plan:
+                params["size"] = len(dql.find_or_lists(params["query"])[0].values)
+
+            with self._span("get_entities", ids=len(pending), requests=len(plan)):
+                responses = await asyncio.gather(*(self.search(p) for p in plan))
+            result.requests = len(responses)
+
+            # search() already writes fetched entities into the store.
+            wanted = set(pending)
+            for resp in responses:
+                for entity in resp.entities:
+                    if (entity_id := entity.get("id")) in wanted:
+                        result.entities[entity_id] = entity
+                        if cache is not None and cache is not self.store:
+                            cache[entity_id] = entity
+
+        result.missing = [i for i in ids if i not in result.entities]
+        return result
+
+    def traverse(
+        self,
+        start_ids: Iterable[str],
+        max_depth: int = 1,
+        edge_types: Collection[str] | None = None,
+        order: Literal["bfs", "dfs"] = "bfs",
+        cache: MutableMapping[str, dict] | None = None,
+    ) -> KnowledgeGraphTraversal:
+        """Traverse the entities related to a set of start entities.
+
+        Usage:
+            async for node in client.traverse(["E1"], max_depth=2,
+                                              edge_types={"subsidiaries"}):
+                ...
+
+        Args:
+            start_ids (Iterable[str]): The Diffbot ids to start from.
+            max_depth (int, optional): The maximum number of hops. Defaults to 1.
+            edge_types (Collection[str], optional): Field names to follow,
+                e.g. {"parentCompany", "subsidiaries"}. Defaults to all.
+            order (str, optional): "bfs" or "dfs". Defaults to "bfs".
+            cache (MutableMapping[str, dict], optional): An id-to-entity
+                cache passed on to `get_entities`. Defaults to None.
+
+        Returns:
+            KnowledgeGraphTraversal: An async iterable of TraversalNodes.
+        """
+
+        return KnowledgeGraphTraversal(
+            self,
+            start_ids,
+            max_depth=max_depth,
+            edge_types=edge_types,
+            order=order,
+            cache=cache,
+        )
+
+    async def search_partitioned(
+        self,
+        params: dict,
+        partitions: Iterable[Partition],
+        page_size: int = 50,
+        max_hits: int = 10_000,
+        concurrency: int = 4,
+    ) -> AsyncIterator[dict]:
+        """Retrieve a very large result set as parallel partitioned searches.
+
+        The query is restricted to each partition in turn, and the pages of
+        all partitions are fetched by `concurrency` workers. A partition
+        with more than `max_hits` hits is split again (see
+        `Partition.split`) instead of being paged deeply.
+
+        Args:
+            params (dict): Dict of params to send in request; `from` and
+                `size` are managed by this method.
+            partitions (Iterable[Partition]): Disjoint partitions of the
+                query, e.g. from `partition.range_partitions`.
+            page_size (int, optional): Entities per request. Defaults to 50.
+            max_hits (int, optional): Largest partition paged without further
+                splitting. Defaults to 10,000.
+            concurrency (int, optional): Number of concurrent requests.
+                Defaults to 4.
+
+        Yields:
+            dict: The entities, in no particular order.
+        """
+
+        work: asyncio.Queue[tuple[Partition, int]] = asyncio.Queue()
+        pages: asyncio.Queue[list[dict] | Exception | None] = asyncio.Queue(
+            maxsize=concurrency * 2
+        )
+        for part in partitions:
+            work.put_nowait((part, 0))
+
+        async def fetch(part: Partition, offset: int) -> None:
+            query = f"{params['query']} {part.clause()}"
+            with self._span("page", partition=part.clause(), offset=offset):
+                resp = await self.search(
+                    {**params, "query": query, "from": offset, "size": page_size}
+                )
+            hits = resp.content.get("hits", 0)
+
+            if offset == 0 and hits > max_hits:
+                if subparts := part.split():
+                    log.debug("Splitting partition %s (%s hits)", part, hits)
+                    for sub in subparts:
+                        work.put_nowait((sub, 0))
+                    return
+                log.warning("Partition %s cannot be split (%s hits)", part, hits)
+
+            if offset == 0:
+                for next_offset in range(page_size, hits, page_size):
+                    work.put_nowait((part, next_offset))
+
+            await pages.put(resp.entities)
+
+        async def worker() -> None:
+            while True:
+                part, offset = await work.get()
+                try:
+                    await fetch(part, offset)
+                except Exception as e:
+                    await pages.put(e)
+                    raise
+                finally:
+                    work.task_done()
+
+        async def finish() -> None:
+            await work.join()
+            await pages.put(None)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        tasks.append(asyncio.create_task(finish()))
+
+        try:
+            while (page := await pages.get()) is not None:
+                if isinstance(page, Exception):
+                    raise page
+                for entity in page:
+                    yield entity
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @overload
     async def coverage_report_by_id(
-        self, report_id: str
-    ) -> DiffbotCoverageReportResponse:
+        self, report_id: str, raw: Literal[False] = False
+    ) -> DiffbotCoverageReportResponse: ...
+
+    @overload
+    async def coverage_report_by_id(
+        self, report_id: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def coverage_report_by_id(
+        self, report_id: str, raw: bool = False
+    ) -> DiffbotCoverageReportResponse | RawDiffbotResponse:
         """Download coverage report by report ID.
 
         Args:
             report_id (str): The report ID string.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
-        url = str(self.report_by_id_url).format(id=report_id)
-        resp = await self._get(url)
+        url = self.report_by_id_url.human_repr().format(id=report_id)
+        resp = await self._get(url, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotCoverageReportResponse
         return cast(DiffbotCoverageReportResponse, resp)
 
+    @overload
     async def coverage_report_by_query(
-        self, query: str
-    ) -> DiffbotCoverageReportResponse:
+        self, query: str, raw: Literal[False] = False
+    ) -> DiffbotCoverageReportResponse: ...
+
+    @overload
+    async def coverage_report_by_query(
+        self, query: str, raw: Literal[True]
+    ) -> RawDiffbotResponse: ...
+
+    async def coverage_report_by_query(
+        self, query: str, raw: bool = False
+    ) -> DiffbotCoverageReportResponse | RawDiffbotResponse:
         """Download coverage report by DQL query.
 
         Args:
             query (str): The DQL query string.
+            raw (bool, optional): Return the undecoded body as a RawDiffbotResponse.
+                Defaults to False.
 
         Returns:
             DiffbotResponse: The response from the Diffbot API.
         """
 
         params = {"query": query}
-        resp = await self._get(self.report_url, params=params)
+        resp = await self._get(self.report_url, params=params, raw=raw)
+        if raw:
+            return cast(RawDiffbotResponse, resp)
+
         resp.__class__ = DiffbotCoverageReportResponse
         return cast(DiffbotCoverageReportResponse, resp)
+
+    async def stream_coverage_report_by_id(
+        self, report_id: str
+    ) -> AsyncIterator[CoverageRow]:
+        """Stream the rows of a coverage report by report ID.
+
+        The report is parsed line by line as it downloads, without holding
+        its full text.
+
+        Args:
+            report_id (str): The report ID string.
+
+        Yields:
+            CoverageRow: The rows of the report.
+        """
+
+        url = self.report_by_id_url.human_repr().format(id=report_id)
+        async with self._stream(url) as resp:
+            async for row in aiter_coverage_rows(resp.content.iter_any()):
+                yield row
+
+    async def stream_coverage_report_by_query(
+        self, query: str
+    ) -> AsyncIterator[CoverageRow]:
+        """Stream the rows of a coverage report by DQL query.
+
+        The report is parsed line by line as it downloads, without holding
+        its full text.
+
+        Args:
+            query (str): The DQL query string.
+
+        Yields:
+            CoverageRow: The rows of the report.
+        """
+
+        async with self._stream(self.report_url, params={"query": query}) as resp:
+            async for row in aiter_coverage_rows(resp.content.iter_any()):
+                yield row
+
+
+def _merge_entity_responses(
+    responses: list[DiffbotEntitiesResponse], size: int | str | None = None
+) -> DiffbotEntitiesResponse:
+    seen = set()
+    data = []
+    hits = 0
+
+    for resp in responses:
+        hits += resp.content.get("hits", len(resp.data))
+        for item in resp.data:
+            entity_id = item.get("entity", {}).get("id")
+            if entity_id is not None:
+                if entity_id in seen:
+                    hits -= 1
+                    continue
+                seen.add(entity_id)
+            data.append(item)
+
+    if size is not None:
+        data = data[: int(size)]
+
+    first = responses[0]
+    content = {**first.content, "hits": hits, "data": data}
+    return DiffbotEntitiesResponse(first.status, first.headers, content)
@@ -1,10 +1,13 @@
+import contextlib
 import logging
+import time
 from http import HTTPMethod
-from typing import Self
+from typing import AsyncIterator, Self
 
 import aiohttp
 import aiolimiter
 from tenacity import (
+    RetryCallState,
     after_log,
     retry,
     retry_if_exception_type,
@@ -12,15 +15,47 @@ from tenacity import (
     wait_random_exponential,
 )
 
+from diffbot_kg.clients.limiter import RateLimiter
+from diffbot_kg.clients.scheduler import Priority, QueueStats, RequestScheduler
+from diffbot_kg.clients.transport import AiohttpTransport, Transport
 from diffbot_kg.models.response.base import BaseDiffbotResponse
+from diffbot_kg.models.response.raw import RawDiffbotResponse
+from diffbot_kg.tracing import Tracer, span
 
 log = logging.getLogger(__name__)
 
+# Requests per second of the per-session rate limiter.
+DEFAULT_RATE = 5
+
+# In-flight limit of the default scheduler: a few seconds of the default rate.
+# Requests beyond it wait in the scheduler's priority queues, where an
+# interactive request can overtake queued batch work, instead of in FIFO
+# order on the rate limiter.
+DEFAULT_MAX_IN_FLIGHT = 4 * DEFAULT_RATE
+
 
 class RetryableException(Exception):
     pass
 
 
+def _trace_backoff(retry_state: RetryCallState) -> None:
+    """Record the upcoming retry backoff of a session request."""
+
+    session = retry_state.args[0]
+    if session.tracer is None or retry_state.next_action is None:
+        return
+
+    start = time.perf_counter()
+    session.tracer.add_span(
+        "retry backoff",
+        start,
+        start + retry_state.next_action.sleep,
+        "retry",
+        attempt=retry_state.attempt_number,
+        error=repr(retry_state.outcome.exception()) if retry_state.outcome else None,
+    )
+
+
 class URLTooLongException(Exception):
     pass
 
@@ -31,19 +66,56 @@ class DiffbotSession:
     A class representing a session with the Diffbot API.
 
     Attributes:
-        _session (aiohttp.ClientSession): The underlying HTTP client session.
-        _limiter (aiolimiter.AsyncLimiter): The rate limiter used to limit the number of requests per second.
+        transport (Transport | None): The HTTP transport given at construction.
+        _session (Transport): The open transport; an AiohttpTransport unless
+            another transport is given.
+        _limiter (RateLimiter): The rate limiter used to limit the number of requests per second;
+            a per-session aiolimiter.AsyncLimiter unless a shared limiter is given.
+        scheduler (RequestScheduler): The priority scheduler requests pass through before the limiter;
+            by default one with DEFAULT_MAX_IN_FLIGHT requests in flight.
+        spill_threshold (int | None): Response body size, in bytes, above which raw and
+            JSON-lines bodies are spilled to a temporary file instead of held in memory.
+        spill_dir (str | None): Directory for spilled bodies.
+
+    Pass a shared `limiter` (e.g. a FileRateLimiter) to enforce one aggregate
+    rate across all sessions and worker processes that use it, and a
+    `tracer` to record a timeline of every request. Pass a `transport` to
+    send requests over HTTP/2 (HttpxTransport) or in memory
+    (MemoryTransport); scheduling, rate limiting, retries and response
+    wrapping are the same for every transport.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        scheduler: RequestScheduler | None = None,
+        spill_threshold: int | None = None,
+        spill_dir: str | None = None,
+        limiter: RateLimiter | None = None,
+        tracer: Tracer | None = None,
+        transport: Transport | None = None,
+    ) -> None:
         self._headers = {"accept": "application/json"}
         self._timeout = aiohttp.ClientTimeout(total=60, sock_connect=5)
+        self.scheduler = scheduler or RequestScheduler(
+            max_in_flight=DEFAULT_MAX_IN_FLIGHT
+        )
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._shared_limiter = limiter
+        self.tracer = tracer
+        self.transport = transport
 
         self.is_open = False
 
     async def open(self) -> Self:
-        self._session = aiohttp.ClientSession(headers=self._headers, timeout=self._timeout)
-        self._limiter = aiolimiter.AsyncLimiter(max_rate=5, time_period=1)
+        trace_configs = [self.tracer.trace_config()] if self.tracer else None
+        self._session = self.transport or AiohttpTransport(
+            headers=self._headers, timeout=self._timeout, trace_configs=trace_configs
+        )
+        await self._session.open()
+        self._limiter = self._shared_limiter or aiolimiter.AsyncLimiter(
+            max_rate=DEFAULT_RATE, time_period=1
+        )
 
         self.is_open = True
         return self
@@ -67,50 +139,123 @@ class DiffbotSession:
     async def close(self) -> None:
         if not self._session.closed:
             await self._session.close()
+        # A limiter may hold its own connection (e.g. a RemoteRateLimiter).
+        if (close := getattr(self._limiter, "close", None)) is not None:
+            await close()
 
         self.is_open = False
 
+    def queue_stats(self) -> dict[Priority, QueueStats]:
+        """Return the scheduler's queue-depth statistics per priority class."""
+
+        return self.scheduler.stats()
+
     @retry(
         retry=retry_if_exception_type(RetryableException),
         reraise=True,
         stop=stop_after_attempt(5),
         wait=wait_random_exponential(multiplier=0.5, min=2, max=30),
         after=after_log(log, logging.DEBUG),
+        before_sleep=_trace_backoff,
     )
-    async def _request(self, method, url, **kwargs) -> BaseDiffbotResponse:
-        async with self._limiter:
-            async with await self._session.request(method, url, **kwargs) as resp:
-                try:
-                    resp.raise_for_status()
-                except Exception as e:
-                    if resp.status in [408, 429] or resp.status >= 500:
-                        log.debug(
-                            "Retryable exception: %s (%s %s %s)",
-                            e,
-                            resp.status,
-                            resp.reason,
-                            resp.headers,
-                        )
+    async def _request(
+        self, method, url, raw: bool = False, **kwargs
+    ) -> BaseDiffbotResponse:
+        factory = RawDiffbotResponse if raw else BaseDiffbotResponse
 
-                        raise RetryableException from e
+        with span(self.tracer, "request", "http", method=str(method), url=str(url)):
+            async with self._slot():
+                async with await self._session.request(method, url, **kwargs) as resp:
+                    self._raise_for_status(resp)
+                    if self.tracer is not None and self.spill_threshold is None:
+                        with span(self.tracer, "reading", "http"):
+                            await resp.read()
 
-                    elif resp.status == 414:
-                        log.debug(
-                            "URLTooLongException: %s (%s %s %s)",
-                            e,
-                            resp.status,
-                            resp.reason,
-                            resp.headers,
+                    with span(self.tracer, "decoding", "http"):
+                        return await factory.create(
+                            resp, self.spill_threshold, self.spill_dir
                         )
 
-                        raise URLTooLongException from e
+    @retry(
+        retry=retry_if_exception_type(RetryableException),
+        reraise=True,
+        stop=stop_after_attempt(5),
+        wait=wait_random_exponential(multiplier=0.5, min=2, max=30),
+        after=after_log(log, logging.DEBUG),
+        before_sleep=_trace_backoff,
+    )
+    async def open_stream(self, method, url, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Send a request and return the response without reading its body.
+
+        The request is scheduled, rate limited and retried like any other.
+        The caller must release() the response once done reading it. Other
+        transports than aiohttp return a TransportResponse read the same way.
+        """
+
+        if not self.is_open:
+            await self.open()
+
+        async with self._slot():
+            resp = await self._session.request(method, url, **kwargs)
+            try:
+                self._raise_for_status(resp)
+            except BaseException:
+                resp.release()
+                raise
+            return resp
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self, method, url, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Async context manager around open_stream() that releases the response."""
+
+        resp = await self.open_stream(method, url, **kwargs)
+        try:
+            yield resp
+        finally:
+            resp.release()
+
+    @contextlib.asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold a scheduler slot and pass the rate limiter, recording the wait."""
+
+        async with contextlib.AsyncExitStack() as stack:
+            with span(self.tracer, "queued", "scheduler"):
+                await stack.enter_async_context(self.scheduler.slot())
+                await stack.enter_async_context(self._limiter)
+            yield
+
+    @staticmethod
+    def _raise_for_status(resp: aiohttp.ClientResponse) -> None:
+        try:
+            resp.raise_for_status()
+        except Exception as e:
+            if resp.status in [408, 429] or resp.status >= 500:
+                log.debug(
+                    "Retryable exception: %s (%s %s %s)",
+                    e,
+                    resp.status,
+                    resp.reason,
+                    resp.headers,
+                )
+
+                raise RetryableException from e
+
+            elif resp.status == 414:
+                log.debug(
+                    "URLTooLongException: %s (%s %s %s)",
+                    e,
+                    resp.status,
+                    resp.reason,
+                    resp.headers,
+                )
 
-                    log.exception(
-                        "%s (%s %s %s)", e, resp.status, resp.reason, resp.headers
-                    )
-                    raise e
+                raise URLTooLongException from e
 
-                return await BaseDiffbotResponse.create(resp)
+            log.exception("%s (%s %s %s)", e, resp.status, resp.reason, resp.headers)
+            raise e
 
     async def __aenter__(self) -> Self:
         return self
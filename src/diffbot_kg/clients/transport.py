@@ -0,0 +1,431 @@
+import asyncio
+import inspect
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Protocol, Self
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+_DEFAULT_HEADERS = {"accept": "application/json"}
+
+
+class Transport(Protocol):
+    """
+    The HTTP layer under a DiffbotSession.
+
+    The session schedules, rate limits and retries each request, and wraps
+    the response; the transport only sends it. `request()` returns an
+    awaitable of a response that is also an async context manager, like
+    `aiohttp.ClientSession.request`. Responses are aiohttp.ClientResponse
+    objects or TransportResponse objects with the same reading methods.
+    """
+
+    @property
+    def closed(self) -> bool: ...
+
+    async def open(self) -> None: ...
+
+    def request(self, method: str, url: str | URL, **kwargs: Any) -> Awaitable[Any]: ...
+
+    async def close(self) -> None: ...
+
+
+class AiohttpTransport:
+    """The default transport: an aiohttp.ClientSession (HTTP/1.1)."""
+
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        timeout: aiohttp.ClientTimeout | None = None,
+        trace_configs: list[aiohttp.TraceConfig] | None = None,
+        **session_kwargs: Any,
+    ) -> None:
+        """
+        Initializes a new AiohttpTransport.
+
+        Args:
+            headers (dict, optional): Headers sent with every request.
+                Defaults to accepting JSON.
+            timeout (aiohttp.ClientTimeout, optional): The request timeouts.
+                Defaults to 60 seconds in total, 5 to connect.
+            trace_configs (list[aiohttp.TraceConfig], optional): aiohttp
+                request tracing hooks. Defaults to None.
+            **session_kwargs: More aiohttp.ClientSession arguments, e.g. a
+                `connector` with custom connection limits.
+        """
+
+        self.headers = headers or _DEFAULT_HEADERS
+        self.timeout = timeout or aiohttp.ClientTimeout(total=60, sock_connect=5)
+        self.trace_configs = trace_configs
+        self.session_kwargs = session_kwargs
+        self.session: aiohttp.ClientSession | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.session is None or self.session.closed
+
+    async def open(self) -> None:
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=self.timeout,
+            trace_configs=self.trace_configs,
+            **self.session_kwargs,
+        )
+
+    def request(self, method: str, url: str | URL, **kwargs: Any) -> Awaitable[Any]:
+        if self.session is None:
+            raise RuntimeError("transport is not open")
+        return self.session.request(method, url, **kwargs)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+
+class _StreamReader:
+    """The `content` of a TransportResponse, like aiohttp's StreamReader."""
+
+    def __init__(self, response: "TransportResponse") -> None:
+        self._response = response
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        async for chunk in self._response._iter_body():
+            for i in range(0, len(chunk), n):
+                yield chunk[i : i + n]
+
+    def iter_any(self) -> AsyncIterator[bytes]:
+        return self._response._iter_body()
+
+
+class TransportResponse:
+    """
+    A response of a non-aiohttp transport, read like an aiohttp.ClientResponse.
+
+    The body comes from an async iterator of chunks and can be read once,
+    either whole (read, text, json) or incrementally from `content`.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: CIMultiDictProxy[str] | dict[str, str] | None = None,
+        chunks: AsyncIterator[bytes] | None = None,
+        reason: str | None = None,
+        url: URL | None = None,
+        method: str = "GET",
+        on_release: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        """
+        Initializes a new TransportResponse.
+
+        Args:
+            status (int): The HTTP status.
+            headers (CIMultiDictProxy | dict, optional): The headers.
+            chunks (AsyncIterator[bytes], optional): The body. Defaults to empty.
+            reason (str, optional): The status reason.
+            url (URL, optional): The request URL.
+            method (str, optional): The request method. Defaults to "GET".
+            on_release (Callable, optional): Called once to release the
+                underlying connection or stream.
+        """
+
+        if not isinstance(headers, CIMultiDictProxy):
+            headers = CIMultiDictProxy(CIMultiDict(headers or {}))
+
+        self.status = status
+        self.headers = headers
+        self.reason = reason
+        self.url = url or URL()
+        self.method = method
+        self.content = _StreamReader(self)
+
+        self._chunks = chunks
+        self._body: bytes | None = None
+        self._on_release = on_release
+        self._release_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_bytes(
+        cls,
+        body: bytes | str = b"",
+        status: int = 200,
+        content_type: str = "application/octet-stream",
+        headers: dict[str, str] | None = None,
+        **kwargs: Any,
+    ) -> Self:
+        """Build a response with a complete body, e.g. for a MemoryTransport."""
+
+        if isinstance(body, str):
+            body = body.encode()
+
+        async def chunks() -> AsyncIterator[bytes]:
+            if body:
+                yield body
+
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(body)),
+            **(headers or {}),
+        }
+        return cls(status, headers, chunks(), **kwargs)
+
+    @classmethod
+    def from_json(cls, content: Any, status: int = 200, **kwargs: Any) -> Self:
+        """Build a JSON response."""
+
+        return cls.from_bytes(json.dumps(content), status, "application/json", **kwargs)
+
+    @classmethod
+    def from_json_lines(
+        cls, lines: list[Any], status: int = 200, **kwargs: Any
+    ) -> Self:
+        """Build a JSON-lines response, like bulk job results."""
+
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        return cls.from_bytes(body, status, "application/json-lines", **kwargs)
+
+    @property
+    def content_type(self) -> str:
+        value = self.headers.get("Content-Type", "application/octet-stream")
+        return value.split(";")[0].strip()
+
+    @property
+    def content_length(self) -> int | None:
+        length = self.headers.get("Content-Length")
+        return int(length) if length is not None else None
+
+    def get_encoding(self) -> str:
+        _, _, params = self.headers.get("Content-Type", "").partition("charset=")
+        return params.split(";")[0].strip() or "utf-8"
+
+    async def read(self) -> bytes:
+        if self._body is None:
+            self._body = b"".join([chunk async for chunk in self._iter_body()])
+        return self._body
+
+    async def text(self, encoding: str | None = None) -> str:
+        return (await self.read()).decode(encoding or self.get_encoding())
+
+    async def json(self, **kwargs: Any) -> Any:
+        return json.loads(await self.read())
+
+    def raise_for_status(self) -> None:
+        if self.status < 400:
+            return
+
+        request_info = aiohttp.RequestInfo(
+            url=self.url,
+            method=self.method,
+            headers=CIMultiDictProxy(CIMultiDict()),
+            real_url=self.url,
+        )
+        raise aiohttp.ClientResponseError(
+            request_info,
+            (),
+            status=self.status,
+            message=self.reason or "",
+            headers=self.headers,
+        )
+
+    def release(self) -> None:
+        if self._on_release is not None and self._release_task is None:
+            self._release_task = asyncio.ensure_future(self._on_release())
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.release()
+        if self._release_task is not None:
+            await self._release_task
+
+    async def _iter_body(self) -> AsyncIterator[bytes]:
+        if self._body is not None:
+            yield self._body
+            return
+
+        if self._chunks is None:
+            return
+        chunks, self._chunks = self._chunks, None
+        async for chunk in chunks:
+            yield chunk
+
+
+@dataclass
+class MemoryRequest:
+    """A request received by a MemoryTransport."""
+
+    method: str
+    url: URL
+    headers: dict[str, str] = field(default_factory=dict)
+    json: Any = None
+
+
+MemoryHandler = Callable[
+    [MemoryRequest], TransportResponse | Awaitable[TransportResponse]
+]
+
+
+class MemoryTransport:
+    """
+    A transport answering requests in-process, for tests and benchmarks.
+
+    Every request is passed to a handler, which returns the response.
+    Requests go through the session's scheduler, limiter and retries as
+    usual, so client code can be exercised, and the client-side overhead
+    measured, without a network.
+    """
+
+    def __init__(self, handler: MemoryHandler, latency: float = 0) -> None:
+        """
+        Initializes a new MemoryTransport.
+
+        Args:
+            handler (Callable[[MemoryRequest], TransportResponse]): Builds the
+                response to each request; may be async.
+            latency (float, optional): Seconds to wait before each response,
+                to simulate the network. Defaults to 0.
+        """
+
+        self.handler = handler
+        self.latency = latency
+        self.requests: list[MemoryRequest] = []
+        self._closed = True
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def open(self) -> None:
+        self._closed = False
+
+    def request(self, method: str, url: str | URL, **kwargs: Any) -> Awaitable[Any]:
+        return self._request(method, url, **kwargs)
+
+    async def _request(
+        self,
+        method: str,
+        url: str | URL,
+        params: dict | None = None,
+        headers: dict | None = None,
+        json: Any = None,
+        **kwargs: Any,
+    ) -> TransportResponse:
+        url = URL(url)
+        if params:
+            url = url.update_query({k: str(v) for k, v in params.items()})
+
+        request = MemoryRequest(str(method), url, dict(headers or {}), json)
+        self.requests.append(request)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        resp = self.handler(request)
+        if inspect.isawaitable(resp):
+            resp = await resp
+        resp.url = url
+        resp.method = request.method
+        return resp
+
+    async def close(self) -> None:
+        self._closed = True
+
+
+class HttpxTransport:
+    """
+    An HTTP/2 transport based on httpx.
+
+    All concurrent requests to the API are multiplexed as streams over a
+    single connection, instead of one connection (and TLS handshake) per
+    request in flight, which pays off with many concurrent enhance calls.
+    Requires the optional `httpx[http2]` package
+    (pip install 'diffbot-kg[http2]').
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        headers: dict[str, str] | None = None,
+        timeout: float = 60,
+        **client_kwargs: Any,
+    ) -> None:
+        """
+        Initializes a new HttpxTransport.
+
+        Args:
+            http2 (bool, optional): Whether to negotiate HTTP/2. Defaults to True.
+            headers (dict, optional): Headers sent with every request.
+                Defaults to accepting JSON.
+            timeout (float, optional): The request timeout in seconds.
+                Defaults to 60.
+            **client_kwargs: More httpx.AsyncClient arguments, e.g. `limits`.
+
+        Raises:
+            ImportError: If httpx (or h2, for HTTP/2) is not installed.
+        """
+
+        try:
+            import httpx
+
+            if http2:
+                import h2  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "HttpxTransport requires httpx[http2]: pip install 'diffbot-kg[http2]'"
+            ) from e
+
+        self.http2 = http2
+        self.headers = headers or _DEFAULT_HEADERS
+        self.timeout = timeout
+        self.client_kwargs = client_kwargs
+        self.client: httpx.AsyncClient | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.client is None or self.client.is_closed
+
+    async def open(self) -> None:
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            headers=self.headers,
+            timeout=self.timeout,
+            **self.client_kwargs,
+        )
+
+    def request(self, method: str, url: str | URL, **kwargs: Any) -> Awaitable[Any]:
+        return self._request(method, url, **kwargs)
+
+    async def _request(
+        self,
+        method: str,
+        url: str | URL,
+        params: dict | None = None,
+        headers: dict | None = None,
+        json: Any = None,
+        **kwargs: Any,
+    ) -> TransportResponse:
+        if self.client is None:
+            raise RuntimeError("transport is not open")
+
+        request = self.client.build_request(
+            str(method), str(url), params=params, headers=headers, json=json
+        )
+        resp = await self.client.send(request, stream=True)
+        return TransportResponse(
+            resp.status_code,
+            CIMultiDictProxy(CIMultiDict(resp.headers.multi_items())),
+            resp.aiter_bytes(),
+            reason=resp.reason_phrase,
+            url=URL(str(resp.url)),
+            method=str(method),
+            on_release=resp.aclose,
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
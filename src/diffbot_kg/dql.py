@@ -0,0 +1,306 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+_OR_START = re.compile(r"(?<![\w.\-])([\w.]+):or\(")
+_SORT_FIELDS = ("sortBy:", "revSortBy:")
+
+
+@dataclass(frozen=True)
+class OrList:
+    """
+    An `field:or(...)` clause found in a DQL query.
+
+    Attributes:
+        field (str): The field the clause filters on.
+        start (int): Offset of the clause in the query.
+        end (int): Offset just past the closing parenthesis.
+        values (list[str]): The values, exactly as written (quotes included).
+    """
+
+    field: str
+    start: int
+    end: int
+    values: list[str]
+
+
+def quote(value: str) -> str:
+    """
+    Quote a value for use in a DQL query.
+
+    Args:
+        value (str): The raw value.
+
+    Returns:
+        str: The value wrapped in double quotes, with quotes and backslashes escaped.
+    """
+
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def or_clause(field: str, values: Iterable[str], quoted: bool = True) -> str:
+    """
+    Build a `field:or(...)` clause.
+
+    Args:
+        field (str): The field to filter on.
+        values (Iterable[str]): The values to match.
+        quoted (bool, optional): Whether the values still need quoting.
+            Defaults to True.
+
+    Returns:
+        str: The DQL clause.
+    """
+
+    values = [quote(v) for v in values] if quoted else list(values)
+    return f"{field}:or({','.join(values)})"
+
+
+def find_or_lists(query: str) -> list[OrList]:
+    """
+    Find all top-level `field:or(...)` clauses in a DQL query.
+
+    Only clauses outside any parentheses are returned: a clause nested in
+    `not(...)` or another operator cannot be split without changing what
+    the query matches.
+
+    Args:
+        query (str): The DQL query.
+
+    Returns:
+        list[OrList]: The clauses in order of appearance. Clauses whose
+            parentheses are unbalanced are skipped.
+    """
+
+    found = []
+    depth = 0
+    quoted = False
+    escaped = False
+    pos = 0
+
+    while pos < len(query):
+        char = query[pos]
+
+        if quoted:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif not depth and (match := _OR_START.match(query, pos)):
+            parsed = _parse_values(query, match.end())
+            if parsed is None:
+                break
+
+            values, end = parsed
+            found.append(OrList(match.group(1), match.start(), end, values))
+            pos = end
+            continue
+
+        pos += 1
+
+    return found
+
+
+def is_sorted(query: str) -> bool:
+    """
+    Check whether a DQL query orders its results with sortBy or revSortBy.
+
+    Args:
+        query (str): The DQL query.
+
+    Returns:
+        bool: Whether the query has a top-level sort clause.
+    """
+
+    return any(token.startswith(_SORT_FIELDS) for token in _tokens(query))
+
+
+def parse_simple_query(
+    query: str, fields: Iterable[str] = ("id", "type", "name")
+) -> dict[str, list[str]] | None:
+    """
+    Parse a query made only of `field:value` and `field:or(...)` clauses.
+
+    Args:
+        query (str): The DQL query, e.g. 'type:Organization name:"Diffbot"'.
+        fields (Iterable[str], optional): The fields allowed. Defaults to
+            id, type and name.
+
+    Returns:
+        dict[str, list[str]] | None: The unquoted values by field, or None if
+            the query uses anything else (other fields, operators, ranges).
+    """
+
+    allowed = set(fields)
+    parsed: dict[str, list[str]] = {}
+
+    for token in _tokens(query):
+        field, sep, value = token.partition(":")
+        if not sep or field not in allowed or not value:
+            return None
+
+        if value.startswith("or(") and value.endswith(")"):
+            values = _parse_values(value, 3)
+            if values is None or values[1] != len(value):
+                return None
+            raw = values[0]
+        else:
+            raw = [value]
+
+        unquoted = [_unquote(v) for v in raw]
+        if any(v is None for v in unquoted):
+            return None
+        parsed.setdefault(field, []).extend(unquoted)  # type: ignore[arg-type]
+
+    return parsed or None
+
+
+def split_or_query(
+    query: str,
+    measure: Callable[[str], int],
+    limit: int,
+    max_values: int | None = None,
+) -> list[str]:
+    """
+    Split the largest top-level `or()` list of a query into sub-queries that
+    fit a limit.
+
+    The rest of the query is kept verbatim in every sub-query. As top-level
+    clauses are combined with AND, together the sub-queries match exactly
+    the entities the original query matches. `or()` lists nested in
+    parentheses, e.g. in `not(...)`, are never split.
+
+    Args:
+        query (str): The DQL query.
+        measure (Callable[[str], int]): Returns the size of the request made
+            for a given query (e.g. the length of the encoded GET URL). The
+            size must grow additively with the characters of the query.
+        limit (int): The maximum size of a sub-query request.
+        max_values (int, optional): The maximum number of values per
+            sub-query. Defaults to no limit.
+
+    Returns:
+        list[str]: The sub-queries, or [query] if nothing needs splitting.
+    """
+
+    or_lists = find_or_lists(query)
+    if not or_lists:
+        return [query]
+
+    target = max(or_lists, key=lambda o: len(o.values))
+    if measure(query) <= limit and (
+        max_values is None or len(target.values) <= max_values
+    ):
+        return [query]
+
+    prefix = f"{query[: target.start]}{target.field}:or("
+    suffix = query[target.end - 1 :]
+
+    overhead = measure("")
+    base = measure(prefix + suffix)
+    sep = measure(",") - overhead
+
+    chunks: list[list[str]] = [[]]
+    size = base
+    for value in target.values:
+        cost = measure(value) - overhead
+        chunk = chunks[-1]
+        full = max_values is not None and len(chunk) >= max_values
+        if chunk and (full or size + sep + cost > limit):
+            chunks.append([])
+            chunk = chunks[-1]
+            size = base
+
+        size += cost + (sep if chunk else 0)
+        chunk.append(value)
+
+    return [f"{prefix}{','.join(chunk)}{suffix}" for chunk in chunks]
+
+
+def _parse_values(query: str, pos: int) -> tuple[list[str], int] | None:
+    """Parse comma-separated values up to the matching close paren."""
+
+    values = []
+    depth = 0
+    quoted = False
+    escaped = False
+    start = pos
+
+    for i in range(pos, len(query)):
+        char = query[i]
+
+        if quoted:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")" and depth:
+            depth -= 1
+        elif char == ")":
+            if value := query[start:i].strip():
+                values.append(value)
+            return values, i + 1
+        elif char == "," and not depth:
+            values.append(query[start:i].strip())
+            start = i + 1
+
+    return None
+
+
+def _tokens(query: str) -> list[str]:
+    """Split a query on whitespace outside quotes and parentheses."""
+
+    tokens = []
+    depth = 0
+    quoted = False
+    escaped = False
+    start = 0
+
+    for i, char in enumerate(query):
+        if quoted:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char.isspace() and not depth:
+            if token := query[start:i].strip():
+                tokens.append(token)
+            start = i + 1
+
+    if token := query[start:].strip():
+        tokens.append(token)
+    return tokens
+
+
+def _unquote(value: str) -> str | None:
+    """Return the value of a quoted or bare DQL literal, None if it is not one."""
+
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        inner = value[1:-1]
+        return re.sub(r"\\(.)", r"\1", inner)
+    if re.fullmatch(r"[\w.\-]+", value):
+        return value
+    return None
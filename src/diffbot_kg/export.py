@@ -0,0 +1,564 @@
+import abc
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, AsyncIterable, AsyncIterator, Mapping, Protocol, Sequence
+
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.tracing import span
+
+log = logging.getLogger(__name__)
+
+
+def get_path(entity: Mapping[str, Any], path: str) -> Any:
+    """
+    Return the value at a dotted path of an entity, or None if it is absent.
+
+    Lists are indexed by their first element, e.g. "locations.city.name"
+    reads the city of the first location.
+
+    Args:
+        entity (Mapping[str, Any]): The entity.
+        path (str): The dotted path, e.g. "revenue.value".
+
+    Returns:
+        Any: The value, or None.
+    """
+
+    value: Any = entity
+    for key in path.split("."):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(key)
+    return value
+
+
+class Sink(Protocol):
+    """Destination of an ExportPipeline. Methods are called from a worker thread."""
+
+    def write(self, records: list[dict]) -> None: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    def abort(self) -> None: ...
+
+
+class FileSink(abc.ABC):
+    """
+    Base class of file sinks with atomic writes and size-based rotation.
+
+    Each file is written under a temporary ".part" name and renamed into
+    place once complete, so readers never see a partial file. With
+    `rotate_bytes`, a new file is started once the current one reaches the
+    threshold and files are numbered: "out-00000.jsonl", "out-00001.jsonl".
+    Files are also numbered with `numbered=True`, for callers that rotate
+    themselves (see rotate()); `first_index` continues an earlier numbering.
+    Closing a sink that was never written to still produces one valid,
+    empty file (with just the CSV header or Parquet schema).
+
+    Attributes:
+        paths (list[Path]): The completed files, in order.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        rotate_bytes: int | None = None,
+        numbered: bool = False,
+        first_index: int = 0,
+    ) -> None:
+        self.path = Path(path)
+        self.rotate_bytes = rotate_bytes
+        self.numbered = numbered or rotate_bytes is not None
+        self.paths: list[Path] = []
+
+        self._index = first_index
+        self._file: IO[bytes] | None = None
+        self._current: Path | None = None
+
+    def write(self, records: list[dict]) -> None:
+        if self._file is None:
+            self._start()
+
+        self._write(records)
+
+        if self.rotate_bytes is not None and self._size() >= self.rotate_bytes:
+            self._finish()
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def rotate(self) -> Path | None:
+        """
+        Complete the current file; the next write starts a new one.
+
+        Returns:
+            Path | None: The completed file, or None if none was open.
+        """
+
+        if self._file is None:
+            return None
+
+        self._finish()
+        return self.paths[-1]
+
+    def close(self) -> None:
+        if self._file is None and not self.paths:
+            # Nothing written at all: still produce an (empty) file.
+            self._start()
+        if self._file is not None:
+            self._finish()
+
+    def abort(self) -> None:
+        if self._file is not None and self._current is not None:
+            self._close_file()
+            self._part(self._current).unlink(missing_ok=True)
+            self._file = None
+
+    def _start(self) -> None:
+        if not self.numbered:
+            target = self.path
+        else:
+            suffixes = "".join(self.path.suffixes)
+            stem = self.path.name.removesuffix(suffixes)
+            target = self.path.with_name(f"{stem}-{self._index:05d}{suffixes}")
+            self._index += 1
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self._current = target
+        self._file = self._open(self._part(target))
+
+    def _finish(self) -> None:
+        if self._file is None or self._current is None:
+            return
+
+        self._close_file()
+        os.replace(self._part(self._current), self._current)
+        self.paths.append(self._current)
+        self._file = None
+
+    @staticmethod
+    def _part(path: Path) -> Path:
+        return path.with_name(path.name + ".part")
+
+    def _open(self, path: Path) -> IO[bytes]:
+        return open(path, "wb")
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def _size(self) -> int:
+        return self._file.tell() if self._file is not None else 0
+
+    @abc.abstractmethod
+    def _write(self, records: list[dict]) -> None:
+        """Write records to the open file."""
+
+
+class JsonLinesSink(FileSink):
+    """Writes one JSON record per line, optionally gzip-compressed."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        compress: bool = False,
+        rotate_bytes: int | None = None,
+        **kwargs,
+    ) -> None:
+        """
+        Initializes a new JsonLinesSink.
+
+        Args:
+            path (str | PathLike): The output file, e.g. "out.jsonl.gz".
+            compress (bool, optional): Gzip the output. Defaults to False.
+            rotate_bytes (int, optional): Start a new file after this many
+                (uncompressed) bytes. Defaults to a single file.
+            **kwargs: File numbering options (see FileSink).
+        """
+
+        super().__init__(path, rotate_bytes, **kwargs)
+        self.compress = compress
+        self._written = 0
+
+    def _open(self, path: Path) -> IO[bytes]:
+        self._written = 0
+        if self.compress:
+            return gzip.open(path, "wb")  # type: ignore[return-value]
+        return super()._open(path)
+
+    def _size(self) -> int:
+        return self._written
+
+    def _write(self, records: list[dict]) -> None:
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        ).encode()
+        self._file.write(data)  # type: ignore[union-attr]
+        self._written += len(data)
+
+
+class CsvSink(FileSink):
+    """Writes records as CSV rows with a column-to-path field mapping."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        fields: Mapping[str, str] | Sequence[str],
+        rotate_bytes: int | None = None,
+        **kwargs,
+    ) -> None:
+        """
+        Initializes a new CsvSink.
+
+        Args:
+            path (str | PathLike): The output file.
+            fields (Mapping[str, str] | Sequence[str]): Column name to dotted
+                path (see get_path), or a list of paths used as both.
+                Lists and dicts are written as JSON.
+            rotate_bytes (int, optional): Start a new file after this many
+                bytes. Defaults to a single file.
+            **kwargs: File numbering options (see FileSink).
+        """
+
+        super().__init__(path, rotate_bytes, **kwargs)
+        self.fields = (
+            dict(fields) if isinstance(fields, Mapping) else {f: f for f in fields}
+        )
+        self._text: io.TextIOWrapper | None = None
+        self._writer: Any = None
+
+    def _open(self, path: Path) -> IO[bytes]:
+        raw = super()._open(path)
+        self._text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        self._writer = csv.writer(self._text)
+        self._writer.writerow(self.fields)
+        return raw
+
+    def _close_file(self) -> None:
+        if self._text is not None:
+            self._text.close()
+            self._text = None
+
+    def flush(self) -> None:
+        if self._text is not None:
+            self._text.flush()
+
+    def _size(self) -> int:
+        if self._text is None:
+            return 0
+        self._text.flush()
+        return self._text.buffer.tell()
+
+    def _write(self, records: list[dict]) -> None:
+        for record in records:
+            self._writer.writerow(
+                _cell(get_path(record, path)) for path in self.fields.values()
+            )
+
+
+class ParquetSink(FileSink):
+    """
+    Writes records to Parquet files (requires the optional `pyarrow` package).
+
+    With a field mapping each column holds the value at a dotted path; lists
+    and dicts are stored as JSON strings. Without one, records are stored as
+    an `id` column and the full record as a JSON `entity` column.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        fields: Mapping[str, str] | Sequence[str] | None = None,
+        rotate_bytes: int | None = None,
+        **kwargs,
+    ) -> None:
+        """
+        Initializes a new ParquetSink.
+
+        Args:
+            path (str | PathLike): The output file.
+            fields (Mapping[str, str] | Sequence[str], optional): Column name
+                to dotted path. Defaults to `id` and JSON `entity` columns.
+            rotate_bytes (int, optional): Start a new file after this many
+                bytes. Defaults to a single file.
+            **kwargs: File numbering options (see FileSink).
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "ParquetSink requires pyarrow: pip install 'diffbot-kg[parquet]'"
+            ) from e
+
+        super().__init__(path, rotate_bytes, **kwargs)
+        if fields is None:
+            self.fields = None
+        else:
+            self.fields = (
+                dict(fields) if isinstance(fields, Mapping) else {f: f for f in fields}
+            )
+        self._writer: Any = None
+
+    def _open(self, path: Path) -> IO[bytes]:
+        raw = super()._open(path)
+        self._writer = None
+        return raw
+
+    def _close_file(self) -> None:
+        if self._writer is None and self._file is not None:
+            # Nothing was written: a 0-byte file is not valid Parquet.
+            self._write_table(self._empty_table())
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        super()._close_file()
+
+    def _empty_table(self) -> Any:
+        import pyarrow as pa
+
+        if self.fields is None:
+            schema = pa.schema([("id", pa.string()), ("entity", pa.string())])
+        else:
+            # Column types are inferred from the values, and there are none.
+            schema = pa.schema([(name, pa.null()) for name in self.fields])
+        return schema.empty_table()
+
+    def _write(self, records: list[dict]) -> None:
+        import pyarrow as pa
+
+        if self.fields is None:
+            columns = {
+                "id": [r.get("id") for r in records],
+                "entity": [json.dumps(r, ensure_ascii=False) for r in records],
+            }
+        else:
+            columns = {
+                name: [_column_value(get_path(r, path)) for r in records]
+                for name, path in self.fields.items()
+            }
+
+        self._write_table(pa.table(columns))
+
+    def _write_table(self, table: Any) -> None:
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._file, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+def _column_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+@dataclass
+class ExportStats:
+    """
+    The outcome of an export.
+
+    Attributes:
+        records (int): The number of records written.
+        batches (int): The number of sink writes.
+        files (list[Path]): The completed files, if the sink writes files.
+    """
+
+    records: int = 0
+    batches: int = 0
+    files: list[Path] | None = None
+
+
+class ExportPipeline:
+    """
+    Moves records from an async source into a sink in constant memory.
+
+    The source is consumed by a producer task into a bounded queue. When the
+    sink falls behind the queue fills up and the producer (and so the
+    pagination behind it) pauses until there is room again. Records are
+    written in batches from a worker thread, so slow disks do not block the
+    event loop, and the sink is flushed every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        batch_size: int = 500,
+        max_pending: int = 2000,
+        flush_interval: float = 5.0,
+    ) -> None:
+        """
+        Initializes a new ExportPipeline.
+
+        Args:
+            sink (Sink): The destination, e.g. a JsonLinesSink.
+            batch_size (int, optional): Maximum records per sink write.
+                Defaults to 500.
+            max_pending (int, optional): Maximum records buffered between
+                source and sink. Defaults to 2000.
+            flush_interval (float, optional): Seconds between flushes.
+                Defaults to 5.0.
+        """
+
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+
+    async def run(self, source: AsyncIterable[dict]) -> ExportStats:
+        """
+        Export every record of the source, then close the sink.
+
+        If the source or the sink fails, the sink is aborted (discarding the
+        incomplete file) and the error is raised.
+
+        Args:
+            source (AsyncIterable[dict]): The records, e.g. search_entities().
+
+        Returns:
+            ExportStats: The number of records and files written.
+        """
+
+        queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=self.max_pending)
+        stats = ExportStats()
+
+        async def produce() -> None:
+            async for record in source:
+                await queue.put(record)
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+
+        try:
+            done = False
+            while not done:
+                batch = await self._next_batch(queue, producer)
+                if batch and batch[-1] is None:
+                    batch.pop()
+                    done = True
+
+                if batch:
+                    await asyncio.to_thread(self.sink.write, batch)  # type: ignore[arg-type]
+                    stats.records += len(batch)
+                    stats.batches += 1
+
+                if loop.time() - last_flush >= self.flush_interval:
+                    await asyncio.to_thread(self.sink.flush)
+                    last_flush = loop.time()
+
+            await producer
+            await asyncio.to_thread(self.sink.close)
+        except BaseException:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            await asyncio.to_thread(self.sink.abort)
+            raise
+
+        stats.files = list(getattr(self.sink, "paths", [])) or None
+        log.debug("Exported %s records in %s batches", stats.records, stats.batches)
+        return stats
+
+    async def _next_batch(
+        self, queue: asyncio.Queue[dict | None], producer: asyncio.Task
+    ) -> list[dict | None]:
+        """Wait for one record, then take whatever else is ready up to batch_size."""
+
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait(
+            [getter, producer],
+            timeout=self.flush_interval,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+        if not getter.done():
+            getter.cancel()
+            if producer.done() and producer.exception() is not None:
+                raise producer.exception()  # type: ignore[misc]
+            return []
+
+        batch = [getter.result()]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+
+async def search_entities(
+    client: DiffbotSearchClient, params: dict, page_size: int = 50
+) -> AsyncIterator[dict]:
+    """
+    Page through a search sequentially, yielding one entity at a time.
+
+    Only one page is held at a time, so this source pairs with an
+    ExportPipeline for constant-memory exports. For very large result sets
+    use `DiffbotSearchClient.search_partitioned` as the source instead.
+
+    Args:
+        client (DiffbotSearchClient): The client.
+        params (dict): The search params; `from` sets the first offset.
+        page_size (int, optional): Entities per request. Defaults to 50.
+
+    Yields:
+        dict: The entities.
+    """
+
+    offset = params.get("from", 0)
+    while True:
+        with span(client.s.tracer, "page", offset=offset):
+            resp = await client.search({**params, "from": offset, "size": page_size})
+        entities = resp.entities
+        for entity in entities:
+            yield entity
+
+        offset += page_size
+        if not entities or offset >= resp.content.get("hits", 0):
+            return
+
+
+async def bulkjob_entities(
+    client: DiffbotEnhanceClient, bulkjobId: str
+) -> AsyncIterator[dict]:
+    """
+    Stream the entities of a completed bulk job, one result line at a time.
+
+    Args:
+        client (DiffbotEnhanceClient): The client.
+        bulkjobId (str): The ID of the bulk job.
+
+    Yields:
+        dict: The entities.
+    """
+
+    async for result in client.stream_bulkjob_results(bulkjobId):
+        for data in result.get("data") or []:
+            yield data["entity"]
@@ -0,0 +1,213 @@
+import json
+from typing import Any, Callable, Iterable, Iterator
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class EntityHandle:
+    """
+    A lightweight reference to an entity held by a compact EntityIndex.
+
+    The entity is decoded from the index on every access; keep the returned
+    dict only as long as it is needed.
+    """
+
+    __slots__ = ("_index", "id")
+
+    def __init__(self, index: "EntityIndex", entity_id: str) -> None:
+        self._index = index
+        self.id = entity_id
+
+    @property
+    def entity(self) -> dict:
+        """The current version of the entity."""
+
+        return self._index._load(self.id)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.entity[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.entity.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"EntityHandle({self.id!r})"
+
+
+class EntityIndex:
+    """
+    In-memory index of entities keyed by Diffbot id.
+
+    Adding an entity that is already indexed merges the two occurrences:
+    the newest one wins field by field, and with `union_lists` list fields
+    present in both are unioned. In the default mode the index hands out
+    one shared dict per id and merges updates into it in place, so every
+    holder sees the latest version. In compact mode each entity is stored
+    once as encoded JSON and the index hands out EntityHandles instead.
+    """
+
+    def __init__(
+        self,
+        union_lists: bool = False,
+        compact: bool = False,
+        timestamp: Callable[[dict], Any] | None = None,
+    ) -> None:
+        """
+        Initializes a new EntityIndex.
+
+        Args:
+            union_lists (bool, optional): Union list fields when merging.
+                Defaults to False.
+            compact (bool, optional): Store encoded entities and hand out
+                EntityHandles. Defaults to False.
+            timestamp (Callable[[dict], Any], optional): Returns a comparable
+                version of an entity, used to decide which occurrence is the
+                newest. Defaults to treating the last one added as newest.
+        """
+
+        self.union_lists = union_lists
+        self.compact = compact
+        self.timestamp = timestamp
+
+        self._entities: dict[str, dict | bytes] = {}
+        self._handles: dict[str, EntityHandle] = {}
+
+    def add(self, entity: dict) -> dict | EntityHandle:
+        """
+        Add an entity, merging it with any indexed occurrence.
+
+        Args:
+            entity (dict): The entity; it must have an `id`.
+
+        Returns:
+            dict | EntityHandle: The shared reference to the merged entity.
+
+        Raises:
+            KeyError: If the entity has no `id`.
+        """
+
+        entity_id = entity["id"]
+        existing = self._entities.get(entity_id)
+
+        if existing is None:
+            merged = entity
+        else:
+            current = self._decode(existing)
+            merged = self._merge(current, entity)
+            if not self.compact:
+                # Update in place so shared references see the merge.
+                current.clear()
+                current.update(merged)
+                merged = current
+
+        self._entities[entity_id] = self._encode(merged)
+        return self.ref(entity_id)
+
+    def add_many(self, entities: Iterable[dict]) -> list[dict | EntityHandle]:
+        """
+        Add several entities, e.g. `response.entities`.
+
+        Args:
+            entities (Iterable[dict]): The entities.
+
+        Returns:
+            list[dict | EntityHandle]: The shared references, in input order.
+        """
+
+        return [self.add(entity) for entity in entities]
+
+    def ref(self, entity_id: str) -> dict | EntityHandle:
+        """
+        Return the shared reference to an indexed entity.
+
+        Args:
+            entity_id (str): The Diffbot id.
+
+        Returns:
+            dict | EntityHandle: The entity dict, or its handle in compact mode.
+
+        Raises:
+            KeyError: If the id is not indexed.
+        """
+
+        stored = self._entities[entity_id]
+        if not self.compact:
+            return stored  # type: ignore[return-value]
+
+        if (handle := self._handles.get(entity_id)) is None:
+            handle = self._handles[entity_id] = EntityHandle(self, entity_id)
+        return handle
+
+    def get(self, entity_id: str) -> dict | None:
+        """
+        Return the entity with the given id, decoded in compact mode.
+
+        Args:
+            entity_id (str): The Diffbot id.
+
+        Returns:
+            dict | None: The entity, or None if it is not indexed.
+        """
+
+        stored = self._entities.get(entity_id)
+        return None if stored is None else self._decode(stored)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._entities
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entities)
+
+    def _load(self, entity_id: str) -> dict:
+        return self._decode(self._entities[entity_id])
+
+    def _encode(self, entity: dict) -> dict | bytes:
+        if self.compact:
+            return _json_encoder.encode(entity).encode()
+        return entity
+
+    def _decode(self, stored: dict | bytes) -> dict:
+        return json.loads(stored) if isinstance(stored, bytes) else stored
+
+    def _merge(self, current: dict, incoming: dict) -> dict:
+        if self.timestamp is not None and (
+            self.timestamp(incoming) < self.timestamp(current)
+        ):
+            older, newer = incoming, current
+        else:
+            older, newer = current, incoming
+
+        merged = {**older, **newer}
+
+        if self.union_lists:
+            for key, value in older.items():
+                if isinstance(value, list) and isinstance(newer.get(key), list):
+                    merged[key] = _union(newer[key], value)
+
+        return merged
+
+
+def _union(first: list, second: list) -> list:
+    seen = set()
+    result = []
+
+    for item in (*first, *second):
+        key = _item_key(item)
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+
+    return result
+
+
+def _item_key(item: Any) -> Any:
+    if isinstance(item, dict):
+        if isinstance(uri := item.get("diffbotUri"), str):
+            return ("uri", uri)
+        return ("json", _json_encoder.encode(item))
+    if isinstance(item, list):
+        return ("json", _json_encoder.encode(item))
+    return ("value", item)
@@ -0,0 +1,396 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, cast
+
+from diffbot_kg.bulkjob import FAILED_BULKJOB_STATES, BulkJobResultFile, InputKey
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk INTEGER PRIMARY KEY,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    inputs_hash TEXT,
+    job_id TEXT,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_count INTEGER,
+    result_bytes INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chunk INTEGER NOT NULL,
+    at REAL NOT NULL,
+    status TEXT NOT NULL,
+    job_id TEXT,
+    detail TEXT
+);
+"""
+
+SUBMITTING = "SUBMITTING"
+SUBMITTED = "SUBMITTED"
+COMPLETE = "COMPLETE"
+DOWNLOADED = "DOWNLOADED"
+FAILED = "FAILED"
+
+
+@dataclass
+class JournalChunk:
+    """One chunk of inputs and the bulk job it was submitted as."""
+
+    chunk: int
+    start: int
+    end: int
+    job_id: str | None
+    status: str
+    result_path: str | None = None
+    result_count: int | None = None
+    result_bytes: int | None = None
+    inputs_hash: str | None = None
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+class BulkJobJournal:
+    """
+    Write-ahead journal of a chunked bulk enhancement, in SQLite.
+
+    Every chunk is recorded with its input range before its bulk job is
+    created, and with the job id as soon as the job exists, so a crash never
+    loses track of a submitted (and paid-for) job. Status transitions are
+    appended to an event log, and downloaded results are recorded with their
+    file, line count and size.
+
+    Writes are committed one at a time in WAL mode with full sync, so the
+    journal survives a crash of the process or the host.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """
+        Opens a journal, creating it if needed.
+
+        Args:
+            path (str | PathLike): The SQLite database file. ":memory:" opens
+                a journal that does not survive the process, and so cannot
+                resume anything.
+        """
+
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+        if "inputs_hash" not in columns:
+            # Journals written before inputs were hashed.
+            self._db.execute("ALTER TABLE chunks ADD COLUMN inputs_hash TEXT")
+
+    def chunks(self) -> list[JournalChunk]:
+        """Return all recorded chunks, in input order."""
+
+        rows = self._db.execute(
+            "SELECT chunk, start, end, job_id, status, result_path, result_count,"
+            " result_bytes, inputs_hash FROM chunks ORDER BY chunk"
+        )
+        return [JournalChunk(*row) for row in rows]
+
+    def get(self, chunk: int) -> JournalChunk | None:
+        """Return a chunk by number, or None if it was never recorded."""
+
+        return next((c for c in self.chunks() if c.chunk == chunk), None)
+
+    def begin(
+        self, chunk: int, start: int, end: int, inputs_hash: str | None = None
+    ) -> None:
+        """
+        Record that a chunk is about to be submitted.
+
+        Args:
+            chunk (int): The chunk number.
+            start (int): The index of its first input.
+            end (int): The index after its last input.
+            inputs_hash (str, optional): A hash of the chunk's inputs, to
+                detect changed inputs on resume. Defaults to none.
+        """
+
+        with self._db:
+            self._db.execute(
+                "INSERT INTO chunks (chunk, start, end, inputs_hash, status,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (chunk)"
+                " DO UPDATE SET job_id = NULL, inputs_hash = excluded.inputs_hash,"
+                " status = excluded.status, updated_at = excluded.updated_at",
+                (chunk, start, end, inputs_hash, SUBMITTING, time.time()),
+            )
+            self._event(chunk, SUBMITTING, None, f"inputs {start}-{end}")
+
+    def submitted(self, chunk: int, job_id: str) -> None:
+        """Record the bulk job a chunk was submitted as."""
+
+        self.transition(chunk, SUBMITTED, job_id=job_id)
+
+    def downloaded(self, chunk: int, path: str | os.PathLike, count: int) -> None:
+        """
+        Record that a chunk's results are downloaded.
+
+        Args:
+            chunk (int): The chunk number.
+            path (str | PathLike): The results file.
+            count (int): The number of results (jobIdx slots) in the file.
+        """
+
+        size = Path(path).stat().st_size
+        with self._db:
+            self._db.execute(
+                "UPDATE chunks SET status = ?, result_path = ?, result_count = ?,"
+                " result_bytes = ?, updated_at = ? WHERE chunk = ?",
+                (DOWNLOADED, os.fspath(path), count, size, time.time(), chunk),
+            )
+            self._event(chunk, DOWNLOADED, None, f"{count} results, {size} bytes")
+
+    def transition(
+        self,
+        chunk: int,
+        status: str,
+        job_id: str | None = None,
+        detail: str | None = None,
+    ) -> None:
+        """
+        Record a status change of a chunk.
+
+        Args:
+            chunk (int): The chunk number.
+            status (str): The new status.
+            job_id (str, optional): Sets the bulk job id. Defaults to keeping it.
+            detail (str, optional): A note for the event log.
+        """
+
+        with self._db:
+            self._db.execute(
+                "UPDATE chunks SET status = ?, job_id = coalesce(?, job_id),"
+                " updated_at = ? WHERE chunk = ?",
+                (status, job_id, time.time(), chunk),
+            )
+            self._event(chunk, status, job_id, detail)
+
+    def events(self, chunk: int | None = None) -> list[tuple]:
+        """
+        Return the event log.
+
+        Args:
+            chunk (int, optional): Only the events of this chunk. Defaults to all.
+
+        Returns:
+            list[tuple]: (chunk, at, status, job_id, detail) per event, in order.
+        """
+
+        sql = "SELECT chunk, at, status, job_id, detail FROM events"
+        if chunk is None:
+            return list(self._db.execute(sql + " ORDER BY seq"))
+        return list(self._db.execute(sql + " WHERE chunk = ? ORDER BY seq", (chunk,)))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _event(
+        self, chunk: int, status: str, job_id: str | None, detail: str | None
+    ) -> None:
+        self._db.execute(
+            "INSERT INTO events (chunk, at, status, job_id, detail)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (chunk, time.time(), status, job_id, detail),
+        )
+
+
+class BulkEnhancer:
+    """
+    Crash-safe, resumable bulk enhancement of a sequence of inputs.
+
+    Inputs are split into chunks of `chunk_size`, each submitted as one bulk
+    job and journaled. Completed jobs are downloaded with offset indexes into
+    `directory`. Rerunning with the same inputs and journal reattaches to
+    the jobs already submitted (checking them with `list_bulkjobs`, then
+    `bulkjob_status`), downloads only the results still missing, and
+    resubmits only chunks whose job failed or was never created.
+
+    A chunk interrupted between recording SUBMITTING and receiving its job
+    id is resubmitted, as the journal cannot know whether the job exists.
+    """
+
+    def __init__(
+        self,
+        client: DiffbotEnhanceClient,
+        journal: BulkJobJournal,
+        directory: str | os.PathLike,
+        chunk_size: int = 500,
+        poll_interval: float = 10,
+        key: InputKey | None = None,
+    ) -> None:
+        """
+        Initializes a new BulkEnhancer.
+
+        Args:
+            client (DiffbotEnhanceClient): The client to submit jobs with.
+            journal (BulkJobJournal): The journal of this run.
+            directory (str | PathLike): Where to download the results.
+            chunk_size (int, optional): Inputs per bulk job. Defaults to 500.
+            poll_interval (float, optional): Seconds between status polls.
+                Defaults to 10.
+            key (str | Callable[[dict], Any], optional): An input param to
+                index the results by. Defaults to no key index.
+
+        Raises:
+            ValueError: If chunk_size is below one.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        self.client = client
+        self.journal = journal
+        self.directory = Path(directory)
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.key = key
+
+    async def run(self, inputs: Iterable[dict]) -> list[BulkJobResultFile]:
+        """
+        Enhance all inputs, resuming from the journal.
+
+        Args:
+            inputs (Iterable[dict]): The enhance params, in the same order on
+                every run.
+
+        Returns:
+            list[BulkJobResultFile]: The results of each chunk, in input order.
+
+        Raises:
+            ValueError: If a journaled chunk's inputs differ from this run's.
+            RuntimeError: If any bulk job failed; its chunk is resubmitted on
+                the next run, and the other chunks' results are kept.
+        """
+
+        journaled = {c.chunk: c for c in self.journal.chunks()}
+        await self._reattach(journaled)
+
+        entries = []
+        source = iter(inputs)
+        for chunk in itertools.count():
+            params = list(itertools.islice(source, self.chunk_size))
+            if not params:
+                break
+
+            entry = journaled.get(chunk)
+            inputs_hash = _hash_inputs(params)
+            if entry is not None and entry.size != len(params):
+                raise ValueError(
+                    f"Chunk {chunk} had {entry.size} inputs when journaled, now "
+                    f"{len(params)}; rerun with the same inputs and chunk_size"
+                )
+            if entry is not None and entry.inputs_hash not in (None, inputs_hash):
+                raise ValueError(
+                    f"Chunk {chunk} had different inputs when journaled; "
+                    "rerun with the same inputs, in the same order"
+                )
+            if entry is None or entry.status in (SUBMITTING, FAILED):
+                entry = await self._submit(chunk, params, inputs_hash)
+            entries.append(entry)
+
+        results = await asyncio.gather(
+            *(self._finish(entry) for entry in entries), return_exceptions=True
+        )
+
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            raise RuntimeError(f"{len(failed)} bulk jobs failed") from failed[0]
+        return cast(list[BulkJobResultFile], results)
+
+    async def _reattach(self, journaled: dict[int, JournalChunk]) -> None:
+        """Bring the journal up to date with jobs that ran while we were away."""
+
+        pending = {
+            c.job_id: c
+            for c in journaled.values()
+            if c.job_id is not None and c.status == SUBMITTED
+        }
+        if not pending:
+            return
+
+        listed = {}
+        try:
+            resp = await self.client.list_bulkjobs()
+            for line in resp.content:
+                job = line.get("content", line) if isinstance(line, dict) else {}
+                if "job_id" in job:
+                    listed[job["job_id"]] = job.get("status")
+        except Exception as e:
+            log.warning("Could not list bulk jobs, checking them one by one: %r", e)
+
+        for job_id, entry in pending.items():
+            state = listed.get(job_id)
+            if state is None:
+                status = await self.client.bulkjob_status(job_id)
+                state = status.content["content"].get("status")
+
+            if state == "COMPLETE":
+                self.journal.transition(entry.chunk, COMPLETE)
+                entry.status = COMPLETE
+            elif state in FAILED_BULKJOB_STATES:
+                self.journal.transition(entry.chunk, FAILED, detail=state)
+                entry.status = FAILED
+            log.info("Reattached to bulk job %s (%s)", job_id, state)
+
+    async def _submit(
+        self, chunk: int, params: list[dict], inputs_hash: str
+    ) -> JournalChunk:
+        start = chunk * self.chunk_size
+        end = start + len(params)
+        self.journal.begin(chunk, start, end, inputs_hash)
+
+        created = await self.client.create_bulkjob(params)
+        job_id = created.jobId
+        self.journal.submitted(chunk, job_id)
+        return JournalChunk(
+            chunk, start, end, job_id, SUBMITTED, inputs_hash=inputs_hash
+        )
+
+    async def _finish(self, entry: JournalChunk) -> BulkJobResultFile:
+        if entry.job_id is None:
+            raise RuntimeError(f"Chunk {entry.chunk} was journaled without a job id")
+
+        if entry.status == DOWNLOADED and entry.result_path:
+            path = Path(entry.result_path)
+            if path.exists() and BulkJobResultFile.index_path(path).exists():
+                return BulkJobResultFile(path)
+
+        if entry.status != COMPLETE:
+            status = await self.client.wait_for_bulkjob(
+                entry.job_id, interval=self.poll_interval
+            )
+            if not status.complete:
+                state = status.content["content"].get("status")
+                self.journal.transition(entry.chunk, FAILED, detail=state)
+                raise RuntimeError(f"Bulk job {entry.job_id} ended with status {state}")
+            self.journal.transition(entry.chunk, COMPLETE)
+
+        results = await self.client.download_bulkjob_results(
+            entry.job_id, self.directory, key=self.key
+        )
+        self.journal.downloaded(entry.chunk, results.path, len(results))
+        return results
+
+
+def _hash_inputs(params: list[dict]) -> str:
+    encoded = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
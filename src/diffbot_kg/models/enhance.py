@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+from diffbot_kg.models.response.entities import DiffbotEntitiesResponse
+
+
+@dataclass
+class EnhanceResult:
+    """
+    The outcome of one enhance call made by `DiffbotEnhanceClient.enhance_stream`.
+
+    Attributes:
+        index (int): The position of the params in the input stream.
+        params (dict): The enhance params.
+        response (DiffbotEntitiesResponse | None): The response, or None if
+            the call failed.
+        error (Exception | None): The error the call failed with, if any.
+    """
+
+    index: int
+    params: dict
+    response: DiffbotEntitiesResponse | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class EntityLookupResult:
+    """
+    The outcome of a batched lookup of entities by Diffbot id.
+
+    Attributes:
+        entities (dict[str, dict]): The entities found, keyed by the requested id.
+        missing (list[str]): The requested ids no entity was returned for,
+            in request order.
+        requests (int): The number of API requests made (0 if every id was
+            answered from the cache).
+    """
+
+    entities: dict[str, dict] = field(default_factory=dict)
+    missing: list[str] = field(default_factory=list)
+    requests: int = 0
@@ -3,6 +3,8 @@ from diffbot_kg.models.response.bulkjob_list import DiffbotListBulkJobsResponse
 from diffbot_kg.models.response.bulkjob_status import DiffbotBulkJobStatusResponse
 from diffbot_kg.models.response.coverage_report import DiffbotCoverageReportResponse
 from diffbot_kg.models.response.entities import DiffbotEntitiesResponse
+from diffbot_kg.models.response.facet import DiffbotFacetResponse
+from diffbot_kg.models.response.raw import RawDiffbotResponse
 
 __all__ = [
     DiffbotEntitiesResponse.__name__,
@@ -10,4 +12,6 @@ __all__ = [
     DiffbotBulkJobCreateResponse.__name__,
     DiffbotListBulkJobsResponse.__name__,
     DiffbotBulkJobStatusResponse.__name__,
+    DiffbotFacetResponse.__name__,
+    RawDiffbotResponse.__name__,
 ]  # type: ignore
@@ -1,6 +1,11 @@
 import json
 import logging
-from typing import Any, Self, cast
+import mmap
+import tempfile
+import weakref
+from array import array
+from collections.abc import Sequence
+from typing import IO, Any, AsyncIterable, AsyncIterator, Iterator, Self, cast, overload
 
 import aiohttp
 from multidict import CIMultiDictProxy
@@ -8,30 +13,254 @@ from multidict import CIMultiDictProxy
 log = logging.getLogger(__name__)
 
 
+async def aiter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a stream of body chunks into lines of any length, without newlines."""
+
+    pending: list[bytes] = []
+    async for chunk in chunks:
+        first, *rest = chunk.split(b"\n")
+        pending.append(first)
+        if not rest:
+            continue
+
+        yield b"".join(pending)
+        for line in rest[:-1]:
+            yield line
+        pending = [rest[-1]]
+
+    if tail := b"".join(pending):
+        yield tail
+
+
+async def read_body(
+    resp: aiohttp.ClientResponse,
+    spill_threshold: int | None = None,
+    spill_dir: str | None = None,
+) -> bytes | IO[bytes]:
+    """
+    Read a response body, spilling it to a temporary file once it grows
+    beyond a threshold.
+
+    Args:
+        resp (aiohttp.ClientResponse): The response.
+        spill_threshold (int, optional): Size in bytes above which to spill.
+            Defaults to never.
+        spill_dir (str, optional): Directory for the temporary file.
+            Defaults to the system temporary directory.
+
+    Returns:
+        bytes | IO[bytes]: The body, or the temporary file holding it
+            (positioned at its end, deleted once closed).
+    """
+
+    if spill_threshold is None:
+        return await resp.read()
+
+    chunks: list[bytes] = []
+    buffered = 0
+    file: IO[bytes] | None = None
+
+    try:
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            if file is not None:
+                file.write(chunk)
+                continue
+
+            chunks.append(chunk)
+            buffered += len(chunk)
+            if buffered > spill_threshold:
+                file = tempfile.TemporaryFile(dir=spill_dir)  # noqa: SIM115
+                file.writelines(chunks)
+                chunks.clear()
+    except BaseException:
+        if file is not None:
+            file.close()
+        raise
+
+    if file is None:
+        return b"".join(chunks)
+
+    log.debug("Spilled %s byte response body to disk", file.tell())
+    file.flush()
+    return file
+
+
+def _close_mapped(mapped: mmap.mmap | None, file: IO[bytes]) -> None:
+    if mapped is not None:
+        mapped.close()
+    file.close()
+
+
+class MappedJsonLines(Sequence[dict[str, Any]]):
+    """
+    A JSON-lines body spilled to a file and memory-mapped.
+
+    Lines are decoded on access, so only the records in use are held in
+    memory. The byte offset of each line is indexed on first random access
+    (8 bytes per line); iterating does not need the index.
+
+    Close it (or use it as a context manager) to unmap and delete the file;
+    a finalizer does so once it is garbage collected.
+    """
+
+    def __init__(self, file: IO[bytes]) -> None:
+        """
+        Initializes a new MappedJsonLines.
+
+        Args:
+            file (IO[bytes]): The body, e.g. a TemporaryFile. It is closed
+                (and so deleted, if temporary) by close().
+        """
+
+        self._file = file
+        size = file.seek(0, 2)
+        self._map = (
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        self._offsets: array | None = None
+        self._finalizer = weakref.finalize(self, _close_mapped, self._map, file)
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[dict[str, Any]]: ...
+
+    def __getitem__(self, index):
+        offsets = self._index()
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(offsets) // 2))]
+
+        if index < 0:
+            index += len(offsets) // 2
+        if not 0 <= index < len(offsets) // 2:
+            raise IndexError("line index out of range")
+
+        return json.loads(self._map[offsets[2 * index] : offsets[2 * index + 1]])  # type: ignore[index]
+
+    def __len__(self) -> int:
+        return len(self._index()) // 2
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for start, end in self._lines():
+            yield json.loads(self._map[start:end])  # type: ignore[index]
+
+    @property
+    def closed(self) -> bool:
+        """Whether the file has been closed."""
+
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """Unmap and close the underlying file."""
+
+        self._finalizer()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _index(self) -> array:
+        if self._offsets is None:
+            self._offsets = array("Q")
+            for start, end in self._lines():
+                self._offsets.extend((start, end))
+        return self._offsets
+
+    def _lines(self) -> Iterator[tuple[int, int]]:
+        """The (start, end) offsets of the non-blank lines."""
+
+        if self._map is None:
+            return
+
+        pos, size = 0, len(self._map)
+        while pos < size:
+            end = self._map.find(b"\n", pos)
+            end = size if end == -1 else end
+            if self._map[pos:end].strip():
+                yield pos, end
+            pos = end + 1
+
+
 class BaseDiffbotResponse:
     def __init__(
         self,
         status: int,
         headers: CIMultiDictProxy[str],
-        content: dict[str, Any] | list[dict[str, Any]] | str,
+        content: dict[str, Any] | Sequence[dict[str, Any]] | str,
     ):
         self.status = status
         self.headers = headers
         self.content = content
 
     @classmethod
-    async def create(cls, resp: aiohttp.ClientResponse) -> Self:
-        """Unpack an aiohttp response object and return a BaseDiffbotResponse instance."""
+    async def create(
+        cls,
+        resp: aiohttp.ClientResponse,
+        spill_threshold: int | None = None,
+        spill_dir: str | None = None,
+    ) -> Self:
+        """
+        Unpack an aiohttp response object and return a BaseDiffbotResponse instance.
+
+        JSON-lines bodies (bulk job results) larger than `spill_threshold`
+        bytes are written to a temporary file while they download instead
+        of being held in memory, and kept on disk as a MappedJsonLines that
+        decodes lines on access; close the response to delete the file.
+        Single JSON documents and text cannot be decoded without holding
+        them in memory, so they are never spilled.
+
+        Args:
+            resp (aiohttp.ClientResponse): The response.
+            spill_threshold (int, optional): JSON-lines body size above which
+                to spill to disk. Defaults to never.
+            spill_dir (str, optional): Directory for the temporary files.
+                Defaults to the system temporary directory.
+        """
 
         if resp.content_type == "application/json":
             content = await resp.json()
         elif resp.content_type == "application/json-lines":
-            text = await resp.text()
-            content = [json.loads(line) for line in text.strip().split("\n")]
+            return await cls._create_json_lines(resp, spill_threshold, spill_dir)
         else:
             content = await resp.text()
         return cls(resp.status, resp.headers, content)
 
+    @classmethod
+    async def _create_json_lines(
+        cls,
+        resp: aiohttp.ClientResponse,
+        spill_threshold: int | None,
+        spill_dir: str | None,
+    ) -> Self:
+        if spill_threshold is None or (
+            resp.content_length is not None and resp.content_length <= spill_threshold
+        ):
+            text = await resp.text()
+            content = [json.loads(line) for line in text.strip().split("\n")]
+            return cls(resp.status, resp.headers, content)
+
+        body = await read_body(resp, spill_threshold, spill_dir)
+        if not isinstance(body, bytes):
+            return cls(resp.status, resp.headers, MappedJsonLines(body))
+
+        lines = [json.loads(line) for line in body.strip().split(b"\n")]
+        return cls(resp.status, resp.headers, lines)
+
+    def close(self) -> None:
+        """Delete a spilled body's temporary file, if any."""
+
+        if isinstance(self.content, MappedJsonLines):
+            self.content.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
 
 class BaseJsonDiffbotResponse(BaseDiffbotResponse):
     def __init__(
@@ -44,11 +273,14 @@ class BaseJsonDiffbotResponse(BaseDiffbotResponse):
 
 class BaseJsonLinesDiffbotResponse(BaseDiffbotResponse):
     def __init__(
-        self, status: int, headers: CIMultiDictProxy[str], content: list[dict[str, Any]]
+        self,
+        status: int,
+        headers: CIMultiDictProxy[str],
+        content: Sequence[dict[str, Any]],
     ):
         super().__init__(status, headers, content)
 
-        self.content = cast(list[dict[str, Any]], content)
+        self.content = cast(Sequence[dict[str, Any]], content)
 
 
 class BaseTextDiffbotResponse(BaseDiffbotResponse):
@@ -1,5 +1,214 @@
-from diffbot_kg.models.response.base import BaseTextDiffbotResponse
+import csv
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from diffbot_kg.models.response.base import BaseTextDiffbotResponse, aiter_lines
+
+_PERCENT_MARKERS = ("%", "percent", "coverage")
+
+
+@dataclass(frozen=True)
+class CoverageRow:
+    """
+    One row of a coverage report.
+
+    Attributes:
+        field (str): The field the row describes (first column).
+        counts (dict[str, int]): Integer columns, by column name.
+        percentages (dict[str, float]): Percentage and ratio columns, by
+            column name, with any "%" sign stripped.
+        extra (dict[str, str]): Non-numeric columns, by column name.
+    """
+
+    field: str
+    counts: dict[str, int] = field(default_factory=dict)
+    percentages: dict[str, float] = field(default_factory=dict)
+    extra: dict[str, str] = field(default_factory=dict)
+
+
+class CoverageRowParser:
+    """Turns the CSV cells of a coverage report into CoverageRows."""
+
+    def __init__(self) -> None:
+        self.header: list[str] | None = None
+
+    def parse(self, cells: list[str]) -> CoverageRow | None:
+        """
+        Parse one CSV record.
+
+        Args:
+            cells (list[str]): The cells of the record.
+
+        Returns:
+            CoverageRow | None: The row, or None for the header and blank lines.
+        """
+
+        if not cells or not any(c.strip() for c in cells):
+            return None
+
+        if self.header is None:
+            self.header = [c.strip() for c in cells]
+            return None
+
+        row = CoverageRow(cells[0].strip())
+        for name, raw in zip(self.header[1:], cells[1:], strict=False):
+            value = raw.strip()
+            percent_column = any(m in name.lower() for m in _PERCENT_MARKERS)
+
+            if value.endswith("%"):
+                row.percentages[name] = float(value[:-1])
+            elif not percent_column and value.lstrip("-").isdigit():
+                row.counts[name] = int(value)
+            else:
+                try:
+                    row.percentages[name] = float(value)
+                except ValueError:
+                    row.extra[name] = value
+
+        return row
+
+
+def iter_coverage_rows(lines: Iterable[str]) -> Iterator[CoverageRow]:
+    """
+    Parse coverage report rows from an iterable of CSV lines.
+
+    Args:
+        lines (Iterable[str]): The lines, e.g. an open file.
+
+    Yields:
+        CoverageRow: The rows after the header.
+    """
+
+    parser = CoverageRowParser()
+    for cells in csv.reader(lines):
+        if (row := parser.parse(cells)) is not None:
+            yield row
+
+
+async def aiter_coverage_rows(
+    chunks: AsyncIterable[bytes], encoding: str = "utf-8"
+) -> AsyncIterator[CoverageRow]:
+    """
+    Parse coverage report rows from an async stream of body chunks.
+
+    Chunks are split into lines of any length, and lines are joined until
+    their quotes balance, so quoted fields may span lines. Only the current
+    record is held in memory.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The body, e.g. `content.iter_any()` of
+            an aiohttp response.
+        encoding (str, optional): The body encoding. Defaults to utf-8.
+
+    Yields:
+        CoverageRow: The rows after the header.
+    """
+
+    parser = CoverageRowParser()
+    record: list[str] = []
+    quotes = 0
+    async for line in aiter_lines(chunks):
+        text = line.decode(encoding)
+        record.append(text + "\n")
+        # Quotes are escaped by doubling, so an odd count means an open field.
+        quotes += text.count('"')
+        if quotes % 2:
+            continue
+
+        for cells in csv.reader(record):
+            if (row := parser.parse(cells)) is not None:
+                yield row
+        record, quotes = [], 0
+
+    for cells in csv.reader(record):
+        if (row := parser.parse(cells)) is not None:
+            yield row
+
+
+class CoverageSummary:
+    """
+    Running aggregates over coverage rows, built without keeping the rows.
+
+    Attributes:
+        fields (int): The number of rows seen.
+        totals (dict[str, int]): The sum of each count column.
+        percentages (dict[str, dict[str, float]]): Each percentage column by field.
+    """
+
+    def __init__(self, rows: Iterable[CoverageRow] = ()) -> None:
+        self.fields = 0
+        self.totals: dict[str, int] = {}
+        self.percentages: dict[str, dict[str, float]] = {}
+
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: CoverageRow) -> None:
+        """Fold a row into the aggregates."""
+
+        self.fields += 1
+        for name, count in row.counts.items():
+            self.totals[name] = self.totals.get(name, 0) + count
+        for name, pct in row.percentages.items():
+            self.percentages.setdefault(name, {})[row.field] = pct
+
+    def mean(self, column: str) -> float:
+        """
+        Return the mean of a percentage column.
+
+        Args:
+            column (str): The column name.
+
+        Returns:
+            float: The mean, or 0.0 if the column is empty.
+        """
+
+        values = self.percentages.get(column, {})
+        return sum(values.values()) / len(values) if values else 0.0
+
+    def below(self, column: str, threshold: float) -> dict[str, float]:
+        """
+        Return the fields whose percentage column is below a threshold.
+
+        Args:
+            column (str): The column name.
+            threshold (float): The threshold.
+
+        Returns:
+            dict[str, float]: The matching fields, lowest first.
+        """
+
+        values = self.percentages.get(column, {})
+        return {
+            f: v for f, v in sorted(values.items(), key=lambda i: i[1]) if v < threshold
+        }
+
+    def lowest(self, column: str, n: int = 10) -> list[tuple[str, float]]:
+        """
+        Return the n fields with the lowest percentage column.
+
+        Args:
+            column (str): The column name.
+            n (int, optional): The number of fields. Defaults to 10.
+
+        Returns:
+            list[tuple[str, float]]: (field, percentage) pairs, lowest first.
+        """
+
+        values = self.percentages.get(column, {})
+        return sorted(values.items(), key=lambda i: i[1])[:n]
 
 
 class DiffbotCoverageReportResponse(BaseTextDiffbotResponse):
-    pass
+    """DiffbotCoverageReportResponse holds a coverage report as CSV text.
+
+    Provides typed row iteration and aggregates over the text. To parse a
+    large report without holding its text, use the `stream_...` coverage
+    report methods of the clients instead.
+    """
+
+    def rows(self) -> Iterator[CoverageRow]:
+        return iter_coverage_rows(self.content.splitlines())
+
+    def summary(self) -> CoverageSummary:
+        return CoverageSummary(self.rows())
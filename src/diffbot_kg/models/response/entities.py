@@ -21,6 +21,5 @@ class DiffbotEntitiesResponse(BaseJsonDiffbotResponse):
 
     @property
     def entities(self) -> List[dict]:
-        # Note: this class/method will not be compatible with facet queries
-        # (no entities returned)
+        # Note: facet queries return no entities; see DiffbotFacetResponse
         return [d["entity"] for d in self.data]
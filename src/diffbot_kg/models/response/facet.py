@@ -0,0 +1,95 @@
+from collections import Counter
+from typing import Iterable, Iterator, List
+
+from diffbot_kg.models.response.base import BaseJsonDiffbotResponse
+
+_VALUE_KEYS = ("value", "key", "name")
+
+
+class DiffbotFacetResponse(BaseJsonDiffbotResponse):
+    """DiffbotFacetResponse represents the response to a DQL facet query.
+
+    It contains the response status, headers, and JSON content. Provides
+    convenience properties to access the facet buckets and their counts
+    instead of entities.
+
+    The create classmethod is the main constructor, which handles converting
+    an aiohttp response into a DiffbotResponse.
+    """
+
+    @property
+    def buckets(self) -> List[dict]:
+        return self.content.get("data", [])
+
+    @property
+    def counts(self) -> dict[str, int]:
+        counts = {}
+        for bucket in self.buckets:
+            value = next((bucket[k] for k in _VALUE_KEYS if k in bucket), None)
+            counts[str(value)] = int(bucket.get("count", 0))
+        return counts
+
+
+class FacetTable:
+    """
+    Compact value-count tables for several facet fields.
+
+    Counts for the same field and value from several queries are summed.
+    """
+
+    def __init__(self) -> None:
+        self.tables: dict[str, Counter[str]] = {}
+
+    def add(self, field: str, counts: dict[str, int]) -> None:
+        """
+        Merge the counts of one facet query into the table of a field.
+
+        Args:
+            field (str): The faceted field.
+            counts (dict[str, int]): The count per value.
+        """
+
+        self.tables.setdefault(field, Counter()).update(counts)
+
+    def __getitem__(self, field: str) -> Counter[str]:
+        return self.tables[field]
+
+    def __contains__(self, field: object) -> bool:
+        return field in self.tables
+
+    def total(self, field: str) -> int:
+        """Return the sum of all counts of a field."""
+
+        return sum(self.tables.get(field, Counter()).values())
+
+    def top(self, field: str, n: int = 10) -> list[tuple[str, int]]:
+        """Return the n most common values of a field."""
+
+        return self.tables.get(field, Counter()).most_common(n)
+
+    def rows(self) -> Iterator[tuple[str, str, int]]:
+        """Yield (field, value, count) rows, most common first per field."""
+
+        for field, counts in self.tables.items():
+            for value, count in counts.most_common():
+                yield field, value, count
+
+    @classmethod
+    def from_responses(
+        cls, pairs: Iterable[tuple[str, DiffbotFacetResponse]]
+    ) -> "FacetTable":
+        """
+        Build a table from (field, response) pairs.
+
+        Args:
+            pairs (Iterable[tuple[str, DiffbotFacetResponse]]): The responses
+                by faceted field.
+
+        Returns:
+            FacetTable: The merged table.
+        """
+
+        table = cls()
+        for field, resp in pairs:
+            table.add(field, resp.counts)
+        return table
@@ -0,0 +1,83 @@
+from typing import IO, Iterator, Self
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from diffbot_kg.models.response.base import BaseDiffbotResponse, read_body
+
+
+class RawDiffbotResponse(BaseDiffbotResponse):
+    """RawDiffbotResponse holds a response body exactly as it was received.
+
+    Returned by client methods called with `raw=True`. The body is never
+    decoded: `body` gives the bytes, and `iter_chunks()` copies it out in
+    chunks, e.g. into object storage. Bodies above the session's spill
+    threshold are kept in a temporary file rather than in memory.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: CIMultiDictProxy[str],
+        content: bytes | IO[bytes],
+    ):
+        super().__init__(status, headers, content)  # type: ignore[arg-type]
+
+        self.content = content
+
+    @classmethod
+    async def create(
+        cls,
+        resp: aiohttp.ClientResponse,
+        spill_threshold: int | None = None,
+        spill_dir: str | None = None,
+    ) -> Self:
+        """Read an aiohttp response body without decoding it."""
+
+        body = await read_body(resp, spill_threshold, spill_dir)
+        return cls(resp.status, resp.headers, body)
+
+    @property
+    def content_type(self) -> str | None:
+        return self.headers.get("Content-Type")
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the body is held in a temporary file."""
+
+        return not isinstance(self.content, bytes)
+
+    @property
+    def body(self) -> bytes:
+        if isinstance(self.content, bytes):
+            return self.content
+
+        self.content.seek(0)
+        return self.content.read()
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Yield the body in chunks, reading a spilled body from disk.
+
+        Args:
+            chunk_size (int, optional): Bytes per chunk. Defaults to 64 KiB.
+
+        Yields:
+            bytes: The chunks.
+        """
+
+        if isinstance(self.content, bytes):
+            view = memoryview(self.content)
+            for i in range(0, len(view), chunk_size):
+                yield bytes(view[i : i + chunk_size])
+            return
+
+        self.content.seek(0)
+        while chunk := self.content.read(chunk_size):
+            yield chunk
+
+    def close(self) -> None:
+        """Delete a spilled body's temporary file."""
+
+        if not isinstance(self.content, bytes):
+            self.content.close()
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from datetime import date
+from itertools import pairwise
+from typing import Iterable, Protocol
+
+from diffbot_kg import dql
+
+
+class Partition(Protocol):
+    """A disjoint slice of a query's result set."""
+
+    def clause(self) -> str:
+        """Return the DQL clause that restricts a query to this partition."""
+        ...
+
+    def split(self) -> list["Partition"]:
+        """Return disjoint sub-partitions covering this one, or [] if it cannot be split."""
+        ...
+
+
+@dataclass(frozen=True)
+class RangePartition:
+    """
+    A half-open range `start <= field < end` over a numeric or date field.
+
+    Either bound may be None for an open-ended range; open-ended ranges cannot
+    be split. Integer and date ranges stop splitting at a width of one;
+    float ranges stop at `min_width`.
+    """
+
+    field: str
+    start: int | float | date | None
+    end: int | float | date | None
+    min_width: float = 1e-9
+
+    def clause(self) -> str:
+        clauses = []
+        if self.start is not None:
+            clauses.append(f"{self.field}>={_literal(self.start)}")
+        if self.end is not None:
+            clauses.append(f"{self.field}<{_literal(self.end)}")
+        return " ".join(clauses)
+
+    def split(self) -> list["Partition"]:
+        if self.start is None or self.end is None:
+            return []
+
+        mid = _midpoint(self.start, self.end, self.min_width)
+        if mid is None:
+            return []
+
+        return [
+            RangePartition(self.field, self.start, mid, self.min_width),
+            RangePartition(self.field, mid, self.end, self.min_width),
+        ]
+
+
+@dataclass(frozen=True)
+class ValueSetPartition:
+    """A set of exact values of a field, e.g. taken from a facet query."""
+
+    field: str
+    values: tuple[str, ...]
+
+    def clause(self) -> str:
+        return dql.or_clause(self.field, self.values)
+
+    def split(self) -> list["Partition"]:
+        if len(self.values) < 2:
+            return []
+
+        half = len(self.values) // 2
+        return [
+            ValueSetPartition(self.field, self.values[:half]),
+            ValueSetPartition(self.field, self.values[half:]),
+        ]
+
+
+def range_partitions(
+    field: str,
+    start: int | float | date,
+    end: int | float | date,
+    count: int,
+    open_ended: bool = False,
+) -> list[Partition]:
+    """
+    Split the range `start <= field < end` into `count` equal partitions.
+
+    Args:
+        field (str): The numeric or date field, e.g. "foundingDate".
+        start (int | float | date): The inclusive lower bound.
+        end (int | float | date): The exclusive upper bound.
+        count (int): The number of partitions.
+        open_ended (bool, optional): Also add `field < start` and
+            `field >= end` partitions so every entity with the field is
+            covered. Defaults to False.
+
+    Returns:
+        list[Partition]: The partitions in ascending order.
+
+    Raises:
+        ValueError: If count is below one or the range is empty.
+    """
+
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    if not start < end:  # type: ignore[operator]
+        raise ValueError("start must be below end")
+
+    bounds = [_interpolate(start, end, i / count) for i in range(count)] + [end]
+    bounds = sorted(set(bounds))  # type: ignore[type-var]
+
+    parts: list[Partition] = [
+        RangePartition(field, lo, hi) for lo, hi in pairwise(bounds)
+    ]
+    if open_ended:
+        parts = [
+            RangePartition(field, None, start),
+            *parts,
+            RangePartition(field, end, None),
+        ]
+
+    return parts
+
+
+def value_partitions(
+    field: str, values: Iterable[str], per_partition: int = 1
+) -> list[Partition]:
+    """
+    Group the values of a field into partitions.
+
+    Entities that have none of the values (or lack the field) are not
+    covered by any partition.
+
+    Args:
+        field (str): The field, e.g. "location.country.name".
+        values (Iterable[str]): The values, e.g. the buckets of a facet query.
+        per_partition (int, optional): Values per partition. Defaults to 1.
+
+    Returns:
+        list[Partition]: The partitions.
+    """
+
+    values = list(dict.fromkeys(values))
+    return [
+        ValueSetPartition(field, tuple(values[i : i + per_partition]))
+        for i in range(0, len(values), per_partition)
+    ]
+
+
+def _literal(value: int | float | date) -> str:
+    if isinstance(value, date):
+        return dql.quote(value.isoformat())
+    return repr(value)
+
+
+def _interpolate(start, end, fraction: float):
+    if isinstance(start, date):
+        days = (end - start).days
+        return date.fromordinal(start.toordinal() + int(days * fraction))
+    if isinstance(start, int) and isinstance(end, int):
+        return start + int((end - start) * fraction)
+    return start + (end - start) * fraction
+
+
+def _midpoint(start, end, min_width: float):
+    if isinstance(start, date):
+        days = (end - start).days
+        return None if days < 2 else date.fromordinal(start.toordinal() + days // 2)
+    if isinstance(start, int) and isinstance(end, int):
+        return None if end - start < 2 else start + (end - start) // 2
+    return None if end - start < 2 * min_width else start + (end - start) / 2
@@ -0,0 +1,432 @@
+"""
+Credit-budget pacing for long-running backfills.
+
+A QuotaScheduler spreads the credits spent by batch and background work
+evenly over each quota window (e.g. a daily and a monthly cap), so that a
+backfill neither exhausts the quota early in the window nor finishes later
+than it has to. Interactive requests are never delayed, but their credits
+count against the same budgets.
+
+    quota = QuotaScheduler(
+        [QuotaWindow(100_000, DAY), QuotaWindow(2_000_000, 30 * DAY)]
+    )
+    search = DiffbotSearchClient(token, priority="batch")
+    resp = await quota.search(search, {"query": "type:Organization", "size": 50})
+    print(quota.report(remaining=1_500_000).eta)
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import AsyncIterator, Iterable
+
+import aiohttp
+
+from diffbot_kg.clients.base import LOCAL_HEADER
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.scheduler import Priority, current_priority, request_priority
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.clients.session import RetryableException, URLTooLongException
+from diffbot_kg.models.response import (
+    DiffbotBulkJobCreateResponse,
+    DiffbotEntitiesResponse,
+)
+from diffbot_kg.models.response.base import BaseDiffbotResponse
+
+log = logging.getLogger(__name__)
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+# Raised for an error response from the API, which bills no entities.
+_UNBILLED_ERRORS = (
+    aiohttp.ClientResponseError,
+    RetryableException,
+    URLTooLongException,
+)
+
+
+@dataclass
+class QuotaWindow:
+    """
+    A credit budget that renews every `period` seconds.
+
+    Attributes:
+        credits (float): The credits available per window.
+        period (float | timedelta): The window length, in seconds if a
+            number (e.g. DAY).
+        start (float): The Unix time a window starts at; later windows
+            follow back to back. Defaults to now.
+        spent (float): Credits already spent in the current window, e.g.
+            as reported by the account dashboard when resuming. Defaults to 0.
+    """
+
+    credits: float
+    period: float
+    start: float = field(default_factory=time.time)
+    spent: float = 0.0
+
+    def __post_init__(self) -> None:
+        if isinstance(self.period, timedelta):
+            self.period = self.period.total_seconds()
+        if self.credits <= 0 or self.period <= 0:
+            raise ValueError("credits and period must be positive")
+
+    def roll(self, now: float) -> None:
+        """Start a new window if the current one has ended."""
+
+        if now >= self.start + self.period:
+            self.start += (now - self.start) // self.period * self.period
+            self.spent = 0.0
+
+    @property
+    def end(self) -> float:
+        return self.start + self.period
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """
+    Estimated credits per operation.
+
+    The defaults follow Diffbot's per-entity pricing of Knowledge Graph
+    searches and enhance matches; set them to your plan's prices.
+
+    Attributes:
+        per_entity (float): Credits per entity returned by a search, per
+            enhance match, and per bulk job input. Defaults to 25.
+        per_request (float): Credits per request. Defaults to 0.
+    """
+
+    per_entity: float = 25
+    per_request: float = 0
+
+    def entities(self, n: int) -> float:
+        return self.per_request + n * self.per_entity
+
+
+@dataclass(frozen=True)
+class QuotaReport:
+    """
+    Spending and projected completion of paced work.
+
+    Attributes:
+        spent (list[float]): Credits spent in the current window, per window.
+        remaining (list[float]): Credits left in the current window, per window.
+        rate (float): The paced spend rate, in credits per second.
+        eta (datetime | None): When the given remaining work would be done at
+            that rate, or None if no remaining work was given.
+    """
+
+    spent: list[float]
+    remaining: list[float]
+    rate: float
+    eta: datetime | None
+
+
+class Charge:
+    """A reservation of estimated credits, settled with the actual cost."""
+
+    def __init__(self, scheduler: "QuotaScheduler", estimate: float) -> None:
+        self.scheduler = scheduler
+        self.estimate = estimate
+        self.actual: float | None = None
+
+    def settle(self, actual: float) -> None:
+        """Replace the estimate with the actual cost."""
+
+        self.actual = actual
+
+
+class QuotaScheduler:
+    """
+    Paces batch and background operations to spend credit budgets evenly.
+
+    Before a paced operation, its cost is estimated and the call waits until
+    every window's spending so far is at or below an even spend line: the
+    window's credits times the elapsed fraction of the window, plus a small
+    burst allowance. An operation that no longer fits a window's budget
+    waits for the next window. Paced operations are admitted one at a time,
+    in order. Once the response arrives, the estimate is replaced by the
+    actual cost, taken from a usage header if configured, or from the number
+    of entities returned. Responses answered from a client's local store
+    cost nothing.
+
+    Operations of the interactive class are admitted immediately. The
+    interactive share of each budget is set aside with `interactive_reserve`.
+    """
+
+    def __init__(
+        self,
+        windows: Iterable[QuotaWindow],
+        costs: CostModel | None = None,
+        burst: float = 0.01,
+        interactive_reserve: float = 0.1,
+        usage_header: str | None = None,
+        paced: Iterable[Priority | str] = (Priority.BATCH, Priority.BACKGROUND),
+    ) -> None:
+        """
+        Initializes a new QuotaScheduler.
+
+        Args:
+            windows (Iterable[QuotaWindow]): The budgets, e.g. daily and monthly.
+            costs (CostModel, optional): The cost estimates. Defaults to CostModel().
+            burst (float, optional): The share of each window's credits that
+                may be spent ahead of the even line. Defaults to 0.01.
+            interactive_reserve (float, optional): The share of each window's
+                credits kept for interactive requests. Defaults to 0.1.
+            usage_header (str, optional): A response header holding the
+                credits a request actually used. Defaults to estimating from
+                the result count.
+            paced (Iterable[Priority | str], optional): The priority classes
+                to pace. Defaults to batch and background.
+
+        Raises:
+            ValueError: If no window is given or a share is out of range.
+        """
+
+        self.windows = list(windows)
+        if not self.windows:
+            raise ValueError("at least one quota window is required")
+        if not 0 <= burst < 1 or not 0 <= interactive_reserve < 1:
+            raise ValueError("burst and interactive_reserve must be in [0, 1)")
+
+        self.costs = costs or CostModel()
+        self.burst = burst
+        self.interactive_reserve = interactive_reserve
+        self.usage_header = usage_header
+        self.paced = {Priority(p) for p in paced}
+
+        self._lock = asyncio.Lock()
+
+    @contextlib.asynccontextmanager
+    async def spend(
+        self, estimate: float, priority: Priority | str | None = None
+    ) -> AsyncIterator[Charge]:
+        """
+        Reserve credits for an operation, waiting for budget if it is paced.
+
+        The estimate is counted when the block is entered; call
+        `charge.settle(actual)` inside the block to correct it. An operation
+        that fails with an error response from the API is charged only
+        `CostModel.per_request`; one that fails otherwise (e.g. a dropped
+        connection, whose request may have been billed) is still charged its
+        estimate unless settled.
+
+        Args:
+            estimate (float): The estimated credits.
+            priority (Priority | str, optional): The operation's class.
+                Defaults to the priority of the current context.
+
+        Yields:
+            Charge: The reservation.
+
+        Raises:
+            ValueError: If the estimate exceeds a whole window's budget.
+        """
+
+        priority = Priority(priority) if priority else current_priority()
+        if priority in self.paced:
+            async with self._lock:
+                await self._wait_for(estimate)
+                self._add(estimate)
+        else:
+            self._add(estimate)
+
+        charge = Charge(self, estimate)
+        try:
+            yield charge
+        except _UNBILLED_ERRORS:
+            if charge.actual is None:
+                charge.settle(self.costs.per_request)
+            raise
+        finally:
+            if charge.actual is not None:
+                self._add(charge.actual - estimate)
+
+    async def search(
+        self, client: DiffbotSearchClient, params: dict
+    ) -> DiffbotEntitiesResponse:
+        """
+        Run a paced DiffbotSearchClient.search.
+
+        The estimate is the requested page size (`size`, default 50).
+
+        Args:
+            client (DiffbotSearchClient): The client.
+            params (dict): The search params.
+
+        Returns:
+            DiffbotEntitiesResponse: The response.
+        """
+
+        estimate = self.costs.entities(int(params.get("size", 50)))
+        async with self.spend(estimate, client.priority) as charge:
+            with request_priority(client.priority):
+                resp = await client.search(params)
+            charge.settle(self._actual(resp, len(resp.content.get("data", []))))
+        return resp
+
+    async def enhance(
+        self, client: DiffbotEnhanceClient, params: dict
+    ) -> DiffbotEntitiesResponse:
+        """
+        Run a paced DiffbotEnhanceClient.enhance, estimated as one match.
+
+        Args:
+            client (DiffbotEnhanceClient): The client.
+            params (dict): The enhance params.
+
+        Returns:
+            DiffbotEntitiesResponse: The response.
+        """
+
+        async with self.spend(self.costs.entities(1), client.priority) as charge:
+            with request_priority(client.priority):
+                resp = await client.enhance(params)
+            charge.settle(self._actual(resp, len(resp.content.get("data", []))))
+        return resp
+
+    async def create_bulkjob(
+        self, client: DiffbotEnhanceClient, inputs: list[dict], params=None
+    ) -> DiffbotBulkJobCreateResponse:
+        """
+        Submit a bulk job once the budget allows for all of its inputs.
+
+        The job is charged one match per input; bulk job charges accrue as
+        the job runs, so the estimate is kept as the cost.
+
+        Args:
+            client (DiffbotEnhanceClient): The client.
+            inputs (list[dict]): The bulk job inputs.
+            params (dict, optional): The bulk job params.
+
+        Returns:
+            DiffbotBulkJobCreateResponse: The response.
+        """
+
+        async with self.spend(self.costs.entities(len(inputs)), client.priority):
+            with request_priority(client.priority):
+                resp = await client.create_bulkjob(inputs, params)
+        return resp
+
+    def report(self, remaining: float | None = None) -> QuotaReport:
+        """
+        Report spending so far and project when remaining work completes.
+
+        Args:
+            remaining (float, optional): The estimated credits of the work
+                still to do, e.g. entities left times CostModel.per_entity.
+
+        Returns:
+            QuotaReport: The report.
+        """
+
+        now = time.time()
+        for window in self.windows:
+            window.roll(now)
+
+        rate = min(self._paced_credits(w) / w.period for w in self.windows)
+        eta = None
+        if remaining is not None:
+            eta = datetime.fromtimestamp(self._finish_time(now, remaining), UTC)
+
+        return QuotaReport(
+            spent=[w.spent for w in self.windows],
+            remaining=[max(w.credits - w.spent, 0) for w in self.windows],
+            rate=rate,
+            eta=eta,
+        )
+
+    def _paced_credits(self, window: QuotaWindow) -> float:
+        return window.credits * (1 - self.interactive_reserve)
+
+    def _delay(self, window: QuotaWindow, now: float, cost: float) -> float:
+        """Seconds until spending `cost` more credits in `window` is on pace."""
+
+        paced = self._paced_credits(window)
+        if window.spent + cost > paced:
+            # Does not fit this window any more: wait for the next one.
+            return window.end - now
+
+        needed = window.spent - window.credits * self.burst
+        return max(window.start + needed * window.period / paced - now, 0)
+
+    async def _wait_for(self, cost: float) -> None:
+        for window in self.windows:
+            if cost > self._paced_credits(window):
+                raise ValueError(
+                    f"An operation of {cost} credits exceeds a window's budget"
+                )
+
+        while True:
+            now = time.time()
+            for window in self.windows:
+                window.roll(now)
+
+            delay = max(self._delay(w, now, cost) for w in self.windows)
+            if delay <= 0:
+                return
+
+            log.debug("Pacing %s credits: waiting %.1fs", cost, delay)
+            await asyncio.sleep(delay)
+
+    def _add(self, credits: float) -> None:
+        now = time.time()
+        for window in self.windows:
+            window.roll(now)
+            window.spent = max(window.spent + credits, 0)
+
+    def _actual(self, resp: BaseDiffbotResponse, entities: int) -> float:
+        if resp.headers.get(LOCAL_HEADER):
+            return 0.0
+        if self.usage_header and (used := resp.headers.get(self.usage_header)):
+            try:
+                return float(used)
+            except ValueError:
+                log.warning("Unparseable %s header: %r", self.usage_header, used)
+        return self.costs.entities(entities)
+
+    def _finish_time(self, now: float, remaining: float) -> float:
+        """Simulate paced spending, window by window, until `remaining` is spent."""
+
+        windows = [
+            QuotaWindow(w.credits, w.period, w.start, w.spent) for w in self.windows
+        ]
+
+        # Credits below every even line can be spent right away.
+        behind = min(max(self._line(w, now) - w.spent, 0) for w in windows)
+        spend = min(remaining, behind)
+        remaining -= spend
+        for w in windows:
+            w.spent += spend
+
+        t = now
+        while remaining > 0:
+            rate = min(self._paced_credits(w) / w.period for w in windows)
+            binding = min(windows, key=lambda w: self._paced_credits(w) - w.spent)
+            room = max(self._paced_credits(binding) - binding.spent, 0)
+            next_end = min(w.end for w in windows)
+
+            spend = min(remaining, room, rate * (next_end - t))
+            remaining -= spend
+            for w in windows:
+                w.spent += spend
+
+            if remaining <= 0:
+                t += spend / rate
+            elif spend < rate * (next_end - t):
+                # A window's budget ran out: wait for it to renew.
+                t = binding.end
+            else:
+                t = next_end
+            for w in windows:
+                w.roll(t)
+        return t
+
+    def _line(self, window: QuotaWindow, now: float) -> float:
+        paced = self._paced_credits(window) * (now - window.start) / window.period
+        return paced + window.credits * self.burst
@@ -0,0 +1,288 @@
+import asyncio
+import contextlib
+import inspect
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Collection
+
+from diffbot_kg import dql
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.store import EntityStore
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def diff_entities(
+    old: dict, new: dict, ignore: Collection[str] = ()
+) -> dict[str, tuple[Any, Any]]:
+    """
+    Compute the field-level difference between two versions of an entity.
+
+    Nested dicts are compared field by field and reported with dotted paths;
+    lists and scalars are compared as a whole.
+
+    Args:
+        old (dict): The previous version.
+        new (dict): The current version.
+        ignore (Collection[str], optional): Dotted paths to leave out, e.g.
+            volatile fields such as "importance". Defaults to none.
+
+    Returns:
+        dict[str, tuple[Any, Any]]: (old value, new value) by dotted path. A
+            field that was added or removed has None on the missing side.
+    """
+
+    changes: dict[str, tuple[Any, Any]] = {}
+    _diff(old, new, "", set(ignore), changes)
+    return changes
+
+
+def _diff(old: dict, new: dict, prefix: str, ignore: set[str], out: dict) -> None:
+    for key in old.keys() | new.keys():
+        path = f"{prefix}{key}"
+        if path in ignore:
+            continue
+
+        before, after = old.get(key, _MISSING), new.get(key, _MISSING)
+        if isinstance(before, dict) and isinstance(after, dict):
+            _diff(before, after, f"{path}.", ignore, out)
+        elif before != after:
+            out[path] = (
+                None if before is _MISSING else before,
+                None if after is _MISSING else after,
+            )
+
+
+@dataclass
+class ChangeEvent:
+    """
+    A refreshed entity that differs from its stored version.
+
+    Attributes:
+        id (str): The Diffbot id the entity was stored under.
+        old (dict): The stored version.
+        new (dict): The refreshed version.
+        changes (dict[str, tuple[Any, Any]]): The field-level diff (see diff_entities).
+    """
+
+    id: str
+    old: dict
+    new: dict
+    changes: dict[str, tuple[Any, Any]]
+
+
+@dataclass
+class RefreshReport:
+    """
+    The outcome of one refresh round.
+
+    Attributes:
+        refreshed (int): The number of entities fetched again.
+        unchanged (int): How many of them had not changed.
+        events (list[ChangeEvent]): The changed entities.
+        missing (list[str]): Ids neither search nor enhance returned.
+        requests (int): The number of API requests made.
+    """
+
+    refreshed: int = 0
+    unchanged: int = 0
+    events: list[ChangeEvent] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+    requests: int = 0
+
+
+ChangeCallback = Callable[[ChangeEvent], Awaitable[None] | None]
+
+
+class RefreshScheduler:
+    """
+    Keeps the entities of an EntityStore fresh within a request budget.
+
+    Each round picks the stale entities that matter most (oldest and most
+    often accessed first, see EntityStore.stale), re-fetches as many of them
+    by id as fit in the request budget, writes them back to the store and
+    emits a ChangeEvent for every entity whose content changed. Entities the
+    search no longer returns by id are looked up by name and homepage
+    through the enhance client, if one is given; those still missing are
+    marked checked (see EntityStore.mark_checked) and only retried once
+    they are stale again.
+    """
+
+    def __init__(
+        self,
+        search_client: DiffbotSearchClient,
+        store: EntityStore,
+        max_age: timedelta | float | None = None,
+        request_budget: int = 10,
+        batch_size: int = 100,
+        enhance_client: DiffbotEnhanceClient | None = None,
+        on_change: ChangeCallback | None = None,
+        ignore: Collection[str] = (),
+    ) -> None:
+        """
+        Initializes a new RefreshScheduler.
+
+        Args:
+            search_client (DiffbotSearchClient): The client used for id lookups.
+            store (EntityStore): The store to keep fresh.
+            max_age (timedelta | float, optional): Age at which an entity is
+                stale. Defaults to the store's max_age.
+            request_budget (int, optional): Maximum API requests per round.
+                Defaults to 10.
+            batch_size (int, optional): Maximum ids per lookup request.
+                Defaults to 100.
+            enhance_client (DiffbotEnhanceClient, optional): Used to re-resolve
+                entities missing from id lookups. Defaults to None.
+            on_change (Callable, optional): Called (or awaited) with every
+                ChangeEvent. Defaults to None.
+            ignore (Collection[str], optional): Dotted paths left out of
+                diffs. Defaults to none.
+
+        Raises:
+            ValueError: If request_budget is below one.
+        """
+
+        if request_budget < 1:
+            raise ValueError("request_budget must be at least 1")
+
+        self.search_client = search_client
+        self.store = store
+        self.max_age = max_age
+        self.request_budget = request_budget
+        self.batch_size = batch_size
+        self.enhance_client = enhance_client
+        self.on_change = on_change
+        self.ignore = ignore
+
+    async def run_once(self) -> RefreshReport:
+        """
+        Run one refresh round.
+
+        Returns:
+            RefreshReport: What was refreshed and what changed.
+        """
+
+        report = RefreshReport()
+
+        candidates = self.store.stale(
+            self.max_age, limit=self.request_budget * self.batch_size
+        )
+        ids = self._fit_budget(candidates)
+        if not ids:
+            return report
+
+        old = self.store.peek_many(ids)
+        # A throwaway cache keeps get_entities from answering from the store.
+        result = await self.search_client.get_entities(
+            ids, cache={}, batch_size=self.batch_size
+        )
+        report.requests += result.requests
+
+        fresh = dict(result.entities)
+        missing = result.missing
+        if missing and self.enhance_client is not None:
+            budget = self.request_budget - report.requests
+            resolved = await self._resolve(
+                self.enhance_client, missing[: max(budget, 0)], old
+            )
+            report.requests += min(len(missing), max(budget, 0))
+            fresh.update(resolved)
+            missing = [i for i in missing if i not in resolved]
+
+        self.store.put_many(fresh.values())
+        for entity_id, new in fresh.items():
+            if new.get("id") != entity_id:
+                # Resolved to a different (merged) entity; drop the old id.
+                with contextlib.suppress(KeyError):
+                    del self.store[entity_id]
+
+        for entity_id, new in fresh.items():
+            report.refreshed += 1
+            changes = diff_entities(old.get(entity_id, {}), new, self.ignore)
+            if not changes:
+                report.unchanged += 1
+                continue
+
+            event = ChangeEvent(entity_id, old.get(entity_id, {}), new, changes)
+            report.events.append(event)
+            if self.on_change is not None:
+                outcome = self.on_change(event)
+                if inspect.isawaitable(outcome):
+                    await outcome
+
+        # Missing entities would otherwise stay the most urgent every round.
+        self.store.mark_checked(missing)
+        report.missing = missing
+        log.debug(
+            "Refreshed %s entities (%s changed, %s missing) in %s requests",
+            report.refreshed,
+            len(report.events),
+            len(report.missing),
+            report.requests,
+        )
+        return report
+
+    async def run_forever(self, interval: float) -> None:
+        """
+        Run a refresh round every `interval` seconds until cancelled.
+
+        Args:
+            interval (float): Seconds between the start of two rounds.
+        """
+
+        while True:
+            started = asyncio.get_running_loop().time()
+            await self.run_once()
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(interval - elapsed, 0))
+
+    def _fit_budget(self, ids: list[str]) -> list[str]:
+        """Keep the leading ids that fit in request_budget lookup requests."""
+
+        if not ids:
+            return ids
+
+        plan = self.search_client.plan_search(
+            {"query": dql.or_clause("id", ids)}, max_values=self.batch_size
+        )
+        kept = [
+            dql.find_or_lists(params["query"])[0].values
+            for params in plan[: self.request_budget]
+        ]
+        return ids[: sum(len(values) for values in kept)]
+
+    async def _resolve(
+        self, client: DiffbotEnhanceClient, ids: list[str], old: dict[str, dict]
+    ) -> dict[str, dict]:
+        """
+        Look up entities missing by id through enhance, by name and homepage.
+
+        A failed lookup is logged and its id counted as still missing, so it
+        does not cost the round the entities already fetched.
+        """
+
+        async def resolve(entity_id: str) -> dict | None:
+            stored = old.get(entity_id, {})
+            params = {
+                "type": stored.get("type"),
+                "name": stored.get("name"),
+                "url": stored.get("homepageUri"),
+                "size": 1,
+            }
+            if params["name"] is None and params["url"] is None:
+                return None
+
+            try:
+                resp = await client.enhance(params)
+            except Exception as e:
+                log.warning("Could not resolve missing entity %s: %r", entity_id, e)
+                return None
+            entities = resp.entities if resp.content.get("data") else []
+            return entities[0] if entities else None
+
+        found = await asyncio.gather(*(resolve(i) for i in ids))
+        return {i: e for i, e in zip(ids, found, strict=True) if e is not None}
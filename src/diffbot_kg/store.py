@@ -0,0 +1,457 @@
+import json
+import sqlite3
+import time
+from collections.abc import MutableMapping
+from datetime import timedelta
+from typing import Iterable, Iterator
+
+from yarl import URL
+
+from diffbot_kg import dql
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    name TEXT COLLATE NOCASE,
+    domain TEXT,
+    fetched_at REAL NOT NULL,
+    checked_at REAL,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    last_access REAL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entities_type_name ON entities (type, name);
+CREATE INDEX IF NOT EXISTS entities_name ON entities (name);
+CREATE INDEX IF NOT EXISTS entities_domain ON entities (domain);
+CREATE INDEX IF NOT EXISTS entities_fetched_at ON entities (fetched_at);
+"""
+
+_UPSERT = """
+INSERT INTO entities (id, type, name, domain, fetched_at, body)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    type = excluded.type,
+    name = excluded.name,
+    domain = excluded.domain,
+    fetched_at = excluded.fetched_at,
+    checked_at = NULL,
+    body = excluded.body
+"""
+
+
+def homepage_domain(url: str | None) -> str | None:
+    """
+    Normalize a homepage URL to a bare lowercase domain without "www.".
+
+    Args:
+        url (str | None): The URL, with or without scheme, e.g. "www.diffbot.com".
+
+    Returns:
+        str | None: The domain, e.g. "diffbot.com", or None if there is none.
+    """
+
+    if not url:
+        return None
+
+    host = URL(url if "//" in url else f"//{url}").host
+    if not host:
+        return None
+
+    host = host.lower()
+    return host.removeprefix("www.")
+
+
+class EntityStore(MutableMapping[str, dict]):
+    """
+    Embedded SQLite store of entities retrieved from the Knowledge Graph.
+
+    Entities are indexed by id, type, name, homepage domain and the time
+    they were fetched. As a mapping the store answers only with fresh
+    entities (fetched within `max_age`), which makes it usable as the cache
+    of `DiffbotSearchClient.get_entities`.
+
+    Pass the store to a client (`store=`) to have every retrieved entity
+    written into it. With `read_through=True` the clients also answer
+    searches and enhance lookups by exact Diffbot id from the store when it
+    holds every requested entity fresh, and call the API otherwise. Any
+    other search or lookup (by type, name or homepage) always goes to the
+    API, as the store cannot tell whether it holds every entity the API
+    would match, or the one it would rank first.
+
+    The store is synchronous; queries run on indexed columns and are meant
+    to be fast enough to call from the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_age: timedelta | float | None = None,
+        read_through: bool = False,
+    ) -> None:
+        """
+        Initializes a new EntityStore.
+
+        Args:
+            path (str, optional): The SQLite database file. Defaults to an
+                in-memory database.
+            max_age (timedelta | float, optional): How long an entity stays
+                fresh, in seconds if a number. Defaults to forever.
+            read_through (bool, optional): Whether clients should answer
+                lookups from the store. Defaults to False.
+        """
+
+        self.max_age = _seconds(max_age)
+        self.read_through = read_through
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def put(self, entity: dict, fetched_at: float | None = None) -> None:
+        """
+        Insert or replace an entity.
+
+        Args:
+            entity (dict): The entity; it must have an `id`.
+            fetched_at (float, optional): When the entity was fetched, as a
+                Unix timestamp. Defaults to now.
+        """
+
+        self.put_many([entity], fetched_at)
+
+    def put_many(
+        self, entities: Iterable[dict], fetched_at: float | None = None
+    ) -> None:
+        """
+        Insert or replace several entities in one transaction.
+
+        Args:
+            entities (Iterable[dict]): The entities; each must have an `id`.
+            fetched_at (float, optional): When the entities were fetched, as
+                a Unix timestamp. Defaults to now.
+        """
+
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = (
+            (
+                entity["id"],
+                entity.get("type"),
+                entity.get("name"),
+                homepage_domain(entity.get("homepageUri")),
+                fetched_at,
+                json.dumps(entity, separators=(",", ":")),
+            )
+            for entity in entities
+        )
+
+        with self._db:
+            self._db.executemany(_UPSERT, rows)
+
+    def lookup(
+        self, entity_id: str, max_age: timedelta | float | None = None
+    ) -> dict | None:
+        """
+        Return a fresh entity by id and count the access.
+
+        Args:
+            entity_id (str): The Diffbot id.
+            max_age (timedelta | float, optional): Overrides the store's max_age.
+
+        Returns:
+            dict | None: The entity, or None if it is missing or stale.
+        """
+
+        return self.lookup_many([entity_id], max_age).get(entity_id)
+
+    def lookup_many(
+        self, ids: Iterable[str], max_age: timedelta | float | None = None
+    ) -> dict[str, dict]:
+        """
+        Return the fresh entities among the given ids and count the accesses.
+
+        Args:
+            ids (Iterable[str]): The Diffbot ids.
+            max_age (timedelta | float, optional): Overrides the store's max_age.
+
+        Returns:
+            dict[str, dict]: The fresh entities keyed by id.
+        """
+
+        ids = list(ids)
+        found = {}
+
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self._select(f"id IN ({marks})", chunk, max_age)
+            found.update((row[0], json.loads(row[1])) for row in rows)
+
+        self._record_access(found)
+        return found
+
+    def find(
+        self,
+        type: str | None = None,
+        name: str | None = None,
+        domain: str | None = None,
+        max_age: timedelta | float | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Return fresh entities matching all given criteria and count the accesses.
+
+        Args:
+            type (str, optional): The entity type, e.g. "Organization".
+            name (str, optional): The exact name (case-insensitive).
+            domain (str, optional): The homepage URL or domain.
+            max_age (timedelta | float, optional): Overrides the store's max_age.
+            limit (int, optional): The maximum number of entities. Defaults
+                to no limit.
+
+        Returns:
+            list[dict]: The matching entities, most recently fetched first.
+
+        Raises:
+            ValueError: If no criterion is given.
+        """
+
+        clauses, args = [], []
+        for column, value in (
+            ("type", type),
+            ("name", name),
+            ("domain", homepage_domain(domain)),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+
+        if not clauses:
+            raise ValueError("at least one of type, name or domain is required")
+
+        rows = self._select(
+            " AND ".join(clauses),
+            args,
+            max_age,
+            order_by="fetched_at DESC",
+            limit=limit,
+        )
+        found = {row[0]: json.loads(row[1]) for row in rows}
+        self._record_access(found)
+        return list(found.values())
+
+    def peek_many(self, ids: Iterable[str]) -> dict[str, dict]:
+        """
+        Return stored entities regardless of age, without counting accesses.
+
+        Args:
+            ids (Iterable[str]): The Diffbot ids.
+
+        Returns:
+            dict[str, dict]: The stored entities keyed by id.
+        """
+
+        ids = list(ids)
+        found = {}
+
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self._select(f"id IN ({marks})", chunk, float("inf"))
+            found.update((row[0], json.loads(row[1])) for row in rows)
+
+        return found
+
+    def stale(
+        self, max_age: timedelta | float | None = None, limit: int | None = None
+    ) -> list[str]:
+        """
+        Return the ids of stale entities, most urgent first.
+
+        Urgency is the entity's age weighted by how often it was accessed:
+        `age * (1 + access_count)`. An entity marked with `mark_checked`
+        counts as stale, and ages, from the time it was checked.
+
+        Args:
+            max_age (timedelta | float, optional): Overrides the store's max_age.
+            limit (int, optional): The maximum number of ids. Defaults to no limit.
+
+        Returns:
+            list[str]: The ids.
+        """
+
+        now = time.time()
+        sql = (
+            "SELECT id FROM entities WHERE coalesce(checked_at, fetched_at) < ? "
+            "ORDER BY (? - coalesce(checked_at, fetched_at)) * (1 + access_count)"
+            " DESC"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        cutoff = self._cutoff(max_age)
+        return [row[0] for row in self._db.execute(sql, (cutoff, now))]
+
+    def mark_checked(self, ids: Iterable[str], checked_at: float | None = None) -> None:
+        """
+        Record a refresh attempt that found no newer version of entities.
+
+        The entities keep their content and fetch time, so they stay stale
+        for lookups, but `stale` ranks them by the time of the attempt. This
+        keeps entities the API no longer returns from taking every refresh
+        round.
+
+        Args:
+            ids (Iterable[str]): The Diffbot ids.
+            checked_at (float, optional): When they were checked, as a Unix
+                timestamp. Defaults to now.
+        """
+
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._db:
+            self._db.executemany(
+                "UPDATE entities SET checked_at = ? WHERE id = ?",
+                ((checked_at, i) for i in ids),
+            )
+
+    def fetched_at(self, entity_id: str) -> float | None:
+        """
+        Return when an entity was fetched.
+
+        Args:
+            entity_id (str): The Diffbot id.
+
+        Returns:
+            float | None: The Unix timestamp, or None if it is not stored.
+        """
+
+        row = self._db.execute(
+            "SELECT fetched_at FROM entities WHERE id = ?", (entity_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def answer_search(self, params: dict) -> list[dict] | None:
+        """
+        Answer a search from the store, if read-through applies.
+
+        Only queries made of nothing but `id:` clauses are answered, with
+        no params besides a `size` that covers every id, and only when every
+        requested id is fresh in the store. Anything else (other fields,
+        `from`, `filter`, a smaller page) could make the local answer differ
+        from the API's.
+
+        Args:
+            params (dict): The search params.
+
+        Returns:
+            list[dict] | None: The entities, or None to call the API.
+        """
+
+        if not self.read_through:
+            return None
+
+        if set(params) - {"query", "size"}:
+            return None
+
+        parsed = dql.parse_simple_query(params.get("query", ""), fields=("id",))
+        if parsed is None:
+            return None
+
+        ids = list(dict.fromkeys(parsed["id"]))
+        if int(params.get("size", len(ids))) < len(ids):
+            return None
+
+        found = self.lookup_many(ids)
+        return [found[i] for i in ids] if len(found) == len(ids) else None
+
+    def answer_enhance(self, params: dict) -> dict | None:
+        """
+        Answer an enhance lookup from the store, if read-through applies.
+
+        As with answer_search, only lookups by exact `id` (and optionally a
+        `size`) are answered, and only when the entity is fresh in the
+        store. A fresh local match by name or homepage is not necessarily
+        the entity the API would rank first.
+
+        Args:
+            params (dict): The enhance params.
+
+        Returns:
+            dict | None: The entity, or None to call the API.
+        """
+
+        if not self.read_through:
+            return None
+
+        if "id" not in params or set(params) - {"id", "size"}:
+            return None
+
+        return self.lookup(params["id"])
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __getitem__(self, entity_id: str) -> dict:
+        if (entity := self.lookup(entity_id)) is None:
+            raise KeyError(entity_id)
+        return entity
+
+    def __setitem__(self, entity_id: str, entity: dict) -> None:
+        self.put({**entity, "id": entity_id})
+
+    def __delitem__(self, entity_id: str) -> None:
+        with self._db:
+            cursor = self._db.execute("DELETE FROM entities WHERE id = ?", (entity_id,))
+        if not cursor.rowcount:
+            raise KeyError(entity_id)
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._select("1", (), None, columns="id")
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        cutoff = self._cutoff(None)
+        return self._db.execute(
+            "SELECT COUNT(*) FROM entities WHERE fetched_at >= ?", (cutoff,)
+        ).fetchone()[0]
+
+    def __enter__(self) -> "EntityStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _select(
+        self,
+        where: str,
+        args,
+        max_age,
+        columns: str = "id, body",
+        order_by: str | None = None,
+        limit: int | None = None,
+    ) -> list[tuple]:
+        # `columns`, `where` and `order_by` are fixed SQL written in this module;
+        # every value from a caller is bound through `args` (limit is an int).
+        sql = f"SELECT {columns} FROM entities WHERE fetched_at >= ? AND ({where})"  # nosec B608
+        if order_by is not None:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._db.execute(sql, (self._cutoff(max_age), *args)).fetchall()
+
+    def _cutoff(self, max_age) -> float:
+        seconds = self.max_age if max_age is None else _seconds(max_age)
+        return float("-inf") if seconds is None else time.time() - seconds
+
+    def _record_access(self, ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "UPDATE entities SET access_count = access_count + 1, last_access = ? WHERE id = ?",
+                ((now, i) for i in ids),
+            )
+
+
+def _seconds(max_age: timedelta | float | None) -> float | None:
+    if isinstance(max_age, timedelta):
+        return max_age.total_seconds()
+    return max_age
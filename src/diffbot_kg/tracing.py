@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import heapq
+import json
+import os
+import threading
+import time
+import weakref
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+import aiohttp
+
+
+class Tracer:
+    """
+    Records client activity as spans in Chrome Trace Event format.
+
+    Pass a Tracer to `DiffbotSession(tracer=...)` to record every request,
+    broken down into time queued on the scheduler and limiter, connecting,
+    waiting for the first byte, reading and decoding, plus retry backoff.
+    Client operations that issue several requests (pagination, id lookups,
+    bulk job polling) add enclosing spans. Each asyncio task gets its own
+    row, so concurrent requests appear side by side; a finished task's row
+    is reused by later tasks.
+
+    Open the output of dump() in https://ui.perfetto.dev or chrome://tracing.
+    """
+
+    def __init__(self, process_name: str = "diffbot-kg") -> None:
+        """
+        Initializes a new Tracer.
+
+        Args:
+            process_name (str, optional): The name shown for the process row.
+                Defaults to "diffbot-kg".
+        """
+
+        self.process_name = process_name
+        self.events: list[dict[str, Any]] = []
+
+        self._origin = time.perf_counter()
+        self._task_lanes: weakref.WeakKeyDictionary[asyncio.Task, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._thread_lanes: dict[int, int] = {}
+        self._free_lanes: list[int] = []
+        self._lane_count = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str = "client", **args: Any) -> Iterator[dict]:
+        """
+        Record the enclosed block as a span.
+
+        Args:
+            name (str): The span name.
+            cat (str, optional): The category. Defaults to "client".
+            **args: Details shown with the span; more can be added to the
+                yielded dict inside the block.
+
+        Yields:
+            dict: The span's args.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = repr(e)
+            raise
+        finally:
+            self.add_span(name, start, time.perf_counter(), cat, **args)
+
+    def add_span(
+        self, name: str, start: float, end: float, cat: str = "client", **args: Any
+    ) -> None:
+        """
+        Record a span measured elsewhere.
+
+        Args:
+            name (str): The span name.
+            start (float): The start, from time.perf_counter().
+            end (float): The end, from time.perf_counter().
+            cat (str, optional): The category. Defaults to "client".
+            **args: Details shown with the span.
+        """
+
+        self._add(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": self._us(start),
+                "dur": max(self._us(end) - self._us(start), 0),
+                "args": args,
+            }
+        )
+
+    def instant(self, name: str, cat: str = "client", **args: Any) -> None:
+        """Record a point in time, e.g. a state change."""
+
+        self._add(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "i",
+                "s": "t",
+                "ts": self._us(time.perf_counter()),
+                "args": args,
+            }
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the trace as a Chrome Trace Event document."""
+
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "args": {"name": self.process_name},
+            }
+        ]
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str | os.PathLike) -> None:
+        """Write the trace to a JSON file."""
+
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, default=str)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Return an aiohttp TraceConfig recording connection setup and the
+        wait for response headers of every request.
+        """
+
+        config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx: SimpleNamespace, params) -> None:
+            ctx.sent = time.perf_counter()
+
+        async def on_queued_start(session, ctx: SimpleNamespace, params) -> None:
+            ctx.pool = time.perf_counter()
+
+        async def on_queued_end(session, ctx: SimpleNamespace, params) -> None:
+            self.add_span("connection pool", ctx.pool, time.perf_counter(), "http")
+
+        async def on_connect_start(session, ctx: SimpleNamespace, params) -> None:
+            ctx.connect = time.perf_counter()
+
+        async def on_connect_end(session, ctx: SimpleNamespace, params) -> None:
+            now = time.perf_counter()
+            self.add_span("connecting", ctx.connect, now, "http")
+            ctx.sent = now
+
+        async def on_request_end(session, ctx: SimpleNamespace, params) -> None:
+            self.add_span(
+                "waiting",
+                ctx.sent,
+                time.perf_counter(),
+                "http",
+                status=params.response.status,
+            )
+
+        config.on_request_start.append(on_request_start)
+        config.on_connection_queued_start.append(on_queued_start)
+        config.on_connection_queued_end.append(on_queued_end)
+        config.on_connection_create_start.append(on_connect_start)
+        config.on_connection_create_end.append(on_connect_end)
+        config.on_request_end.append(on_request_end)
+        return config
+
+    def _add(self, event: dict[str, Any]) -> None:
+        event["pid"] = os.getpid()
+        event["tid"] = self._lane()
+        with self._lock:
+            self.events.append(event)
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        with self._lock:
+            if task is None:
+                ident = threading.get_ident()
+                if ident not in self._thread_lanes:
+                    self._thread_lanes[ident] = self._take_lane()
+                return self._thread_lanes[ident]
+
+            if (lane := self._task_lanes.get(task)) is None:
+                lane = self._task_lanes[task] = self._take_lane()
+                task.add_done_callback(self._release_lane)
+            return lane
+
+    def _take_lane(self) -> int:
+        if self._free_lanes:
+            return heapq.heappop(self._free_lanes)
+        self._lane_count += 1
+        return self._lane_count
+
+    def _release_lane(self, task: asyncio.Task) -> None:
+        with self._lock:
+            if (lane := self._task_lanes.pop(task, None)) is not None:
+                heapq.heappush(self._free_lanes, lane)
+
+    def _us(self, t: float) -> float:
+        return round((t - self._origin) * 1e6, 3)
+
+
+def span(tracer: Tracer | None, name: str, cat: str = "client", **args: Any):
+    """
+    Return `tracer.span(...)`, or a no-op context manager without a tracer.
+
+    Args:
+        tracer (Tracer | None): The tracer, if tracing is enabled.
+        name (str): The span name.
+        cat (str, optional): The category. Defaults to "client".
+        **args: Details shown with the span.
+    """
+
+    if tracer is None:
+        return contextlib.nullcontext(args)
+    return tracer.span(name, cat, **args)
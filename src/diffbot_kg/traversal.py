@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Collection,
+    Iterable,
+    Literal,
+    MutableMapping,
+)
+
+from diffbot_kg.models.lookup import EntityLookupResult
+
+if TYPE_CHECKING:
+    from diffbot_kg.clients.search import DiffbotSearchClient
+
+
+def entity_id_from_uri(uri: str) -> str:
+    """
+    Extract the Diffbot id from a `diffbotUri`.
+
+    Args:
+        uri (str): The URI, e.g. "http://diffbot.com/entity/EYX1i02YVPsuT7fPLUYgRhQ".
+
+    Returns:
+        str: The id, e.g. "EYX1i02YVPsuT7fPLUYgRhQ".
+    """
+
+    return uri.rstrip("/").rsplit("/", 1)[-1]
+
+
+def related_ids(
+    entity: dict, edge_types: Collection[str] | None = None
+) -> list[tuple[str, str]]:
+    """
+    List the entities an entity refers to through its top-level fields.
+
+    A reference is a dict (or a list of dicts) carrying a `diffbotUri`, such
+    as `parentCompany`, `subsidiaries` or `locations`.
+
+    Args:
+        entity (dict): The entity.
+        edge_types (Collection[str], optional): Field names to follow.
+            Defaults to all fields.
+
+    Returns:
+        list[tuple[str, str]]: (field name, referenced id) pairs in field order.
+    """
+
+    edges = []
+
+    for name, value in entity.items():
+        if edge_types is not None and name not in edge_types:
+            continue
+
+        refs = value if isinstance(value, list) else [value]
+        for ref in refs:
+            if isinstance(ref, dict) and isinstance(ref.get("diffbotUri"), str):
+                edges.append((name, entity_id_from_uri(ref["diffbotUri"])))
+
+    return edges
+
+
+@dataclass
+class TraversalNode:
+    """
+    An entity reached by a KnowledgeGraphTraversal.
+
+    Attributes:
+        id (str): The Diffbot id the entity was looked up by.
+        entity (dict): The entity.
+        depth (int): The number of hops from the nearest start id.
+        edges (list[tuple[str, str]]): The outgoing (field name, id) edges
+            that pass the edge-type filter, including edges to nodes that
+            were already visited.
+    """
+
+    id: str
+    entity: dict
+    depth: int
+    edges: list[tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class _Frontier:
+    depth: int
+    ids: list[str]
+    task: asyncio.Task[EntityLookupResult] | None = None
+
+
+class KnowledgeGraphTraversal:
+    """
+    Breadth- or depth-first traversal of the entities related to a start set.
+
+    Unvisited ids are fetched in frontiers, each with a single batched
+    `get_entities` call, and every frontier's lookup is started before the
+    caller receives the nodes that precede it, so it is in flight while the
+    caller processes them.
+
+    In breadth-first order a frontier holds all unvisited ids discovered
+    from one batch of entities, and nodes are yielded level by level. In
+    depth-first order a frontier holds the unvisited children of a single
+    node, and each node is followed by everything reached below it before
+    its next sibling (pre-order).
+
+    Iterate over the traversal with `async for` to receive TraversalNodes.
+    """
+
+    def __init__(
+        self,
+        client: "DiffbotSearchClient",
+        start_ids: Iterable[str],
+        max_depth: int = 1,
+        edge_types: Collection[str] | None = None,
+        order: Literal["bfs", "dfs"] = "bfs",
+        cache: MutableMapping[str, dict] | None = None,
+        batch_size: int = 100,
+    ) -> None:
+        """
+        Initializes a new KnowledgeGraphTraversal.
+
+        Args:
+            client (DiffbotSearchClient): The client used for lookups.
+            start_ids (Iterable[str]): The Diffbot ids to start from (depth 0).
+            max_depth (int, optional): The maximum number of hops. Defaults to 1.
+            edge_types (Collection[str], optional): Field names to follow,
+                e.g. {"parentCompany", "subsidiaries"}. Defaults to all.
+            order (str, optional): "bfs" or "dfs". Defaults to "bfs".
+            cache (MutableMapping[str, dict], optional): An id-to-entity
+                cache passed on to `get_entities`. Defaults to None.
+            batch_size (int, optional): Maximum ids per request. Defaults to 100.
+
+        Raises:
+            ValueError: If order is not "bfs" or "dfs", or max_depth is negative.
+        """
+
+        if order not in ("bfs", "dfs"):
+            raise ValueError(f"Unknown traversal order: {order}")
+        if max_depth < 0:
+            raise ValueError("max_depth must not be negative")
+
+        self.client = client
+        self.start_ids = list(dict.fromkeys(start_ids))
+        self.max_depth = max_depth
+        self.edge_types = edge_types
+        self.order = order
+        self.cache = cache
+        self.batch_size = batch_size
+
+        self.visited: set[str] = set()
+        self.missing: list[str] = []
+        self.requests = 0
+
+    def __aiter__(self) -> AsyncIterator[TraversalNode]:
+        self.visited = set(self.start_ids)
+        return self._bfs() if self.order == "bfs" else self._dfs()
+
+    async def _bfs(self) -> AsyncIterator[TraversalNode]:
+        frontiers: deque[_Frontier] = deque()
+        if self.start_ids:
+            frontiers.append(_Frontier(0, self.start_ids))
+
+        try:
+            while frontiers:
+                frontier = frontiers.popleft()
+                nodes = await self._nodes(frontier)
+
+                children = [c for node in nodes for c in self._children(node)]
+                if children:
+                    frontiers.append(_Frontier(frontier.depth + 1, children))
+                    # Prefetch the next level while the caller consumes this one.
+                    self._fetch(frontiers[-1])
+
+                for node in nodes:
+                    yield node
+        finally:
+            await self._cancel(frontiers)
+
+    async def _dfs(self) -> AsyncIterator[TraversalNode]:
+        # A stack of frontiers still to fetch and nodes still to yield.
+        stack: list[_Frontier | TraversalNode] = []
+        if self.start_ids:
+            stack.append(_Frontier(0, self.start_ids))
+
+        try:
+            while stack:
+                item = stack.pop()
+                if isinstance(item, _Frontier):
+                    nodes = await self._nodes(item)
+                    stack.extend(reversed(nodes))
+                    continue
+
+                if children := self._children(item):
+                    frontier = _Frontier(item.depth + 1, children)
+                    stack.append(frontier)
+                    # Prefetch the node's children while the caller consumes it.
+                    self._fetch(frontier)
+
+                yield item
+        finally:
+            await self._cancel(f for f in stack if isinstance(f, _Frontier))
+
+    def _fetch(self, frontier: _Frontier) -> asyncio.Task[EntityLookupResult]:
+        if frontier.task is None:
+            frontier.task = asyncio.create_task(
+                self.client.get_entities(
+                    frontier.ids, cache=self.cache, batch_size=self.batch_size
+                )
+            )
+        return frontier.task
+
+    async def _nodes(self, frontier: _Frontier) -> list[TraversalNode]:
+        """Fetch a frontier and return its nodes, in frontier order."""
+
+        result = await self._fetch(frontier)
+        self.requests += result.requests
+        self.missing.extend(result.missing)
+
+        nodes = []
+        for entity_id in frontier.ids:
+            entity = result.entities.get(entity_id)
+            if entity is not None:
+                edges = related_ids(entity, self.edge_types)
+                nodes.append(TraversalNode(entity_id, entity, frontier.depth, edges))
+        return nodes
+
+    def _children(self, node: TraversalNode) -> list[str]:
+        """Mark the unvisited targets of a node's edges visited and return them."""
+
+        if node.depth >= self.max_depth:
+            return []
+
+        children = []
+        for _, target in node.edges:
+            if target not in self.visited:
+                self.visited.add(target)
+                children.append(target)
+        return children
+
+    @staticmethod
+    async def _cancel(frontiers: Iterable[_Frontier]) -> None:
+        for frontier in frontiers:
+            if frontier.task is not None:
+                frontier.task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await frontier.task
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from typing import Any, Self
+
+from aiohttp import web
+from yarl import URL
+
+log = logging.getLogger(__name__)
+
+_ID_KEYS = ("job_id", "jobId", "bulkjobId", "bulkJobId")
+
+
+class WebhookReceiver:
+    """
+    An embedded HTTP server receiving bulk job completion notifications.
+
+    Attach a started receiver to a client (`client.webhook = receiver`) and
+    `create_bulkjob` adds the receiver's URL to every job as the callback,
+    while `wait_for_bulkjob` waits for the notification instead of polling
+    every few seconds. Each notification is verified with one status request
+    before it is trusted, and the job is still polled every
+    `fallback_interval` seconds in case a notification is lost.
+
+    Notifications are matched to jobs by a job id field in their JSON body
+    (job_id, jobId or bulkjobId); one without an id wakes every waiting job
+    for verification. A random secret in the callback URL keeps others from
+    triggering verifications. A notification for a job nobody waits for
+    yet is kept for `early_ttl` seconds, in case it beat `create_bulkjob`'s
+    return, and then dropped.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        public_url: str | URL | None = None,
+        path: str = "/diffbot/bulkjob",
+        param: str = "notifyWebhook",
+        fallback_interval: float = 60,
+        early_ttl: float = 600,
+    ) -> None:
+        """
+        Initializes a new WebhookReceiver.
+
+        Args:
+            host (str, optional): The interface to listen on. Defaults to
+                "127.0.0.1".
+            port (int, optional): The port to listen on. Defaults to any free port.
+            public_url (str | URL, optional): The URL under which Diffbot can
+                reach the receiver (e.g. behind a tunnel or load balancer).
+                Defaults to the listening address.
+            path (str, optional): The callback path. Defaults to "/diffbot/bulkjob".
+            param (str, optional): The create_bulkjob query parameter that
+                carries the callback URL. Defaults to "notifyWebhook".
+            fallback_interval (float, optional): Seconds between the status
+                polls made while waiting for a notification. Defaults to 60.
+            early_ttl (float, optional): Seconds to keep a notification for a
+                job nobody waits for yet. Defaults to 600.
+        """
+
+        self.host = host
+        self.port = port
+        self.public_url = URL(public_url) if public_url else None
+        self.path = path
+        self.param = param
+        self.fallback_interval = fallback_interval
+        self.early_ttl = early_ttl
+
+        self.secret = secrets.token_urlsafe(16)
+        self._events: dict[str, asyncio.Event] = {}
+        self._early: dict[str, float] = {}
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> URL:
+        """The callback URL to register with bulk jobs."""
+
+        if self.public_url is not None:
+            base = self.public_url
+        elif self._runner is not None:
+            base = URL.build(scheme="http", host=self.host, port=self.port)
+        else:
+            raise RuntimeError("WebhookReceiver is not started")
+
+        return (base / self.path.lstrip("/")).with_query(secret=self.secret)
+
+    async def start(self) -> Self:
+        """Start listening."""
+
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        if self.port == 0:
+            self.port = self._runner.addresses[0][1]
+        log.debug("Listening for bulk job notifications on %s", self.url)
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> Self:
+        return await self.start()
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def expect(self, bulkjobId: str) -> None:
+        """Start collecting notifications for a bulk job."""
+
+        self._early.pop(bulkjobId, None)
+        self._events.setdefault(bulkjobId, asyncio.Event())
+
+    def forget(self, bulkjobId: str) -> None:
+        """Stop collecting notifications for a bulk job."""
+
+        self._early.pop(bulkjobId, None)
+        self._events.pop(bulkjobId, None)
+
+    async def notified(self, bulkjobId: str, timeout: float | None = None) -> bool:
+        """
+        Wait for a notification about a bulk job, and consume it.
+
+        Args:
+            bulkjobId (str): The ID of the bulk job.
+            timeout (float, optional): Maximum seconds to wait. Defaults to
+                no limit.
+
+        Returns:
+            bool: Whether a notification arrived within the timeout.
+        """
+
+        self.expect(bulkjobId)
+        event = self._events[bulkjobId]
+        try:
+            async with asyncio.timeout(timeout):
+                await event.wait()
+        except TimeoutError:
+            return False
+
+        event.clear()
+        return True
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if not secrets.compare_digest(request.query.get("secret", ""), self.secret):
+            return web.Response(status=403)
+
+        try:
+            body: Any = json.loads(await request.read() or b"{}")
+        except ValueError:
+            body = {}
+
+        bulkjobId = _find_job_id(body)
+        log.debug("Bulk job notification for %s", bulkjobId or "an unknown job")
+        self._drop_expired()
+        if bulkjobId is not None:
+            # Kept even if nobody waits yet: it may beat create_bulkjob's return.
+            if bulkjobId not in self._events:
+                self._early[bulkjobId] = time.monotonic()
+            self._events.setdefault(bulkjobId, asyncio.Event()).set()
+        else:
+            for event in self._events.values():
+                event.set()
+
+        return web.Response(status=204)
+
+    def _drop_expired(self) -> None:
+        deadline = time.monotonic() - self.early_ttl
+        for bulkjobId, received in list(self._early.items()):
+            if received < deadline:
+                del self._early[bulkjobId]
+                self._events.pop(bulkjobId, None)
+
+
+def _find_job_id(body: Any) -> str | None:
+    if not isinstance(body, dict):
+        return None
+
+    for key in _ID_KEYS:
+        if isinstance(body.get(key), str):
+            return body[key]
+    for nested in ("content", "query_ctx", "request_ctx"):
+        if (found := _find_job_id(body.get(nested))) is not None:
+            return found
+    return None
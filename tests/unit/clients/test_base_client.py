@@ -1,5 +1,6 @@
 import pytest
 from diffbot_kg.clients.base import BaseDiffbotKGClient
+from diffbot_kg.clients.scheduler import Priority, current_priority
 from diffbot_kg.clients.session import DiffbotSession
 from diffbot_kg.models.response.base import BaseDiffbotResponse
 
@@ -27,6 +28,31 @@ class TestBaseDiffbotKGClient:
     def test_init_creates_session(self, client):
         assert isinstance(client.s, DiffbotSession)
 
+    def test_init_shares_session(self):
+        session = DiffbotSession()
+        client = BaseDiffbotKGClient(token=TOKEN, session=session, priority="batch")
+
+        assert client.s is session
+        assert client.priority is Priority.BATCH
+        assert "session" not in client.default_params
+        assert "priority" not in client.default_params
+
+    @pytest.mark.asyncio
+    async def test_get_runs_under_client_priority(self, mocker):
+        seen = []
+
+        async def fake_get(*args, **kwargs):
+            seen.append(current_priority())
+            return BaseDiffbotResponse(200, {}, {})  # type: ignore
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+        client = BaseDiffbotKGClient(token=TOKEN, priority=Priority.BACKGROUND)
+
+        await client._get(BaseDiffbotKGClient.url)
+
+        assert seen == [Priority.BACKGROUND]
+        assert current_priority() is Priority.INTERACTIVE
+
     def test_merge_params_adds_defaults(self, client):
         result = client._merge_params({"query": "test"})
         assert result == {"token": TOKEN, "query": "test"}
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from diffbot_kg.clients import DiffbotEnhanceClient
+from diffbot_kg.models.response import (
+    DiffbotBulkJobCreateResponse,
+    DiffbotBulkJobStatusResponse,
+    DiffbotEntitiesResponse,
+)
+from diffbot_kg.store import EntityStore
+
+# trunk-ignore(bandit/B105)
+TOKEN = "valid_token"
+
+
+def _result(job_idx, name):
+    return {
+        "request_ctx": {"query_ctx": {"jobIdx": job_idx}},
+        "data": [{"score": 1.0, "entity": {"id": f"E-{name}", "name": name}}],
+    }
+
+
+@pytest.fixture
+def bulk(mocker):
+    """Mocks the bulk job endpoints, answering each input with its name."""
+
+    jobs: list[list[dict]] = []
+
+    async def create_bulkjob(self, json, params=None):
+        jobs.append(json)
+        content = {"job_id": f"job-{len(jobs)}"}
+        return DiffbotBulkJobCreateResponse(200, {}, content)  # type: ignore
+
+    async def wait_for_bulkjob(self, bulkjobId, interval=10, timeout=None):
+        content = {"content": {"status": "COMPLETE"}}
+        return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+    async def stream_bulkjob_results(self, bulkjobId):
+        inputs = jobs[int(bulkjobId.removeprefix("job-")) - 1]
+        # Results come back out of order, and the first input has none.
+        for job_idx in reversed(range(1, len(inputs))):
+            yield _result(job_idx, inputs[job_idx]["name"])
+
+    mocker.patch.object(DiffbotEnhanceClient, "create_bulkjob", create_bulkjob)
+    mocker.patch.object(DiffbotEnhanceClient, "wait_for_bulkjob", wait_for_bulkjob)
+    mocker.patch.object(
+        DiffbotEnhanceClient, "stream_bulkjob_results", stream_bulkjob_results
+    )
+    return jobs
+
+
+class TestEnhanceCoalescer:
+    @pytest.mark.asyncio
+    async def test_large_batch_becomes_bulk_job(self, bulk):
+        store = EntityStore()
+        client = DiffbotEnhanceClient(token=TOKEN, store=store)
+        client.coalesce(window=0.01, min_bulk=3)
+
+        results = await asyncio.gather(
+            *(client.enhance({"name": str(i)}) for i in range(5)),
+            return_exceptions=True,
+        )
+
+        assert bulk == [[{"name": str(i)} for i in range(5)]]
+        assert isinstance(results[0], RuntimeError)
+        for i in range(1, 5):
+            assert isinstance(results[i], DiffbotEntitiesResponse)
+            assert results[i].entities == [{"id": f"E-{i}", "name": str(i)}]
+        assert store.get("E-3") is not None
+
+    @pytest.mark.asyncio
+    async def test_job_params_split_the_batch(self, mocker, bulk):
+        create_bulkjob = DiffbotEnhanceClient.create_bulkjob
+        jobs = []
+
+        async def record(self, json, params=None):
+            jobs.append((params, json))
+            return await create_bulkjob(self, json, params)
+
+        mocker.patch.object(DiffbotEnhanceClient, "create_bulkjob", record)
+        client = DiffbotEnhanceClient(token=TOKEN)
+        client.coalesce(window=0.01, min_bulk=2)
+
+        await asyncio.gather(
+            *(client.enhance({"name": str(i), "size": 1 + i % 2}) for i in range(6)),
+            return_exceptions=True,
+        )
+
+        # Each size gets its own job, with size as a job param, not an input field.
+        assert sorted(jobs, key=lambda job: job[0]["size"]) == [
+            ({"size": 1}, [{"name": "0"}, {"name": "2"}, {"name": "4"}]),
+            ({"size": 2}, [{"name": "1"}, {"name": "3"}, {"name": "5"}]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_max_batch_flushes_early(self, bulk):
+        client = DiffbotEnhanceClient(token=TOKEN)
+        client.coalesce(window=60, max_batch=3, min_bulk=1)
+
+        await asyncio.wait_for(
+            asyncio.gather(
+                *(client.enhance({"name": str(i)}) for i in range(6)),
+                return_exceptions=True,
+            ),
+            timeout=5,
+        )
+
+        assert [len(job) for job in bulk] == [3, 3]
+
+    @pytest.mark.asyncio
+    async def test_small_batch_is_sent_as_calls(self, mocker, bulk):
+        calls = []
+
+        async def fetch(self, params):
+            calls.append(params)
+            if params["name"] == "bad":
+                raise ValueError("boom")
+            return DiffbotEntitiesResponse(200, {}, {"data": []})  # type: ignore
+
+        mocker.patch.object(DiffbotEnhanceClient, "fetch_enhance", fetch)
+        client = DiffbotEnhanceClient(token=TOKEN)
+        client.coalesce(window=0.01, min_bulk=10)
+
+        ok, bad = await asyncio.gather(
+            client.enhance({"name": "ok"}),
+            client.enhance({"name": "bad"}),
+            return_exceptions=True,
+        )
+
+        assert bulk == []
+        assert len(calls) == 2
+        assert isinstance(ok, DiffbotEntitiesResponse)
+        assert isinstance(bad, ValueError)
+
+    @pytest.mark.asyncio
+    async def test_failed_bulk_job_fails_every_caller(self, mocker, bulk):
+        async def wait_for_bulkjob(self, bulkjobId, interval=10, timeout=None):
+            content = {"content": {"status": "FAILED"}}
+            return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+        mocker.patch.object(DiffbotEnhanceClient, "wait_for_bulkjob", wait_for_bulkjob)
+        client = DiffbotEnhanceClient(token=TOKEN)
+        client.coalesce(window=0.01, min_bulk=1)
+
+        results = await asyncio.gather(
+            *(client.enhance({"name": str(i)}) for i in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all("FAILED" in str(r) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_aclose_sends_pending_batch(self, bulk):
+        client = DiffbotEnhanceClient(token=TOKEN)
+        coalescer = client.coalesce(window=60, min_bulk=1)
+
+        task = asyncio.create_task(client.enhance({"name": "A"}))
+        await asyncio.sleep(0)
+        await coalescer.aclose()
+
+        assert bulk == [[{"name": "A"}]]
+        # The only input is job 0, which the mocked results skip.
+        with pytest.raises(RuntimeError):
+            await task
+
+    def test_invalid_batch_sizes(self):
+        client = DiffbotEnhanceClient(token=TOKEN)
+
+        with pytest.raises(ValueError):
+            client.coalesce(max_batch=0)
@@ -1,3 +1,6 @@
+import asyncio
+from unittest.mock import MagicMock
+
 import pytest
 from diffbot_kg.clients import DiffbotEnhanceClient
 from diffbot_kg.clients.session import DiffbotSession
@@ -10,6 +13,7 @@ from diffbot_kg.models.response import (
 from diffbot_kg.models.response.base import BaseDiffbotResponse
 from diffbot_kg.models.response.bulkjob_results import DiffbotBulkJobResultsResponse
 from diffbot_kg.models.response.coverage_report import DiffbotCoverageReportResponse
+from diffbot_kg.store import EntityStore
 
 # trunk-ignore(bandit/B105)
 TOKEN = "valid_token"
@@ -41,6 +45,110 @@ class TestDiffbotEnhanceClient:
         assert isinstance(response, DiffbotEntitiesResponse)
         assert response.status == 200
 
+    @pytest.mark.asyncio
+    async def test_enhance_read_through(self, mocker):
+        store = EntityStore(read_through=True)
+        entity = {"id": "E1", "name": "Diffbot", "homepageUri": "www.diffbot.com"}
+        store.put(entity)
+        client = DiffbotEnhanceClient(token=TOKEN, store=store)
+        mocker.patch.object(DiffbotSession, "get")
+
+        response = await client.enhance({"id": "E1"})
+
+        DiffbotSession.get.assert_not_called()
+        assert response.entities == [entity]
+
+    @pytest.mark.asyncio
+    async def test_enhance_writes_to_store(self, mocker):
+        store = EntityStore(read_through=True)
+        client = DiffbotEnhanceClient(token=TOKEN, store=store)
+        content = {"hits": 1, "data": [{"score": 0.9, "entity": {"id": "E1"}}]}
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            return_value=BaseDiffbotResponse(200, {}, content),  # type: ignore
+        )
+
+        await client.enhance({"name": "Diffbot"})
+
+        assert store.lookup("E1") == {"id": "E1"}
+
+    @staticmethod
+    def _fake_enhance(delays, calls=None):
+        calls = {} if calls is None else calls
+
+        async def enhance(params):
+            calls["active"] = calls.get("active", 0) + 1
+            calls["peak"] = max(calls.get("peak", 0), calls["active"])
+            await asyncio.sleep(delays.get(params["name"], 0))
+            calls["active"] -= 1
+            if params["name"] == "bad":
+                raise RuntimeError("boom")
+            return DiffbotEntitiesResponse(200, {}, {"data": []})  # type: ignore
+
+        return enhance
+
+    @pytest.mark.asyncio
+    async def test_enhance_stream_completion_order(self, mocker, client):
+        delays = {"slow": 0.05}
+        mocker.patch.object(client, "enhance", side_effect=self._fake_enhance(delays))
+        inputs = [{"name": "slow"}, {"name": "a"}, {"name": "bad"}]
+
+        results = [r async for r in client.enhance_stream(inputs, concurrency=3)]
+
+        assert [r.params["name"] for r in results] == ["a", "bad", "slow"]
+        assert [r.index for r in results] == [1, 2, 0]
+        assert isinstance(results[1].error, RuntimeError)
+        assert not results[1].ok and results[2].ok
+
+    @pytest.mark.asyncio
+    async def test_enhance_stream_ordered(self, mocker, client):
+        delays = {"n0": 0.03, "n2": 0.01}
+        calls = {}
+        mocker.patch.object(
+            client, "enhance", side_effect=self._fake_enhance(delays, calls)
+        )
+
+        async def inputs():
+            for i in range(10):
+                yield {"name": f"n{i}"}
+
+        results = [
+            r
+            async for r in client.enhance_stream(
+                inputs(), concurrency=2, ordered=True, reorder_buffer=3
+            )
+        ]
+
+        assert [r.index for r in results] == list(range(10))
+        assert calls["peak"] <= 2
+
+    @pytest.mark.asyncio
+    async def test_enhance_stream_rejects_empty_reorder_buffer(self, client):
+        with pytest.raises(ValueError, match="reorder_buffer"):
+            async for _ in client.enhance_stream(
+                [{"name": "x"}], ordered=True, reorder_buffer=0
+            ):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_enhance_stream_reads_inputs_lazily(self, mocker, client):
+        mocker.patch.object(client, "enhance", side_effect=self._fake_enhance({}))
+        read = 0
+
+        def unbounded():
+            nonlocal read
+            while True:
+                read += 1
+                yield {"name": "x"}
+
+        stream = client.enhance_stream(unbounded(), concurrency=4)
+        results = [await anext(stream) for _ in range(5)]
+        await stream.aclose()
+
+        assert len(results) == 5
+        assert read <= 5 + 4
+
     @pytest.mark.asyncio
     async def test_create_bulkjob(self, mocker, client):
         json_data = [
@@ -122,6 +230,39 @@ class TestDiffbotEnhanceClient:
         assert isinstance(response, DiffbotListBulkJobsResponse)
         assert response.status == 200
 
+    @pytest.mark.asyncio
+    async def test_wait_for_bulkjob(self, mocker, client):
+        states = iter(["CREATED", "RUNNING", "COMPLETE"])
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            side_effect=lambda *args, **kwargs: BaseDiffbotResponse(
+                200,
+                {},
+                {"content": {"status": next(states)}},  # type: ignore
+            ),
+        )
+
+        status = await client.wait_for_bulkjob("job-1", interval=0)
+
+        assert status.complete
+        assert DiffbotSession.get.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_wait_for_bulkjob_timeout(self, mocker, client):
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            side_effect=lambda *args, **kwargs: BaseDiffbotResponse(
+                200,
+                {},
+                {"content": {"status": "RUNNING"}},  # type: ignore
+            ),
+        )
+
+        with pytest.raises(TimeoutError):
+            await client.wait_for_bulkjob("job-1", interval=0.01, timeout=0.05)
+
     @pytest.mark.asyncio
     async def test_bulkjob_results(self, mocker, client):
         mocker.patch.object(
@@ -136,6 +277,43 @@ class TestDiffbotEnhanceClient:
         assert "job-456" in call_url
         assert isinstance(response, DiffbotBulkJobResultsResponse)
 
+    @pytest.mark.asyncio
+    async def test_stream_bulkjob_results(self, mocker, client):
+        async def chunks():
+            yield b'{"data":[{"entity":{"id":"E1"}}]}\n{"data"'
+            yield b":[]}\n"
+
+        resp = MagicMock()
+        resp.content.iter_any.return_value = chunks()
+        mocker.patch.object(DiffbotSession, "open_stream", return_value=resp)
+
+        results = [r async for r in client.stream_bulkjob_results("job-456")]
+
+        assert "job-456" in str(DiffbotSession.open_stream.call_args.args[1])
+        assert results == [{"data": [{"entity": {"id": "E1"}}]}, {"data": []}]
+        resp.release.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_download_bulkjob_results(self, mocker, client, tmp_path):
+        async def chunks():
+            yield b'{"request_ctx":{"query":{"customId":"a"},"query_ctx":{"jobIdx":1}},'
+            yield b'"data":[]}\n{"request_ctx":{"query":{"customId":"b"},'
+            yield b'"query_ctx":{"jobIdx":0}},"data":[]}'
+
+        resp = MagicMock()
+        resp.content.iter_any.return_value = chunks()
+        mocker.patch.object(DiffbotSession, "open_stream", return_value=resp)
+
+        results = await client.download_bulkjob_results(
+            "job-456", tmp_path, key="customId"
+        )
+
+        assert results.path == tmp_path / "job-456.jsonl"
+        assert results[0]["request_ctx"]["query"]["customId"] == "b"
+        assert results.by_key("a")["request_ctx"]["query_ctx"]["jobIdx"] == 1
+        assert not list(tmp_path.glob("*.part*"))
+        results.close()
+
     @pytest.mark.asyncio
     async def test_single_bulkjob_result(self, mocker, client):
         mocker.patch.object(
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+
+import pytest
+from aiohttp.test_utils import TestServer
+from diffbot_kg.clients.limiter import (
+    FileRateLimiter,
+    RateLimitServer,
+    RemoteRateLimiter,
+    TokenBucket,
+)
+from diffbot_kg.clients.session import DiffbotSession
+
+
+def _reserve_many(path, n, queue):
+    limiter = FileRateLimiter(path, max_rate=5, time_period=1)
+    queue.put([limiter.reserve() for _ in range(n)])
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(max_rate=5, time_period=1, updated=100.0)
+
+        waits = [bucket.reserve(now=100.0) for _ in range(7)]
+
+        assert waits[:5] == [0, 0, 0, 0, 0]
+        assert waits[5] == pytest.approx(0.2)
+        assert waits[6] == pytest.approx(0.4)
+
+    def test_refill(self):
+        bucket = TokenBucket(max_rate=5, time_period=1, updated=100.0)
+        for _ in range(5):
+            bucket.reserve(now=100.0)
+
+        assert bucket.reserve(now=101.0) == 0
+
+
+class TestFileRateLimiter:
+    def test_shared_between_instances(self, tmp_path):
+        path = tmp_path / "limit"
+        a = FileRateLimiter(path, max_rate=5, time_period=1)
+        b = FileRateLimiter(path, max_rate=5, time_period=1)
+
+        waits = [(a if i % 2 else b).reserve() for i in range(10)]
+
+        assert waits[:5] == [0, 0, 0, 0, 0]
+        # The second half queues behind the first, whichever instance asks.
+        assert waits[9] == pytest.approx(1.0, abs=0.05)
+
+    def test_shared_between_processes(self, tmp_path):
+        path = tmp_path / "limit"
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        procs = [
+            ctx.Process(target=_reserve_many, args=(path, 5, queue)) for _ in range(3)
+        ]
+        for proc in procs:
+            proc.start()
+        waits = sorted(w for _ in procs for w in queue.get(timeout=30))
+        for proc in procs:
+            proc.join()
+
+        # 15 reservations at 5/s with a burst of 5: the last waits about 2s.
+        assert waits.count(0) >= 5
+        assert waits[-1] == pytest.approx(2.0, abs=0.5)
+
+    @pytest.mark.asyncio
+    async def test_session_uses_shared_limiter(self, tmp_path):
+        limiter = FileRateLimiter(tmp_path / "limit")
+        session = DiffbotSession(limiter=limiter)
+
+        await session.open()
+
+        assert session._limiter is limiter
+        await session.close()
+
+
+class TestRemoteRateLimiter:
+    @pytest.mark.asyncio
+    async def test_reserve_against_local_server(self):
+        server = RateLimitServer(max_rate=2, time_period=1)
+        async with TestServer(server.app()) as test_server:
+            limiter = RemoteRateLimiter(test_server.make_url("/"), key="token-a")
+            other = RemoteRateLimiter(test_server.make_url("/"), key="token-b")
+
+            waits = [await limiter._reserve() for _ in range(3)]
+            other_wait = await other._reserve()
+
+            assert waits[:2] == [0, 0]
+            assert waits[2] == pytest.approx(0.5, abs=0.05)
+            assert other_wait == 0
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            async with limiter:
+                pass
+            assert loop.time() - started >= 0.5
+
+            await limiter.close()
+            await other.close()
+
+    @pytest.mark.asyncio
+    async def test_session_close_closes_connection(self):
+        server = RateLimitServer()
+        async with TestServer(server.app()) as test_server:
+            limiter = RemoteRateLimiter(test_server.make_url("/"))
+            session = DiffbotSession(limiter=limiter)
+            await session.open()
+            await limiter.acquire()
+
+            await session.close()
+
+            assert limiter._session is not None and limiter._session.closed
+            # The limiter reconnects for a session that is still open.
+            await limiter.acquire()
+            await limiter.close()
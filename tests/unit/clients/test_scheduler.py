@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from diffbot_kg.clients.scheduler import (
+    ClassPolicy,
+    Priority,
+    RequestScheduler,
+    current_priority,
+    request_priority,
+)
+
+
+class TestRequestPriority:
+    def test_default_is_interactive(self):
+        assert current_priority() is Priority.INTERACTIVE
+
+    def test_context_sets_and_resets(self):
+        with request_priority("batch"):
+            assert current_priority() is Priority.BATCH
+        assert current_priority() is Priority.INTERACTIVE
+
+    def test_none_keeps_surrounding_priority(self):
+        with request_priority(Priority.BACKGROUND), request_priority(None):
+            assert current_priority() is Priority.BACKGROUND
+
+
+class TestRequestScheduler:
+    def test_invalid_weight_raises(self):
+        with pytest.raises(ValueError, match="weight"):
+            RequestScheduler({Priority.BATCH: ClassPolicy(weight=0)})
+
+    def test_invalid_max_in_flight_raises(self):
+        with pytest.raises(ValueError, match="max_in_flight"):
+            RequestScheduler(max_in_flight=0)
+
+    @pytest.mark.asyncio
+    async def test_default_does_not_limit_in_flight(self):
+        scheduler = RequestScheduler()
+
+        for priority in (Priority.INTERACTIVE, Priority.BATCH, Priority.BACKGROUND):
+            for _ in range(20):
+                await asyncio.wait_for(scheduler.acquire(priority), timeout=1)
+
+        assert scheduler.in_flight == 60
+
+    @pytest.mark.asyncio
+    async def test_class_in_flight_limit(self):
+        scheduler = RequestScheduler(
+            {Priority.BATCH: ClassPolicy(max_in_flight=2)}, max_in_flight=None
+        )
+
+        await scheduler.acquire(Priority.BATCH)
+        await scheduler.acquire(Priority.BATCH)
+        waiter = asyncio.create_task(scheduler.acquire(Priority.BATCH))
+        await asyncio.sleep(0)
+
+        stats = scheduler.stats()[Priority.BATCH]
+        assert stats.in_flight == 2
+        assert stats.queued == 1
+
+        scheduler.release(Priority.BATCH)
+        assert await waiter is Priority.BATCH
+        assert scheduler.stats()[Priority.BATCH].queued == 0
+
+    @pytest.mark.asyncio
+    async def test_weighted_fair_dispatch_order(self):
+        scheduler = RequestScheduler(
+            {
+                Priority.INTERACTIVE: ClassPolicy(weight=3),
+                Priority.BATCH: ClassPolicy(weight=1),
+            },
+            max_in_flight=1,
+        )
+        order = []
+
+        async def request(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+                await asyncio.sleep(0)
+
+        blocker = await scheduler.acquire(Priority.BACKGROUND)
+        tasks = [asyncio.create_task(request(Priority.BATCH)) for _ in range(4)]
+        tasks += [asyncio.create_task(request(Priority.INTERACTIVE)) for _ in range(6)]
+        await asyncio.sleep(0)
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+
+        # Interactive gets three dispatches for every batch dispatch.
+        assert order[:8].count(Priority.INTERACTIVE) == 6
+        assert order[:8].count(Priority.BATCH) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_removed(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert scheduler.stats()[Priority.INTERACTIVE].queued == 0
+        scheduler.release(Priority.INTERACTIVE)
+        assert scheduler.in_flight == 0
@@ -1,16 +1,34 @@
+from unittest.mock import MagicMock
+
 import pytest
+from diffbot_kg import dql
 from diffbot_kg.clients.search import DiffbotSearchClient
 from diffbot_kg.clients.session import DiffbotSession
 from diffbot_kg.models.response import (
+    RawDiffbotResponse,
     DiffbotCoverageReportResponse,
     DiffbotEntitiesResponse,
+    DiffbotFacetResponse,
 )
 from diffbot_kg.models.response.base import BaseDiffbotResponse
+from diffbot_kg.partition import RangePartition
+from diffbot_kg.store import EntityStore
 
 # trunk-ignore(bandit/B105)
 TOKEN = "fake_token"
 
 
+async def _aiter_lines(*lines):
+    for line in lines:
+        yield line
+
+
+def _entities_response(*ids, hits=None):
+    data = [{"entity": {"id": i}} for i in ids]
+    content = {"hits": len(data) if hits is None else hits, "data": data}
+    return BaseDiffbotResponse(200, {}, content)  # type: ignore
+
+
 class TestDiffbotSearchClient:
     @pytest.fixture(scope="class")
     def client(self):
@@ -51,6 +69,316 @@ class TestDiffbotSearchClient:
         DiffbotSession.post.assert_called_once()
         assert isinstance(response, DiffbotEntitiesResponse)
 
+    @pytest.mark.asyncio
+    async def test_facet(self, mocker, client):
+        content = {"data": [{"value": "Software", "count": 7}]}
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            return_value=BaseDiffbotResponse(200, {}, content),  # type: ignore
+        )
+
+        response = await client.facet("type:Organization", "industries")
+
+        params = DiffbotSession.get.call_args.kwargs["params"]
+        assert params["query"] == "type:Organization facet:industries"
+        assert isinstance(response, DiffbotFacetResponse)
+        assert response.counts == {"Software": 7}
+
+    @pytest.mark.asyncio
+    async def test_facet_with_spec(self, mocker, client):
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            return_value=BaseDiffbotResponse(200, {}, {"data": []}),  # type: ignore
+        )
+
+        await client.facet("type:Organization", "[year]:foundingDate")
+
+        params = DiffbotSession.get.call_args.kwargs["params"]
+        assert params["query"] == "type:Organization facet[year]:foundingDate"
+
+    @pytest.mark.asyncio
+    async def test_facets_merges_concurrent_queries(self, mocker, client):
+        async def fake_get(url, params, headers):
+            value = "US" if "country" in params["query"] else "Software"
+            content = {"data": [{"value": value, "count": 2}]}
+            return BaseDiffbotResponse(200, {}, content)  # type: ignore
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+
+        table = await client.facets(
+            ["type:Organization", "type:Person"],
+            ["industries", "location.country.name"],
+        )
+
+        assert DiffbotSession.get.call_count == 4
+        assert table["industries"] == {"Software": 4}
+        assert table.top("location.country.name") == [("US", 4)]
+
+    def test_plan_search_small_query(self, client):
+        params = {"query": 'id:or("E1","E2")'}
+
+        assert client.plan_search(params) == [params]
+
+    def test_plan_search_splits_under_get_threshold(self, client):
+        ids = ",".join(f'"E{i:022d}"' for i in range(500))
+        params = {"query": f"type:Organization id:or({ids})", "size": 50}
+
+        plan = client.plan_search(params)
+
+        assert len(plan) > 1
+        assert all(p["size"] == 50 for p in plan)
+        assert all(
+            client._url_length(client.search_url, p) <= client.max_get_url_length
+            for p in plan
+        )
+
+    @pytest.mark.asyncio
+    async def test_search_split_merges_and_dedupes(self, mocker, client):
+        responses = [_entities_response("E1", "E2"), _entities_response("E2", "E3")]
+        mocker.patch.object(DiffbotSession, "get", side_effect=responses)
+
+        response = await client.search_split(
+            {"query": 'id:or("E1","E2","E3")'}, max_values=2
+        )
+
+        assert DiffbotSession.get.call_count == 2
+        assert isinstance(response, DiffbotEntitiesResponse)
+        assert [e["id"] for e in response.entities] == ["E1", "E2", "E3"]
+        assert response.content["hits"] == 3
+
+    @pytest.mark.asyncio
+    async def test_search_split_applies_size_after_merging(self, mocker, client):
+        responses = [_entities_response("E1", "E2"), _entities_response("E3", "E4")]
+        mocker.patch.object(DiffbotSession, "get", side_effect=responses)
+
+        response = await client.search_split(
+            {"query": 'id:or("E1","E2","E3","E4")', "size": 3}, max_values=2
+        )
+
+        assert [e["id"] for e in response.entities] == ["E1", "E2", "E3"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size, expected", [(None, 5), (2, 2)])
+    async def test_search_split_pages_each_sub_search(
+        self, mocker, client, size, expected
+    ):
+        matches = {'"A"': ["E1", "E2", "E3"], '"B"': ["E4", "E5"]}
+
+        async def fake_get(url, params, headers):
+            value = dql.find_or_lists(params["query"])[0].values[0]
+            ids = matches[value]
+            start = params.get("from", 0)
+            page = ids[start : start + params["size"]]
+            return _entities_response(*page, hits=len(ids))
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+        mocker.patch("diffbot_kg.clients.search.SPLIT_PAGE_SIZE", 2)
+        params = {"query": 'name:or("A","B")'}
+        if size is not None:
+            params["size"] = size
+
+        response = await client.search_split(params, max_values=1)
+
+        ids = [e["id"] for e in response.entities]
+        assert ids == ["E1", "E2", "E3", "E4", "E5"][:expected]
+        assert response.content["hits"] == 5
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"query": 'id:or("E1","E2","E3")', "from": 50},
+            {"query": 'id:or("E1","E2","E3") sortBy:importance'},
+        ],
+    )
+    async def test_search_split_rejects_offset_and_sort(self, mocker, client, params):
+        mocker.patch.object(DiffbotSession, "get")
+
+        with pytest.raises(ValueError, match="sub-searches"):
+            await client.search_split(params, max_values=2)
+
+        DiffbotSession.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_entities_batches_and_reports_missing(self, mocker, client):
+        async def fake_get(url, params, headers):
+            requested = dql.find_or_lists(params["query"])[0].values
+            found = [v.strip('"') for v in requested if v != '"E2"']
+            assert params["size"] == len(requested)
+            return _entities_response(*found)
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+
+        result = await client.get_entities(["E1", "E2", "E3", "E1"], batch_size=2)
+
+        assert DiffbotSession.get.call_count == 2
+        assert result.requests == 2
+        assert list(result.entities) == ["E1", "E3"]
+        assert result.entities["E3"] == {"id": "E3"}
+        assert result.missing == ["E2"]
+
+    @pytest.mark.asyncio
+    async def test_get_entities_batches_fit_get_requests(self, mocker, client):
+        async def fake_get(url, params, headers):
+            assert client._url_length(url, params) <= client.max_get_url_length
+            return _entities_response()
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+        mocker.patch.object(DiffbotSession, "post")
+        ids = [f"E{i:018d}" for i in range(300)]
+
+        result = await client.get_entities(ids, batch_size=1000)
+
+        assert result.requests > 1
+        assert DiffbotSession.get.call_count == result.requests
+        DiffbotSession.post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_entities_store_written_once(self, mocker):
+        store = EntityStore(read_through=True)
+        client = DiffbotSearchClient(TOKEN, store=store)
+        mocker.patch.object(
+            DiffbotSession, "get", return_value=_entities_response("E1")
+        )
+        put_many = mocker.spy(store, "put_many")
+        setitem = mocker.spy(EntityStore, "__setitem__")
+
+        result = await client.get_entities(["E1"])
+
+        assert list(result.entities) == ["E1"]
+        assert put_many.call_count == 1
+        setitem.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_entities_uses_cache(self, mocker, client):
+        mocker.patch.object(
+            DiffbotSession, "get", return_value=_entities_response("E2")
+        )
+        cache = {"E1": {"id": "E1", "name": "cached"}}
+
+        result = await client.get_entities(["E1", "E2"], cache=cache)
+
+        query = DiffbotSession.get.call_args.kwargs["params"]["query"]
+        assert query == 'id:or("E2")'
+        assert result.entities["E1"]["name"] == "cached"
+        assert cache["E2"] == {"id": "E2"}
+        assert result.missing == []
+
+    @pytest.mark.asyncio
+    async def test_get_entities_all_cached_makes_no_request(self, mocker, client):
+        mocker.patch.object(DiffbotSession, "get")
+
+        result = await client.get_entities(["E1"], cache={"E1": {"id": "E1"}})
+
+        DiffbotSession.get.assert_not_called()
+        assert result.requests == 0
+
+    @pytest.mark.asyncio
+    async def test_traverse_fetches_related_entities(self, mocker, client):
+        root = {
+            "id": "E1",
+            "parentCompany": {"diffbotUri": "http://diffbot.com/entity/E2"},
+        }
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            side_effect=[
+                BaseDiffbotResponse(200, {}, {"data": [{"entity": root}]}),  # type: ignore
+                _entities_response("E2"),
+            ],
+        )
+
+        nodes = [node async for node in client.traverse(["E1"], max_depth=1)]
+
+        assert [(n.id, n.depth) for n in nodes] == [("E1", 0), ("E2", 1)]
+
+    @pytest.mark.asyncio
+    async def test_search_partitioned_pages_and_splits(self, mocker, client):
+        async def fake_get(url, params, headers):
+            query, offset = params["query"], params["from"]
+            if "n>=0 n<4" in query:
+                return _entities_response("big", hits=100)
+            lo = int(query.split("n>=")[1].split()[0])
+            return _entities_response(f"E{lo}-{offset}", hits=3)
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+
+        entities = [
+            e
+            async for e in client.search_partitioned(
+                {"query": "type:Organization"},
+                [RangePartition("n", 0, 4)],
+                page_size=2,
+                max_hits=10,
+            )
+        ]
+
+        assert sorted(e["id"] for e in entities) == [
+            "E0-0",
+            "E0-2",
+            "E2-0",
+            "E2-2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_search_partitioned_propagates_errors(self, mocker, client):
+        mocker.patch.object(DiffbotSession, "get", side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async for _ in client.search_partitioned(
+                {"query": "type:Organization"}, [RangePartition("n", 0, 4)]
+            ):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_search_writes_to_store(self, mocker):
+        store = EntityStore()
+        client = DiffbotSearchClient(token=TOKEN, store=store)
+        mocker.patch.object(
+            DiffbotSession, "get", return_value=_entities_response("E1", "E2")
+        )
+
+        await client.search({"query": "type:Organization"})
+
+        assert set(store) == {"E1", "E2"}
+
+    @pytest.mark.asyncio
+    async def test_search_read_through(self, mocker):
+        store = EntityStore(read_through=True)
+        store.put({"id": "E1", "type": "Organization", "name": "Diffbot"})
+        client = DiffbotSearchClient(token=TOKEN, store=store)
+        mocker.patch.object(DiffbotSession, "get")
+
+        response = await client.search({"query": 'id:"E1"'})
+
+        DiffbotSession.get.assert_not_called()
+        assert isinstance(response, DiffbotEntitiesResponse)
+        assert response.entities[0]["id"] == "E1"
+        assert response.headers["X-Diffbot-Local"] == "true"
+
+    @pytest.mark.asyncio
+    async def test_search_raw_bypasses_decoding_and_store(self, mocker):
+        store = EntityStore(read_through=True)
+        store.put({"id": "E1", "type": "Organization", "name": "Diffbot"})
+        client = DiffbotSearchClient(token=TOKEN, store=store)
+        body = b'{"hits":1,"data":[{"entity":{"id":"E2"}}]}'
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            return_value=RawDiffbotResponse(200, {}, body),  # type: ignore
+        )
+
+        response = await client.search(
+            {"query": 'type:Organization name:"Diffbot"'}, raw=True
+        )
+
+        assert DiffbotSession.get.call_args.kwargs["raw"] is True
+        assert isinstance(response, RawDiffbotResponse)
+        assert response.body == body
+        assert "E2" not in store
+
     @pytest.mark.asyncio
     async def test_coverage_report_by_id(self, mocker, client):
         report_id = "abc123"
@@ -64,13 +392,30 @@ class TestDiffbotSearchClient:
         response = await client.coverage_report_by_id(report_id)
 
         call_url = DiffbotSession.get.call_args.args[0]
-        # NOTE: str(URL) encodes braces, so .format() is a no-op here.
-        # The URL retains the literal %7Bid%7D instead of the report_id.
         assert "report" in call_url
+        assert call_url.endswith(f"/report/{report_id}")
         assert isinstance(response, DiffbotCoverageReportResponse)
         assert response.status == 200
         assert response.content == "col1,col2\nval1,val2"
 
+    @pytest.mark.asyncio
+    async def test_stream_coverage_report_by_query(self, mocker, client):
+        resp = MagicMock()
+        resp.content.iter_any.return_value = _aiter_lines(
+            b"Field,Cou", b"nt\nname,10\n"
+        )
+        mocker.patch.object(DiffbotSession, "open_stream", return_value=resp)
+
+        rows = [
+            row async for row in client.stream_coverage_report_by_query("type:Person")
+        ]
+
+        call_args = DiffbotSession.open_stream.call_args
+        assert call_args.kwargs["params"]["query"] == "type:Person"
+        assert rows[0].field == "name"
+        assert rows[0].counts == {"Count": 10}
+        resp.release.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_coverage_report_by_query(self, mocker, client):
         query = "type:Organization"
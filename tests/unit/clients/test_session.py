@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -5,12 +6,15 @@ from aiohttp import ClientResponseError, RequestInfo
 from multidict import CIMultiDict, CIMultiDictProxy
 from yarl import URL
 
+from diffbot_kg.clients.scheduler import Priority
 from diffbot_kg.clients.session import (
+    DEFAULT_MAX_IN_FLIGHT,
     DiffbotSession,
     RetryableException,
     URLTooLongException,
 )
 from diffbot_kg.models.response.base import BaseDiffbotResponse
+from diffbot_kg.models.response.raw import RawDiffbotResponse
 
 
 def _make_error_info(status):
@@ -68,6 +72,30 @@ class TestDiffbotSession:
 
         await session.close()
 
+    @pytest.mark.asyncio
+    async def test_interactive_overtakes_queued_batch_by_default(self, session):
+        scheduler = session.scheduler
+        for _ in range(DEFAULT_MAX_IN_FLIGHT):
+            await asyncio.wait_for(scheduler.acquire(Priority.BATCH), timeout=1)
+
+        order = []
+
+        async def request(priority):
+            order.append(await scheduler.acquire(priority))
+
+        queued = [asyncio.create_task(request(Priority.BATCH)) for _ in range(5)]
+        await asyncio.sleep(0)
+        queued.append(asyncio.create_task(request(Priority.INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert order == []
+
+        scheduler.release(Priority.BATCH)
+        await asyncio.sleep(0)
+
+        assert order == [Priority.INTERACTIVE]
+        for task in queued:
+            task.cancel()
+
     @pytest.mark.asyncio
     async def test_close(self, session):
         await session.open()
@@ -169,3 +197,50 @@ class TestDiffbotSession:
         assert response.status == 200
 
         await session.close()
+
+    @pytest.mark.asyncio
+    async def test_raw_response(self, mocker, session):
+        mock_resp = _make_response(200)
+        mock_resp.read = AsyncMock(return_value=b'{"hits": 1}')
+        mock_request = AsyncMock(return_value=mock_resp)
+
+        await session.open()
+        mocker.patch.object(session._session, "request", mock_request)
+
+        response = await session.get("https://example.com", raw=True)
+
+        assert isinstance(response, RawDiffbotResponse)
+        assert response.body == b'{"hits": 1}'
+        assert "raw" not in mock_request.call_args.kwargs
+        mock_resp.json.assert_not_called()
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_stream_releases_response(self, mocker, session):
+        mock_resp = _make_response(200)
+        mock_request = AsyncMock(return_value=mock_resp)
+
+        await session.open()
+        mocker.patch.object(session._session, "request", mock_request)
+
+        async with session.stream("GET", "https://example.com") as resp:
+            assert resp is mock_resp
+            mock_resp.release.assert_not_called()
+
+        mock_resp.release.assert_called_once()
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_open_stream_error_releases_response(self, mocker, session):
+        mock_resp = _make_response(403)
+        mock_request = AsyncMock(return_value=mock_resp)
+
+        await session.open()
+        mocker.patch.object(session._session, "request", mock_request)
+
+        with pytest.raises(ClientResponseError):
+            await session.open_stream("GET", "https://example.com")
+
+        mock_resp.release.assert_called_once()
+        await session.close()
@@ -0,0 +1,153 @@
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from diffbot_kg.clients import DiffbotEnhanceClient, DiffbotSearchClient
+from diffbot_kg.clients.session import DiffbotSession, URLTooLongException
+from diffbot_kg.clients.transport import (
+    AiohttpTransport,
+    HttpxTransport,
+    MemoryTransport,
+    TransportResponse,
+)
+from diffbot_kg.models.response import RawDiffbotResponse
+
+# trunk-ignore(bandit/B105)
+TOKEN = "valid_token"
+
+
+class TestTransportResponse:
+    @pytest.mark.asyncio
+    async def test_reading(self):
+        resp = TransportResponse.from_json({"hits": 1})
+
+        assert resp.content_type == "application/json"
+        assert resp.content_length == 11
+        assert await resp.json() == {"hits": 1}
+        assert await resp.text() == '{"hits": 1}'
+
+    @pytest.mark.asyncio
+    async def test_iter_chunked(self):
+        resp = TransportResponse.from_bytes(b"abcdefg")
+
+        assert [c async for c in resp.content.iter_chunked(3)] == [b"abc", b"def", b"g"]
+
+    def test_raise_for_status(self):
+        TransportResponse.from_bytes(status=204).raise_for_status()
+
+        with pytest.raises(aiohttp.ClientResponseError) as e:
+            TransportResponse.from_bytes(status=404).raise_for_status()
+        assert e.value.status == 404
+
+
+class TestMemoryTransport:
+    @pytest.mark.asyncio
+    async def test_search(self):
+        def handler(request):
+            assert request.url.query["query"] == "type:Organization"
+            return TransportResponse.from_json(
+                {"hits": 1, "data": [{"entity": {"id": "E1"}}]}
+            )
+
+        transport = MemoryTransport(handler)
+        async with DiffbotSession(transport=transport) as session:
+            client = DiffbotSearchClient(TOKEN, session=session)
+            resp = await client.search({"query": "type:Organization"})
+
+        assert resp.entities == [{"id": "E1"}]
+        assert transport.requests[0].url.query["token"] == TOKEN
+        assert transport.closed
+
+    @pytest.mark.asyncio
+    async def test_async_handler_and_post(self):
+        async def handler(request):
+            return TransportResponse.from_json(
+                {"job_id": "job-1", "n": len(request.json)}
+            )
+
+        transport = MemoryTransport(handler)
+        async with DiffbotSession(transport=transport) as session:
+            client = DiffbotEnhanceClient(TOKEN, session=session)
+            resp = await client.create_bulkjob([{"name": "A"}, {"name": "B"}])
+
+        assert transport.requests[0].method == "POST"
+        assert resp.jobId == "job-1"
+        assert resp.content["n"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_are_classified(self):
+        transport = MemoryTransport(
+            lambda request: TransportResponse.from_bytes(status=414)
+        )
+
+        async with DiffbotSession(transport=transport) as session:
+            with pytest.raises(URLTooLongException):
+                await session.get("https://kg.diffbot.com/kg/v3/dql")
+
+    @pytest.mark.asyncio
+    async def test_stream_and_spill(self):
+        lines = [{"data": [{"entity": {"id": f"E{i}"}}]} for i in range(50)]
+        transport = MemoryTransport(
+            lambda request: TransportResponse.from_json_lines(lines)
+        )
+
+        async with DiffbotSession(transport=transport, spill_threshold=100) as session:
+            client = DiffbotEnhanceClient(TOKEN, session=session)
+            streamed = [r async for r in client.stream_bulkjob_results("job-1")]
+            spilled = await client.bulkjob_results("job-1")
+            raw = await client.bulkjob_results("job-1", raw=True)
+
+        assert streamed == lines
+        assert list(spilled.content) == lines
+        assert isinstance(raw, RawDiffbotResponse) and raw.spilled
+        assert raw.body.count(b"\n") == 50
+        spilled.content.close()
+        raw.close()
+
+
+async def _app_server():
+    async def handler(request):
+        return web.json_response(
+            {
+                "hits": 0,
+                "data": [],
+                "query": dict(request.query),
+                "accept": request.headers["accept"],
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/kg/v3/dql", handler)
+    return TestServer(app)
+
+
+class TestHttpxTransport:
+    @pytest.mark.asyncio
+    async def test_request(self):
+        pytest.importorskip("httpx")
+        pytest.importorskip("h2")
+
+        async with await _app_server() as server:
+            url = server.make_url("/kg/v3/dql")
+            async with DiffbotSession(transport=HttpxTransport()) as session:
+                resp = await session.get(url, params={"query": "x"}, headers={})
+
+        assert resp.content["query"] == {"query": "x"}
+        assert resp.content["accept"] == "application/json"
+
+
+class TestAiohttpTransport:
+    @pytest.mark.asyncio
+    async def test_default_transport(self):
+        session = DiffbotSession()
+        await session.open()
+
+        assert isinstance(session._session, AiohttpTransport)
+        assert not session._session.closed
+
+        await session.close()
+        assert session._session.closed
+
+    def test_request_before_open(self):
+        with pytest.raises(RuntimeError, match="not open"):
+            AiohttpTransport().request("GET", "http://localhost")
@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock, PropertyMock
+from unittest.mock import AsyncMock, MagicMock, PropertyMock
 
 import pytest
 from multidict import CIMultiDict, CIMultiDictProxy
@@ -8,17 +8,42 @@ from diffbot_kg.models.response.base import (
     BaseJsonDiffbotResponse,
     BaseJsonLinesDiffbotResponse,
     BaseTextDiffbotResponse,
+    MappedJsonLines,
+    aiter_lines,
 )
 from diffbot_kg.models.response.bulkjob_create import DiffbotBulkJobCreateResponse
 from diffbot_kg.models.response.bulkjob_results import DiffbotBulkJobResultsResponse
 from diffbot_kg.models.response.bulkjob_status import DiffbotBulkJobStatusResponse
+from diffbot_kg.models.response.coverage_report import (
+    CoverageSummary,
+    DiffbotCoverageReportResponse,
+    aiter_coverage_rows,
+    iter_coverage_rows,
+)
 from diffbot_kg.models.response.entities import DiffbotEntitiesResponse
+from diffbot_kg.models.response.facet import DiffbotFacetResponse, FacetTable
+from diffbot_kg.models.response.raw import RawDiffbotResponse
 
 
 def _mock_headers(extra=None):
     return CIMultiDictProxy(CIMultiDict(extra or {}))
 
 
+def _mock_streamed_response(content_type, body, chunk_size=7):
+    async def iter_chunked(n):
+        for i in range(0, len(body), chunk_size):
+            yield body[i : i + chunk_size]
+
+    resp = MagicMock()
+    resp.status = 200
+    resp.content_type = content_type
+    resp.content_length = None
+    resp.headers = _mock_headers()
+    resp.get_encoding.return_value = "utf-8"
+    resp.content.iter_chunked = iter_chunked
+    return resp
+
+
 def _mock_aiohttp_response(content_type, json_data=None, text_data="", status=200, headers=None):
     resp = AsyncMock()
     resp.status = status
@@ -71,6 +96,128 @@ class TestBaseDiffbotResponse:
         mock.text.assert_awaited_once()
 
 
+class TestSpilledResponse:
+    @pytest.mark.asyncio
+    async def test_small_body_stays_in_memory(self):
+        mock = _mock_streamed_response("application/json-lines", b'{"hits": 1}\n')
+
+        resp = await BaseDiffbotResponse.create(mock, spill_threshold=1024)
+
+        assert resp.content == [{"hits": 1}]
+
+    @pytest.mark.asyncio
+    async def test_json_lines_are_mapped(self, tmp_path):
+        body = b"".join(b'{"id": %d}\n' % i for i in range(20))
+        mock = _mock_streamed_response("application/json-lines", body)
+
+        resp = await BaseDiffbotResponse.create(
+            mock, spill_threshold=16, spill_dir=str(tmp_path)
+        )
+
+        with resp:
+            assert isinstance(resp.content, MappedJsonLines)
+            assert len(resp.content) == 20
+            assert resp.content[3] == {"id": 3}
+            assert resp.content[-1] == {"id": 19}
+            assert resp.content[1:3] == [{"id": 1}, {"id": 2}]
+            assert [r["id"] for r in resp.content] == list(range(20))
+        assert resp.content.closed
+
+    @pytest.mark.asyncio
+    async def test_large_text_is_not_spilled(self):
+        body = "col1,col2\n" + "é,1\n" * 50
+        mock = _mock_streamed_response("text/csv", body.encode())
+        mock.text = AsyncMock(return_value=body)
+
+        resp = await BaseDiffbotResponse.create(mock, spill_threshold=16)
+
+        assert resp.content == body
+        resp.close()
+
+
+class TestRawDiffbotResponse:
+    @pytest.mark.asyncio
+    async def test_create_keeps_body_undecoded(self):
+        body = b'{"hits": 1}'
+        mock = _mock_streamed_response("application/json", body)
+        mock.read = AsyncMock(return_value=body)
+
+        resp = await RawDiffbotResponse.create(mock)
+
+        assert resp.body == body
+        assert not resp.spilled
+        assert b"".join(resp.iter_chunks(4)) == body
+
+    @pytest.mark.asyncio
+    async def test_large_body_is_spilled(self):
+        body = b"x" * 100
+        mock = _mock_streamed_response("application/json", body)
+
+        resp = await RawDiffbotResponse.create(mock, spill_threshold=16)
+
+        assert resp.spilled
+        assert list(resp.iter_chunks(40)) == [b"x" * 40, b"x" * 40, b"x" * 20]
+        assert resp.body == body
+        resp.close()
+
+
+class TestMappedJsonLines:
+    def test_blank_lines_and_missing_newline(self, tmp_path):
+        path = tmp_path / "body.jsonl"
+        path.write_bytes(b'{"a": 1}\n\n{"b": 2}')
+
+        lines = MappedJsonLines(open(path, "rb"))
+
+        assert list(lines) == [{"a": 1}, {"b": 2}]
+        assert lines[1] == {"b": 2}
+        with pytest.raises(IndexError):
+            lines[2]
+        lines.close()
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / "body.jsonl"
+        path.write_bytes(b"")
+
+        lines = MappedJsonLines(open(path, "rb"))
+
+        assert len(lines) == 0
+        assert list(lines) == []
+        lines.close()
+
+    def test_close_is_idempotent(self, tmp_path):
+        path = tmp_path / "body.jsonl"
+        path.write_bytes(b'{"a": 1}\n')
+        file = open(path, "rb")
+
+        with MappedJsonLines(file) as lines:
+            assert lines[0] == {"a": 1}
+        lines.close()
+
+        assert lines.closed
+        assert file.closed
+
+    def test_finalizer_closes_file(self, tmp_path):
+        path = tmp_path / "body.jsonl"
+        path.write_bytes(b'{"a": 1}\n')
+        file = open(path, "rb")
+
+        lines = MappedJsonLines(file)
+        del lines
+
+        assert file.closed
+
+
+@pytest.mark.asyncio
+async def test_aiter_lines_joins_split_chunks():
+    async def chunks():
+        for chunk in (b'{"a":', b'1}\n{"b"', b":2}\n\n", b'{"c":3}'):
+            yield chunk
+
+    lines = [line async for line in aiter_lines(chunks())]
+
+    assert lines == [b'{"a":1}', b'{"b":2}', b"", b'{"c":3}']
+
+
 class TestBaseJsonDiffbotResponse:
     def test_content_type(self):
         resp = BaseJsonDiffbotResponse(200, _mock_headers(), {"key": "val"})
@@ -190,3 +337,88 @@ class TestDiffbotBulkJobResultsResponse:
         assert len(resp.entities) == 2
         assert resp.entities[0]["id"] == "e1"
         assert resp.entities[1]["id"] == "e2"
+
+
+COVERAGE_CSV = """Field,Count,Coverage %,Type
+name,100,100%,String
+"location.city, name",40,40.0%,String
+revenue,25,25%,Money
+"""
+
+
+class TestCoverageReport:
+    def test_iter_rows(self):
+        rows = list(iter_coverage_rows(COVERAGE_CSV.splitlines()))
+
+        assert [r.field for r in rows] == ["name", "location.city, name", "revenue"]
+        assert rows[1].counts == {"Count": 40}
+        assert rows[1].percentages == {"Coverage %": 40.0}
+        assert rows[1].extra == {"Type": "String"}
+
+    def test_ratio_column_is_percentage(self):
+        rows = list(iter_coverage_rows(["field,coverage", "name,1"]))
+
+        assert rows[0].percentages == {"coverage": 1.0}
+        assert rows[0].counts == {}
+
+    @pytest.mark.asyncio
+    async def test_aiter_rows(self):
+        async def lines():
+            for line in COVERAGE_CSV.splitlines(keepends=True):
+                yield line.encode()
+
+        rows = [row async for row in aiter_coverage_rows(lines())]
+
+        assert len(rows) == 3
+        assert rows[2].counts == {"Count": 25}
+
+    @pytest.mark.asyncio
+    async def test_aiter_rows_with_quoted_newline(self):
+        body = b'Field,Count,Note\nname,10,"two\nlines, ""quoted"""\ntype,5,x'
+
+        async def chunks():
+            for i in range(0, len(body), 4):
+                yield body[i : i + 4]
+
+        rows = [row async for row in aiter_coverage_rows(chunks())]
+
+        assert [r.field for r in rows] == ["name", "type"]
+        assert rows[0].extra == {"Note": 'two\nlines, "quoted"'}
+        assert rows[1].counts == {"Count": 5}
+
+    def test_summary(self):
+        resp = DiffbotCoverageReportResponse(200, _mock_headers(), COVERAGE_CSV)
+        summary = resp.summary()
+
+        assert summary.fields == 3
+        assert summary.totals == {"Count": 165}
+        assert summary.mean("Coverage %") == pytest.approx(55.0)
+        assert summary.below("Coverage %", 50) == {
+            "revenue": 25.0,
+            "location.city, name": 40.0,
+        }
+        assert summary.lowest("Coverage %", 1) == [("revenue", 25.0)]
+
+    def test_summary_unknown_column(self):
+        assert CoverageSummary().mean("missing") == 0.0
+
+
+class TestDiffbotFacetResponse:
+    def test_counts(self):
+        content = {"data": [{"value": "US", "count": 5}, {"key": 2001, "count": 3}]}
+        resp = DiffbotFacetResponse(200, _mock_headers(), content)
+
+        assert resp.counts == {"US": 5, "2001": 3}
+        assert len(resp.buckets) == 2
+
+
+class TestFacetTable:
+    def test_add_sums_counts(self):
+        table = FacetTable()
+        table.add("country", {"US": 2, "DE": 1})
+        table.add("country", {"US": 3})
+
+        assert table["country"] == {"US": 5, "DE": 1}
+        assert table.total("country") == 6
+        assert "country" in table
+        assert list(table.rows()) == [("country", "US", 5), ("country", "DE", 1)]
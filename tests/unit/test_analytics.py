@@ -0,0 +1,112 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from diffbot_kg.analytics import EntityFrame, iter_entities  # noqa: E402
+from diffbot_kg.models.response import DiffbotEntitiesResponse  # noqa: E402
+from diffbot_kg.models.response.bulkjob_results import (  # noqa: E402
+    DiffbotBulkJobResultsResponse,
+)
+
+ENTITIES = [
+    {
+        "id": "O1",
+        "type": "Organization",
+        "nbEmployees": 120,
+        "revenue": {"value": 5e6, "currency": "USD"},
+        "foundingDate": {
+            "str": "d2001-01-01",
+            "precision": 3,
+            "timestamp": 978307200000,
+        },
+        "location": {"latitude": 52.5, "longitude": 13.4},
+    },
+    {
+        "id": "O2",
+        "type": "Organization",
+        "nbEmployees": 4000,
+        "foundingDate": {"str": "d1990-XX-XX", "precision": 1},
+    },
+    {"id": "P1", "type": "Person", "nbEmployees": "many"},
+]
+
+
+def _frame(source=ENTITIES):
+    return EntityFrame.from_entities(
+        source,
+        numeric=["nbEmployees", "revenue.value", "location.latitude"],
+        dates=["foundingDate"],
+    )
+
+
+def test_from_entities_masks_missing_values():
+    frame = _frame()
+
+    assert len(frame) == 3
+    assert list(frame.ids) == ["O1", "O2", "P1"]
+    employees = frame["nbEmployees"]
+    assert employees.dtype == np.float64
+    assert list(employees.mask) == [False, False, True]
+    assert employees[1] == 4000
+    assert list(frame["revenue.value"].mask) == [False, True, True]
+    dates = frame["foundingDate"]
+    assert dates.dtype == np.dtype("datetime64[ms]")
+    assert dates[0] == np.datetime64("2001-01-01")
+    assert list(dates.mask) == [False, True, True]
+
+
+def test_sources():
+    search = DiffbotEntitiesResponse(  # type: ignore
+        200, {}, {"data": [{"entity": e} for e in ENTITIES]}
+    )
+    results = DiffbotBulkJobResultsResponse(  # type: ignore
+        200, {}, [{"data": [{"entity": e}]} for e in ENTITIES]
+    )
+
+    for source in (search, results, search.content["data"]):
+        assert [e["id"] for e in iter_entities(source)] == ["O1", "O2", "P1"]
+
+
+@pytest.mark.asyncio
+async def test_from_stream():
+    async def stream():
+        for entity in ENTITIES:
+            yield {"data": [{"entity": entity}]}
+
+    frame = await EntityFrame.from_stream(stream(), numeric=["nbEmployees"])
+
+    assert list(frame["nbEmployees"].filled(0)) == [120, 4000, 0]
+
+
+def test_filter_treats_missing_as_false():
+    frame = _frame()
+
+    large = frame.filter(frame["nbEmployees"] > 100)
+
+    assert list(large.ids) == ["O1", "O2"]
+    assert list(large["revenue.value"].mask) == [False, True]
+
+
+def test_group_by_type():
+    groups = _frame().group_by_type()
+
+    assert sorted(groups) == ["Organization", "Person"]
+    assert list(groups["Organization"].ids) == ["O1", "O2"]
+    assert len(groups["Person"]) == 1
+
+
+def test_summary():
+    summary = _frame().summary()
+
+    employees = summary["nbEmployees"]
+    assert (employees.count, employees.missing) == (2, 1)
+    assert (employees.min, employees.max, employees.median) == (120, 4000, 2060)
+    assert summary["foundingDate"].min == np.datetime64("2001-01-01")
+    assert summary["location.latitude"].mean == 52.5
+
+
+def test_summary_of_empty_field():
+    summary = EntityFrame.from_entities([], numeric=["nbEmployees"]).summary()
+
+    assert summary["nbEmployees"].count == 0
+    assert summary["nbEmployees"].mean is None
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from diffbot_kg.bulkjob import BulkJobIndexWriter, BulkJobResultFile, input_key
+
+
+def _result(job_idx, custom_id, entity_id):
+    return {
+        "request_ctx": {
+            "query": {"name": entity_id, "customId": custom_id},
+            "query_ctx": {"bulkjobId": "job-1", "jobIdx": job_idx},
+        },
+        "data": [{"entity": {"id": entity_id}}],
+    }
+
+
+def _write(path, results, key=None):
+    index = BulkJobIndexWriter(key)
+    with open(path, "wb") as f:
+        for result in results:
+            line = json.dumps(result).encode()
+            index.add(line, f.tell())
+            f.write(line + b"\n")
+    index.write(path)
+
+
+def test_input_key():
+    result = _result(0, "c0", "E0")
+
+    assert input_key(result, "customId") == "c0"
+    assert input_key(result, lambda r: r["data"][0]["entity"]["id"]) == "E0"
+    assert input_key({}, "customId") is None
+
+
+class TestBulkJobResultFile:
+    def test_random_access_by_job_idx(self, tmp_path):
+        path = BulkJobResultFile.path_for(tmp_path, "job-1")
+        # Results arrive out of order and job 2 has none.
+        _write(
+            path,
+            [_result(3, "c3", "E3"), _result(0, "c0", "E0"), _result(1, "c1", "E1")],
+        )
+
+        with BulkJobResultFile.open(tmp_path, "job-1") as results:
+            assert results.bulkjobId == "job-1"
+            assert len(results) == 4
+            assert results[3]["data"][0]["entity"]["id"] == "E3"
+            assert results[0]["data"][0]["entity"]["id"] == "E0"
+            assert results[2] is None
+            assert [r and r["request_ctx"]["query"]["customId"] for r in results] == [
+                "c0",
+                "c1",
+                None,
+                "c3",
+            ]
+
+    def test_by_key(self, tmp_path):
+        path = tmp_path / "job-1.jsonl"
+        _write(path, [_result(0, "c0", "E0"), _result(1, "c1", "E1")], key="customId")
+
+        with BulkJobResultFile(path) as results:
+            assert results.by_key("c1")["data"][0]["entity"]["id"] == "E1"
+            assert results.by_key("missing") is None
+
+    def test_line_order_without_job_idx(self, tmp_path):
+        path = tmp_path / "job-1.jsonl"
+        _write(path, [{"data": [], "n": 0}, {"data": [], "n": 1}])
+
+        with BulkJobResultFile(path) as results:
+            assert [r["n"] for r in results] == [0, 1]
+
+    def test_rejects_foreign_index(self, tmp_path):
+        path = tmp_path / "job-1.jsonl"
+        path.write_bytes(b"")
+        BulkJobResultFile.index_path(path).write_bytes(b"nope")
+
+        with pytest.raises(ValueError):
+            BulkJobResultFile(path)
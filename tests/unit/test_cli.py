@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from diffbot_kg import cli
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.models.response import (
+    DiffbotBulkJobCreateResponse,
+    DiffbotBulkJobStatusResponse,
+    DiffbotEntitiesResponse,
+)
+
+
+def _search_pages(hits):
+    calls = []
+
+    async def search(self, params):
+        calls.append(params["from"])
+        start = params["from"]
+        ids = range(start, min(start + params["size"], hits))
+        data = [{"entity": {"id": f"E{i}"}} for i in ids]
+        return DiffbotEntitiesResponse(200, {}, {"hits": hits, "data": data})  # type: ignore
+
+    return search, calls
+
+
+def _read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSearchExport:
+    def test_export_in_numbered_files(self, mocker, tmp_path):
+        search, calls = _search_pages(hits=25)
+        mocker.patch.object(DiffbotSearchClient, "search", search)
+        out = tmp_path / "out.jsonl"
+
+        cli.main(
+            ["--token", "t", "-q", "search-export", "type:X", "-o", str(out),
+             "--page-size", "5", "--pages-per-file", "2"]
+        )  # fmt: skip
+
+        files = sorted(tmp_path.glob("out-*.jsonl"))
+        assert [f.name for f in files] == [f"out-0000{i}.jsonl" for i in range(3)]
+        ids = [e["id"] for f in files for e in _read_jsonl(f)]
+        assert ids == [f"E{i}" for i in range(25)]
+        assert sorted(calls) == [0, 5, 10, 15, 20]
+
+    def test_resume_from_checkpoint(self, mocker, tmp_path):
+        search, calls = _search_pages(hits=20)
+        mocker.patch.object(DiffbotSearchClient, "search", search)
+        out = tmp_path / "out.jsonl"
+        ckpt = tmp_path / "run.ckpt"
+        argv = ["--token", "t", "-q", "--checkpoint", str(ckpt), "search-export",
+                "type:X", "-o", str(out), "--page-size", "5", "--pages-per-file", "2"]  # fmt: skip
+
+        cli.main(argv)
+        state = json.loads(ckpt.read_text())
+        # Pretend the run stopped after the first file.
+        (tmp_path / "out-00001.jsonl").unlink()
+        ckpt.write_text(
+            json.dumps({**state, "files": state["files"][:1], "next_offset": 10})
+        )
+        calls.clear()
+
+        cli.main(argv)
+
+        assert sorted(calls) == [10, 15]
+        files = sorted(tmp_path.glob("out-*.jsonl"))
+        ids = [e["id"] for f in files for e in _read_jsonl(f)]
+        assert ids == [f"E{i}" for i in range(20)]
+
+    def test_checkpoint_of_other_run_is_rejected(self, tmp_path):
+        ckpt = tmp_path / "run.ckpt"
+        ckpt.write_text(json.dumps({"identity": {"query": "other"}}))
+
+        with pytest.raises(SystemExit):
+            cli.main(["--token", "t", "--checkpoint", str(ckpt), "search-export",
+                      "type:X", "-o", str(tmp_path / "out.jsonl")])  # fmt: skip
+
+
+class TestEnhanceFile:
+    def test_concurrent(self, mocker, tmp_path):
+        async def enhance(self, params):
+            if params["name"] == "bad":
+                raise RuntimeError("boom")
+            data = [{"entity": {"name": params["name"]}}]
+            return DiffbotEntitiesResponse(200, {}, {"data": data})  # type: ignore
+
+        mocker.patch.object(DiffbotEnhanceClient, "enhance", enhance)
+        inputs = tmp_path / "in.csv"
+        inputs.write_text("name,url\nA,a.com\nbad,\nC,c.com\n")
+        out = tmp_path / "out.jsonl"
+
+        cli.main(["--token", "t", "-q", "enhance-file", str(inputs), "-o", str(out)])
+
+        records = _read_jsonl(out)
+        assert [r["index"] for r in records] == [0, 1, 2]
+        assert records[0]["input"] == {"name": "A", "url": "a.com"}
+        assert records[0]["data"][0]["entity"]["name"] == "A"
+        assert records[1]["input"] == {"name": "bad"}
+        assert "boom" in records[1]["error"]
+
+    def test_bulk_resumes_submitted_job(self, mocker, tmp_path):
+        inputs = tmp_path / "in.jsonl"
+        inputs.write_text("".join(json.dumps({"name": n}) + "\n" for n in "ABC"))
+        out = tmp_path / "out.jsonl"
+        ckpt = tmp_path / "run.ckpt"
+        argv = ["--token", "t", "-q", "--checkpoint", str(ckpt), "enhance-file",
+                str(inputs), "-o", str(out), "--mode", "bulk", "--bulk-size", "2"]  # fmt: skip
+        identity = {"command": "enhance-file", "input": str(inputs),
+                    "output": str(out), "mode": "bulk"}  # fmt: skip
+        # A previous run submitted the first job and then stopped.
+        ckpt.write_text(
+            json.dumps({"identity": identity, "job": {"id": "job-0", "count": 2}})
+        )
+
+        created = []
+
+        async def create_bulkjob(self, json, params=None):
+            created.append(json)
+            content = {"job_id": f"job-{len(created)}"}
+            return DiffbotBulkJobCreateResponse(200, {}, content)  # type: ignore
+
+        async def wait_for_bulkjob(self, bulkjobId, interval=10, timeout=None):
+            content = {"content": {"status": "COMPLETE"}}
+            return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+        async def stream_bulkjob_results(self, bulkjobId):
+            yield {"job": bulkjobId}
+
+        mocker.patch.object(DiffbotEnhanceClient, "create_bulkjob", create_bulkjob)
+        mocker.patch.object(DiffbotEnhanceClient, "wait_for_bulkjob", wait_for_bulkjob)
+        mocker.patch.object(
+            DiffbotEnhanceClient, "stream_bulkjob_results", stream_bulkjob_results
+        )
+
+        cli.main(argv)
+
+        assert created == [[{"name": "C"}]]
+        assert _read_jsonl(out) == [{"job": "job-0"}, {"job": "job-1"}]
+        assert json.loads(ckpt.read_text())["done"] == 3
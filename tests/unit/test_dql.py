@@ -0,0 +1,101 @@
+from diffbot_kg import dql
+
+
+def _length(query):
+    return len(query)
+
+
+class TestQuote:
+    def test_escapes_quotes_and_backslashes(self):
+        assert dql.quote('a"b\\c') == '"a\\"b\\\\c"'
+
+    def test_or_clause(self):
+        assert dql.or_clause("id", ["E1", "E2"]) == 'id:or("E1","E2")'
+
+
+class TestFindOrLists:
+    def test_finds_clauses(self):
+        query = 'type:Organization id:or("E1", "E2") location.country.name:or("US")'
+
+        found = dql.find_or_lists(query)
+
+        assert [o.field for o in found] == ["id", "location.country.name"]
+        assert found[0].values == ['"E1"', '"E2"']
+        assert query[found[0].start : found[0].end] == 'id:or("E1", "E2")'
+
+    def test_ignores_parens_and_commas_in_quotes(self):
+        found = dql.find_or_lists('name:or("A, Inc.", "B (US)")')
+
+        assert found[0].values == ['"A, Inc."', '"B (US)"']
+
+    def test_unbalanced_is_skipped(self):
+        assert dql.find_or_lists('id:or("E1"') == []
+
+    def test_ignores_nested_clauses(self):
+        query = 'type:Organization not(id:or("E1","E2")) name:or("A","B")'
+
+        found = dql.find_or_lists(query)
+
+        assert [o.field for o in found] == ["name"]
+
+    def test_ignores_clauses_in_quotes(self):
+        assert dql.find_or_lists('description:"see id:or(x)"') == []
+
+
+class TestSplitOrQuery:
+    def test_small_query_is_unchanged(self):
+        query = 'type:Organization id:or("E1","E2")'
+
+        assert dql.split_or_query(query, _length, 1000) == [query]
+
+    def test_no_or_list_is_unchanged(self):
+        assert dql.split_or_query("type:Person", _length, 1) == ["type:Person"]
+
+    def test_splits_largest_list_under_limit(self):
+        ids = [f"E{i:04d}" for i in range(100)]
+        query = f"type:Organization {dql.or_clause('id', ids)} has:name"
+
+        parts = dql.split_or_query(query, _length, 200)
+
+        assert len(parts) > 1
+        assert all(len(p) <= 200 for p in parts)
+        assert all(p.startswith("type:Organization id:or(") for p in parts)
+        assert all(p.endswith(") has:name") for p in parts)
+        values = [v for p in parts for v in dql.find_or_lists(p)[0].values]
+        assert values == [dql.quote(i) for i in ids]
+
+    def test_negated_list_is_not_split(self):
+        query = f"type:Organization not({dql.or_clause('id', ['E1', 'E2', 'E3'])})"
+
+        assert dql.split_or_query(query, _length, 10, max_values=1) == [query]
+
+    def test_max_values(self):
+        query = dql.or_clause("id", ["E1", "E2", "E3"])
+
+        parts = dql.split_or_query(query, _length, 1000, max_values=2)
+
+        assert parts == ['id:or("E1","E2")', 'id:or("E3")']
+
+
+class TestIsSorted:
+    def test_sort_clauses(self):
+        assert dql.is_sorted("type:Organization sortBy:nbEmployees")
+        assert dql.is_sorted("type:Organization revSortBy:importance")
+
+    def test_unsorted(self):
+        assert not dql.is_sorted('type:Organization name:"sortBy:x"')
+
+
+class TestParseSimpleQuery:
+    def test_type_and_name(self):
+        parsed = dql.parse_simple_query('type:Organization name:"Acme \\"Inc\\""')
+
+        assert parsed == {"type": ["Organization"], "name": ['Acme "Inc"']}
+
+    def test_or_list(self):
+        assert dql.parse_simple_query('id:or("E1", "E2")') == {"id": ["E1", "E2"]}
+
+    def test_other_clauses_are_rejected(self):
+        assert dql.parse_simple_query("type:Organization nbEmployees>10") is None
+        assert dql.parse_simple_query("type:Organization has:name") is None
+        assert dql.parse_simple_query("") is None
@@ -0,0 +1,215 @@
+import csv
+import gzip
+import importlib.util
+import json
+import time
+
+import pytest
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.export import (
+    CsvSink,
+    ExportPipeline,
+    JsonLinesSink,
+    ParquetSink,
+    get_path,
+    search_entities,
+)
+from diffbot_kg.models.response import DiffbotEntitiesResponse
+
+# trunk-ignore(bandit/B105)
+TOKEN = "test_token"
+
+
+async def _records(n):
+    for i in range(n):
+        yield {
+            "id": f"E{i}",
+            "name": f"Name {i}",
+            "locations": [{"city": {"name": "X"}}],
+        }
+
+
+def _read_jsonl(path, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_get_path():
+    entity = {"revenue": {"value": 5}, "locations": [{"city": {"name": "Paris"}}]}
+
+    assert get_path(entity, "revenue.value") == 5
+    assert get_path(entity, "locations.city.name") == "Paris"
+    assert get_path(entity, "revenue.currency") is None
+    assert get_path(entity, "missing.value") is None
+
+
+class TestJsonLinesSink:
+    @pytest.mark.asyncio
+    async def test_export(self, tmp_path):
+        path = tmp_path / "out.jsonl"
+
+        stats = await ExportPipeline(JsonLinesSink(path), batch_size=3).run(
+            _records(10)
+        )
+
+        assert stats.records == 10
+        assert stats.batches >= 4
+        assert stats.files == [path]
+        assert [r["id"] for r in _read_jsonl(path)] == [f"E{i}" for i in range(10)]
+        assert not list(tmp_path.glob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_compress_and_rotate(self, tmp_path):
+        sink = JsonLinesSink(tmp_path / "out.jsonl.gz", compress=True, rotate_bytes=200)
+
+        stats = await ExportPipeline(sink, batch_size=2).run(_records(10))
+
+        assert len(stats.files) > 1
+        assert stats.files[0].name == "out-00000.jsonl.gz"
+        records = [r for path in stats.files for r in _read_jsonl(path, compress=True)]
+        assert [r["id"] for r in records] == [f"E{i}" for i in range(10)]
+
+    def test_numbered_rotate(self, tmp_path):
+        sink = JsonLinesSink(tmp_path / "out.jsonl", numbered=True, first_index=3)
+
+        sink.write([{"id": "E1"}])
+        first = sink.rotate()
+        assert sink.rotate() is None
+        sink.write([{"id": "E2"}])
+        sink.close()
+
+        assert first == tmp_path / "out-00003.jsonl"
+        assert sink.paths == [first, tmp_path / "out-00004.jsonl"]
+        assert _read_jsonl(sink.paths[1]) == [{"id": "E2"}]
+
+    @pytest.mark.asyncio
+    async def test_empty_source_writes_empty_file(self, tmp_path):
+        path = tmp_path / "out.jsonl"
+
+        stats = await ExportPipeline(JsonLinesSink(path)).run(_records(0))
+
+        assert stats.records == 0
+        assert path.read_bytes() == b""
+
+    @pytest.mark.asyncio
+    async def test_source_error_aborts(self, tmp_path):
+        async def failing():
+            yield {"id": "E1"}
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await ExportPipeline(JsonLinesSink(tmp_path / "out.jsonl")).run(failing())
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestCsvSink:
+    @pytest.mark.asyncio
+    async def test_field_mapping(self, tmp_path):
+        path = tmp_path / "out.csv"
+        sink = CsvSink(
+            path, {"ID": "id", "City": "locations.city.name", "Tags": "tags"}
+        )
+
+        await ExportPipeline(sink).run(_records(2))
+
+        rows = list(csv.reader(path.read_text().splitlines()))
+        assert rows == [["ID", "City", "Tags"], ["E0", "X", ""], ["E1", "X", ""]]
+
+
+class TestParquetSink:
+    @pytest.mark.asyncio
+    async def test_export(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+        sink = ParquetSink(path, {"id": "id", "city": "locations.city.name"})
+
+        stats = await ExportPipeline(sink, batch_size=3).run(_records(5))
+
+        assert stats.files == [path]
+        assert pq.read_table(path).to_pylist() == [
+            {"id": f"E{i}", "city": "X"} for i in range(5)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_empty_source_writes_valid_file(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+
+        stats = await ExportPipeline(ParquetSink(path)).run(_records(0))
+
+        table = pq.read_table(stats.files[0])
+        assert table.num_rows == 0
+        assert table.column_names == ["id", "entity"]
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pyarrow") is not None, reason="pyarrow is installed"
+)
+def test_parquet_sink_requires_pyarrow(tmp_path):
+    with pytest.raises(ImportError, match="pyarrow"):
+        ParquetSink(tmp_path / "out.parquet")
+
+
+class _ListSink:
+    def __init__(self, produced):
+        self.produced = produced
+        self.records = []
+        self.max_buffered = 0
+
+    def write(self, records):
+        self.records.extend(records)
+        buffered = self.produced() - len(self.records)
+        self.max_buffered = max(self.max_buffered, buffered)
+        time.sleep(0.001)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class TestExportPipeline:
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        produced = 0
+
+        async def source():
+            nonlocal produced
+            for i in range(200):
+                produced += 1
+                yield {"id": i}
+
+        sink = _ListSink(lambda: produced)
+
+        stats = await ExportPipeline(sink, batch_size=5, max_pending=10).run(source())
+
+        assert stats.records == 200
+        assert [r["id"] for r in sink.records] == list(range(200))
+        # The producer never runs more than the queue size (plus the record
+        # waiting to be put) ahead of the sink.
+        assert sink.max_buffered <= 10 + 1
+
+
+@pytest.mark.asyncio
+async def test_search_entities(mocker):
+    client = DiffbotSearchClient(token=TOKEN)
+
+    def page(params):
+        start = params["from"]
+        data = [{"entity": {"id": f"E{i}"}} for i in range(start, min(start + 2, 5))]
+        return DiffbotEntitiesResponse(200, {}, {"hits": 5, "data": data})  # type: ignore
+
+    search = mocker.patch.object(
+        DiffbotSearchClient, "search", side_effect=lambda params: page(params)
+    )
+
+    entities = [e async for e in search_entities(client, {"query": "type:X"}, 2)]
+
+    assert [e["id"] for e in entities] == ["E0", "E1", "E2", "E3", "E4"]
+    assert search.call_count == 3
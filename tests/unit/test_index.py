@@ -0,0 +1,75 @@
+import pytest
+from diffbot_kg.index import EntityHandle, EntityIndex
+
+
+class TestEntityIndex:
+    def test_add_returns_shared_reference(self):
+        index = EntityIndex()
+
+        first = index.add({"id": "E1", "name": "Old", "nbEmployees": 10})
+        second = index.add({"id": "E1", "name": "New"})
+
+        assert first is second
+        assert first == {"id": "E1", "name": "New", "nbEmployees": 10}
+        assert len(index) == 1
+
+    def test_union_lists(self):
+        index = EntityIndex(union_lists=True)
+        a = {"diffbotUri": "http://diffbot.com/entity/A"}
+        b = {"diffbotUri": "http://diffbot.com/entity/B"}
+
+        index.add({"id": "E1", "subsidiaries": [a], "tags": ["x"]})
+        merged = index.add({"id": "E1", "subsidiaries": [b, a], "tags": ["y"]})
+
+        assert merged["subsidiaries"] == [b, a]
+        assert merged["tags"] == ["y", "x"]
+
+    def test_lists_replaced_without_union(self):
+        index = EntityIndex()
+
+        index.add({"id": "E1", "tags": ["x"]})
+
+        assert index.add({"id": "E1", "tags": ["y"]})["tags"] == ["y"]
+
+    def test_timestamp_keeps_newest(self):
+        index = EntityIndex(timestamp=lambda e: e["version"])
+
+        index.add({"id": "E1", "version": 2, "name": "Newer"})
+        merged = index.add({"id": "E1", "version": 1, "name": "Older", "extra": 1})
+
+        assert merged["name"] == "Newer"
+        assert merged["extra"] == 1
+
+    def test_missing_id_raises(self):
+        with pytest.raises(KeyError):
+            EntityIndex().add({"name": "No id"})
+
+    def test_get_and_contains(self):
+        index = EntityIndex()
+        index.add_many([{"id": "E1"}, {"id": "E2"}])
+
+        assert "E1" in index
+        assert index.get("E2") == {"id": "E2"}
+        assert index.get("E3") is None
+        assert list(index) == ["E1", "E2"]
+
+
+class TestCompactEntityIndex:
+    def test_add_returns_stable_handle(self):
+        index = EntityIndex(compact=True)
+
+        handle = index.add({"id": "E1", "name": "Old"})
+        again = index.add({"id": "E1", "name": "New"})
+
+        assert isinstance(handle, EntityHandle)
+        assert handle is again
+        assert handle["name"] == "New"
+        assert handle.get("missing") is None
+
+    def test_stores_encoded_entities(self):
+        index = EntityIndex(compact=True)
+
+        index.add({"id": "E1", "name": "Ünïcode"})
+
+        assert isinstance(index._entities["E1"], bytes)
+        assert index.get("E1") == {"id": "E1", "name": "Ünïcode"}
@@ -0,0 +1,184 @@
+import json
+
+import pytest
+from diffbot_kg.bulkjob import BulkJobIndexWriter, BulkJobResultFile
+from diffbot_kg.clients import DiffbotEnhanceClient
+from diffbot_kg.journal import (
+    COMPLETE,
+    DOWNLOADED,
+    SUBMITTED,
+    SUBMITTING,
+    BulkEnhancer,
+    BulkJobJournal,
+)
+from diffbot_kg.models.response import (
+    DiffbotBulkJobCreateResponse,
+    DiffbotBulkJobStatusResponse,
+    DiffbotListBulkJobsResponse,
+)
+
+# trunk-ignore(bandit/B105)
+TOKEN = "valid_token"
+
+INPUTS = [{"name": f"N{i}"} for i in range(5)]
+
+
+def _status(state):
+    return DiffbotBulkJobStatusResponse(200, {}, {"content": {"status": state}})  # type: ignore
+
+
+class FakeBulkApi:
+    """Bulk job endpoints backed by a dict of jobs."""
+
+    def __init__(self, mocker):
+        self.jobs: dict[str, list[dict]] = {}
+        self.states: dict[str, str] = {}
+        self.waited: list[str] = []
+        self.downloaded: list[str] = []
+        self.fail_downloads = False
+
+        api = self
+
+        async def create_bulkjob(self, json, params=None):
+            job_id = f"job-{len(api.jobs)}"
+            api.jobs[job_id] = json
+            api.states[job_id] = "COMPLETE"
+            return DiffbotBulkJobCreateResponse(200, {}, {"job_id": job_id})  # type: ignore
+
+        async def list_bulkjobs(self):
+            content = [{"job_id": j, "status": s} for j, s in api.states.items()]
+            return DiffbotListBulkJobsResponse(200, {}, content)  # type: ignore
+
+        async def wait_for_bulkjob(self, bulkjobId, interval=10, timeout=None):
+            api.waited.append(bulkjobId)
+            return _status(api.states[bulkjobId])
+
+        async def download_bulkjob_results(self, bulkjobId, directory, key=None):
+            if api.fail_downloads:
+                raise ConnectionError("network down")
+            api.downloaded.append(bulkjobId)
+            path = BulkJobResultFile.path_for(directory, bulkjobId)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            index = BulkJobIndexWriter(key)
+            with open(path, "wb") as f:
+                for i, params in enumerate(api.jobs[bulkjobId]):
+                    result = {
+                        "request_ctx": {"query": params, "query_ctx": {"jobIdx": i}},
+                        "data": [{"entity": {"name": params["name"]}}],
+                    }
+                    line = json.dumps(result).encode()
+                    index.add(line, f.tell())
+                    f.write(line + b"\n")
+            index.write(path)
+            return BulkJobResultFile(path)
+
+        for name, fn in list(locals().items()):
+            if callable(fn) and hasattr(DiffbotEnhanceClient, name):
+                mocker.patch.object(DiffbotEnhanceClient, name, fn)
+
+
+@pytest.fixture
+def api(mocker):
+    return FakeBulkApi(mocker)
+
+
+def _enhancer(journal, tmp_path, **kwargs):
+    client = DiffbotEnhanceClient(token=TOKEN)
+    return BulkEnhancer(client, journal, tmp_path / "results", chunk_size=2, **kwargs)
+
+
+def _names(files):
+    return [r["data"][0]["entity"]["name"] for f in files for r in f]
+
+
+class TestBulkJobJournal:
+    def test_records_transitions(self, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        journal.begin(0, 0, 2)
+        journal.submitted(0, "job-0")
+        journal.transition(0, COMPLETE)
+        journal.close()
+
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        [chunk] = journal.chunks()
+        assert (chunk.start, chunk.end, chunk.job_id) == (0, 2, "job-0")
+        assert chunk.status == COMPLETE
+        assert [e[2] for e in journal.events(0)] == [SUBMITTING, SUBMITTED, COMPLETE]
+
+
+class TestBulkEnhancer:
+    @pytest.mark.asyncio
+    async def test_run(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+
+        files = await _enhancer(journal, tmp_path).run(INPUTS)
+
+        assert [len(job) for job in api.jobs.values()] == [2, 2, 1]
+        assert _names(files) == [p["name"] for p in INPUTS]
+        chunks = journal.chunks()
+        assert [c.status for c in chunks] == [DOWNLOADED] * 3
+        assert [(c.start, c.end) for c in chunks] == [(0, 2), (2, 4), (4, 5)]
+        assert chunks[0].result_bytes == files[0].path.stat().st_size
+
+    @pytest.mark.asyncio
+    async def test_resume_does_not_resubmit(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        api.fail_downloads = True
+        with pytest.raises(RuntimeError):
+            await _enhancer(journal, tmp_path).run(INPUTS)
+
+        api.fail_downloads = False
+        api.waited.clear()
+        files = await _enhancer(BulkJobJournal(tmp_path / "journal.db"), tmp_path).run(
+            INPUTS
+        )
+
+        assert len(api.jobs) == 3
+        # Already known complete from the first run.
+        assert api.waited == []
+        assert _names(files) == [p["name"] for p in INPUTS]
+
+    @pytest.mark.asyncio
+    async def test_resume_reattaches_and_downloads_only_missing(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        await _enhancer(journal, tmp_path).run(INPUTS)
+        # The process died after submitting chunk 1 and before chunk 2 had an id.
+        journal.transition(1, SUBMITTED)
+        journal.begin(2, 4, 5)
+        api.downloaded.clear()
+
+        files = await _enhancer(journal, tmp_path).run(INPUTS)
+
+        assert list(api.jobs) == ["job-0", "job-1", "job-2", "job-3"]
+        assert api.downloaded == ["job-1", "job-3"]
+        assert _names(files) == [p["name"] for p in INPUTS]
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_resubmitted(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        journal.begin(0, 0, 2)
+        journal.submitted(0, "job-old")
+        api.jobs["job-old"] = INPUTS[:2]
+        api.states["job-old"] = "FAILED"
+
+        await _enhancer(journal, tmp_path).run(INPUTS[:2])
+
+        assert journal.get(0).job_id == "job-1"
+        assert "FAILED" in [e[2] for e in journal.events(0)]
+
+    @pytest.mark.asyncio
+    async def test_changed_inputs_are_rejected(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        await _enhancer(journal, tmp_path).run(INPUTS)
+
+        with pytest.raises(ValueError):
+            await _enhancer(journal, tmp_path).run(INPUTS[:3])
+
+    @pytest.mark.asyncio
+    async def test_reordered_inputs_are_rejected(self, api, tmp_path):
+        journal = BulkJobJournal(tmp_path / "journal.db")
+        await _enhancer(journal, tmp_path).run(INPUTS)
+
+        with pytest.raises(ValueError, match="Chunk 0 had different inputs"):
+            await _enhancer(journal, tmp_path).run([INPUTS[1], INPUTS[0], *INPUTS[2:]])
+        assert len(api.jobs) == 3
@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+from diffbot_kg.partition import (
+    RangePartition,
+    ValueSetPartition,
+    range_partitions,
+    value_partitions,
+)
+
+
+class TestRangePartition:
+    def test_clause(self):
+        part = RangePartition("nbEmployees", 10, 100)
+
+        assert part.clause() == "nbEmployees>=10 nbEmployees<100"
+
+    def test_date_clause(self):
+        part = RangePartition("foundingDate", date(2000, 1, 1), None)
+
+        assert part.clause() == 'foundingDate>="2000-01-01"'
+
+    def test_split_int(self):
+        assert RangePartition("n", 0, 10).split() == [
+            RangePartition("n", 0, 5),
+            RangePartition("n", 5, 10),
+        ]
+
+    def test_split_date(self):
+        lo, hi = RangePartition("d", date(2000, 1, 1), date(2000, 1, 5)).split()
+
+        assert lo.end == hi.start == date(2000, 1, 3)
+
+    @pytest.mark.parametrize(
+        "part",
+        [
+            RangePartition("n", 0, 1),
+            RangePartition("n", None, 10),
+            RangePartition("d", date(2000, 1, 1), date(2000, 1, 2)),
+        ],
+    )
+    def test_unsplittable(self, part):
+        assert part.split() == []
+
+
+class TestValueSetPartition:
+    def test_clause(self):
+        assert ValueSetPartition("f", ("a", "b")).clause() == 'f:or("a","b")'
+
+    def test_split(self):
+        assert ValueSetPartition("f", ("a", "b", "c")).split() == [
+            ValueSetPartition("f", ("a",)),
+            ValueSetPartition("f", ("b", "c")),
+        ]
+
+
+class TestRangePartitions:
+    def test_covers_range(self):
+        parts = range_partitions("n", 0, 100, 4)
+
+        assert [(p.start, p.end) for p in parts] == [
+            (0, 25),
+            (25, 50),
+            (50, 75),
+            (75, 100),
+        ]
+
+    def test_open_ended(self):
+        parts = range_partitions("n", 0, 10, 2, open_ended=True)
+
+        assert parts[0] == RangePartition("n", None, 0)
+        assert parts[-1] == RangePartition("n", 10, None)
+
+    def test_invalid_range_raises(self):
+        with pytest.raises(ValueError):
+            range_partitions("n", 10, 0, 2)
+
+    def test_value_partitions(self):
+        parts = value_partitions("f", ["a", "b", "a", "c"], per_partition=2)
+
+        assert parts == [
+            ValueSetPartition("f", ("a", "b")),
+            ValueSetPartition("f", ("c",)),
+        ]
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from diffbot_kg.clients import DiffbotSearchClient
+from diffbot_kg.clients.session import RetryableException
+from diffbot_kg.store import EntityStore
+from diffbot_kg.models.response import DiffbotEntitiesResponse
+from diffbot_kg.quota import CostModel, QuotaScheduler, QuotaWindow
+
+# trunk-ignore(bandit/B105)
+TOKEN = "valid_token"
+
+
+@pytest.fixture
+def clock(mocker):
+    """A fake clock that asyncio.sleep in the quota module advances."""
+
+    now = [0.0]
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        now[0] += delay
+        await real_sleep(0)
+
+    mocker.patch("diffbot_kg.quota.time.time", lambda: now[0])
+    mocker.patch("diffbot_kg.quota.asyncio.sleep", sleep)
+    return now
+
+
+def _quota(*windows, **kwargs):
+    kwargs.setdefault("burst", 0)
+    kwargs.setdefault("interactive_reserve", 0)
+    return QuotaScheduler(windows, **kwargs)
+
+
+class TestQuotaScheduler:
+    @pytest.mark.asyncio
+    async def test_paces_evenly_across_windows(self, clock):
+        quota = _quota(QuotaWindow(100, 1.0, start=0))
+        admitted = []
+
+        for _ in range(5):
+            async with quota.spend(25, "batch"):
+                admitted.append(clock[0])
+
+        assert admitted == pytest.approx([0, 0.25, 0.5, 0.75, 1.0])
+
+    @pytest.mark.asyncio
+    async def test_interactive_is_not_delayed_but_counted(self, clock):
+        window = QuotaWindow(100, 1.0, start=0)
+        quota = _quota(window)
+
+        async with quota.spend(50, "interactive"):
+            pass
+        async with quota.spend(25, "batch"):
+            admitted = clock[0]
+
+        assert window.spent == 75
+        assert admitted == pytest.approx(0.5)
+
+    @pytest.mark.asyncio
+    async def test_settles_actual_cost(self, clock, mocker):
+        resp = DiffbotEntitiesResponse(  # type: ignore
+            200, {}, {"hits": 2, "data": [{"entity": {}}, {"entity": {}}]}
+        )
+        mocker.patch.object(DiffbotSearchClient, "search", return_value=resp)
+        window = QuotaWindow(10_000, 1.0, start=0)
+        quota = _quota(window, costs=CostModel(per_entity=10))
+        client = DiffbotSearchClient(TOKEN, priority="batch")
+
+        await quota.search(client, {"query": "type:Organization", "size": 50})
+
+        assert window.spent == 20
+
+    @pytest.mark.asyncio
+    async def test_usage_header(self, clock, mocker):
+        resp = DiffbotEntitiesResponse(  # type: ignore
+            200, {"X-Credits-Used": "7"}, {"data": []}
+        )
+        mocker.patch.object(DiffbotSearchClient, "search", return_value=resp)
+        window = QuotaWindow(10_000, 1.0, start=0)
+        quota = _quota(window, usage_header="X-Credits-Used")
+
+        await quota.search(DiffbotSearchClient(TOKEN), {"query": "x"})
+
+        assert window.spent == 7
+
+    @pytest.mark.asyncio
+    async def test_error_response_is_not_charged(self, clock, mocker):
+        mocker.patch.object(
+            DiffbotSearchClient, "search", side_effect=RetryableException()
+        )
+        window = QuotaWindow(10_000, 1.0, start=0)
+        quota = _quota(window, costs=CostModel(per_entity=10, per_request=1))
+
+        with pytest.raises(RetryableException):
+            await quota.search(DiffbotSearchClient(TOKEN), {"query": "x", "size": 5})
+
+        assert window.spent == 1
+
+    @pytest.mark.asyncio
+    async def test_other_failures_keep_the_estimate(self, clock):
+        window = QuotaWindow(10_000, 1.0, start=0)
+        quota = _quota(window)
+
+        with pytest.raises(ConnectionError):
+            async with quota.spend(50, "batch"):
+                raise ConnectionError
+
+        assert window.spent == 50
+
+    @pytest.mark.asyncio
+    async def test_local_answers_are_free(self, clock, mocker):
+        store = EntityStore(read_through=True)
+        store.put({"id": "E1", "name": "Diffbot"})
+        get = mocker.patch("diffbot_kg.clients.session.DiffbotSession.get")
+        window = QuotaWindow(10_000, 1.0, start=0)
+        quota = _quota(window, costs=CostModel(per_entity=10, per_request=1))
+        client = DiffbotSearchClient(TOKEN, store=store)
+
+        resp = await quota.search(client, {"query": 'id:"E1"'})
+
+        get.assert_not_called()
+        assert len(resp.entities) == 1
+        assert window.spent == 0
+
+    @pytest.mark.asyncio
+    async def test_operation_larger_than_window_is_rejected(self, clock):
+        quota = _quota(QuotaWindow(100, 1.0, start=0), interactive_reserve=0.5)
+
+        with pytest.raises(ValueError):
+            async with quota.spend(60, "batch"):
+                pass
+
+    def test_report_projects_completion(self, clock):
+        quota = _quota(QuotaWindow(100, 1.0, start=0), QuotaWindow(150, 10.0, start=0))
+
+        report = quota.report(remaining=250)
+
+        assert report.rate == pytest.approx(15)
+        assert report.eta.timestamp() == pytest.approx(250 / 15)
+        assert report.remaining == [100, 150]
+
+    def test_window_rolls_over(self):
+        window = QuotaWindow(100, 10.0, start=0, spent=80)
+
+        window.roll(25)
+
+        assert (window.start, window.spent) == (20, 0)
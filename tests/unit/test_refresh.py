@@ -0,0 +1,156 @@
+import time
+
+import pytest
+from diffbot_kg.clients.enhance import DiffbotEnhanceClient
+from diffbot_kg.clients.search import DiffbotSearchClient
+from diffbot_kg.clients.session import DiffbotSession
+from diffbot_kg.models.response.base import BaseDiffbotResponse
+from diffbot_kg.refresh import RefreshScheduler, diff_entities
+from diffbot_kg.store import EntityStore
+
+# trunk-ignore(bandit/B105)
+TOKEN = "test_token"
+
+
+def _response(*entities):
+    data = [{"entity": e} for e in entities]
+    return BaseDiffbotResponse(200, {}, {"hits": len(data), "data": data})  # type: ignore
+
+
+class TestDiffEntities:
+    def test_nested_and_added_removed_fields(self):
+        old = {"id": "E1", "name": "A", "revenue": {"value": 1, "currency": "USD"}}
+        new = {"id": "E1", "revenue": {"value": 2, "currency": "USD"}, "tags": ["x"]}
+
+        assert diff_entities(old, new) == {
+            "name": ("A", None),
+            "revenue.value": (1, 2),
+            "tags": (None, ["x"]),
+        }
+
+    def test_ignore(self):
+        assert diff_entities({"importance": 1}, {"importance": 2}, {"importance"}) == {}
+
+
+class TestRefreshScheduler:
+    @pytest.fixture
+    def store(self):
+        store = EntityStore(max_age=60)
+        old = time.time() - 120
+        store.put({"id": "E1", "name": "Same"}, fetched_at=old)
+        store.put({"id": "E2", "name": "Before"}, fetched_at=old)
+        store.put({"id": "E3", "name": "Fresh"})
+        return store
+
+    @pytest.mark.asyncio
+    async def test_refreshes_stale_and_emits_changes(self, mocker, store):
+        events = []
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            return_value=_response(
+                {"id": "E1", "name": "Same"}, {"id": "E2", "name": "After"}
+            ),
+        )
+        scheduler = RefreshScheduler(
+            DiffbotSearchClient(token=TOKEN), store, on_change=events.append
+        )
+
+        report = await scheduler.run_once()
+
+        query = DiffbotSession.get.call_args.kwargs["params"]["query"]
+        assert "E3" not in query
+        assert report.refreshed == 2
+        assert report.unchanged == 1
+        assert report.requests == 1
+        assert [e.id for e in events] == ["E2"]
+        assert events[0].changes == {"name": ("Before", "After")}
+        assert store.stale() == []
+
+    @pytest.mark.asyncio
+    async def test_respects_request_budget(self, mocker, store):
+        mocker.patch.object(DiffbotSession, "get", return_value=_response())
+        scheduler = RefreshScheduler(
+            DiffbotSearchClient(token=TOKEN), store, request_budget=1, batch_size=1
+        )
+
+        report = await scheduler.run_once()
+
+        assert DiffbotSession.get.call_count == 1
+        assert report.requests == 1
+        assert len(report.missing) == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_entity_does_not_block_later_rounds(self, mocker):
+        store = EntityStore(max_age=60)
+        store.put({"id": "E1"}, fetched_at=time.time() - 120)
+        store.put({"id": "E9"}, fetched_at=time.time() - 600)
+
+        async def fake_get(url, params, headers):
+            return _response(*({"id": i} for i in ("E1",) if i in params["query"]))
+
+        mocker.patch.object(DiffbotSession, "get", side_effect=fake_get)
+        scheduler = RefreshScheduler(
+            DiffbotSearchClient(token=TOKEN), store, request_budget=1, batch_size=1
+        )
+
+        first = await scheduler.run_once()
+        second = await scheduler.run_once()
+
+        assert first.missing == ["E9"]
+        assert second.refreshed == 1
+        assert second.missing == []
+        assert store.stale() == []
+        assert store.lookup("E9") is None
+
+    @pytest.mark.asyncio
+    async def test_resolves_missing_through_enhance(self, mocker, store):
+        search = DiffbotSearchClient(token=TOKEN)
+        enhance = DiffbotEnhanceClient(token=TOKEN)
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            side_effect=[
+                _response({"id": "E1", "name": "Same"}),
+                _response({"id": "E9", "name": "Before"}),
+            ],
+        )
+        scheduler = RefreshScheduler(search, store, enhance_client=enhance)
+
+        report = await scheduler.run_once()
+
+        assert report.missing == []
+        assert report.events[0].id == "E2"
+        assert report.events[0].changes == {"id": ("E2", "E9")}
+        assert "E2" not in store.peek_many(["E2"])
+        assert store.lookup("E9") is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_enhance_keeps_fetched_entities(self, mocker, store):
+        search = DiffbotSearchClient(token=TOKEN)
+        enhance = DiffbotEnhanceClient(token=TOKEN)
+        mocker.patch.object(
+            DiffbotSession,
+            "get",
+            side_effect=[_response({"id": "E1", "name": "After"}), ValueError("boom")],
+        )
+        scheduler = RefreshScheduler(search, store, enhance_client=enhance)
+
+        report = await scheduler.run_once()
+
+        assert report.refreshed == 1
+        assert report.missing == ["E2"]
+        assert store.lookup("E1") == {"id": "E1", "name": "After"}
+
+    @pytest.mark.asyncio
+    async def test_nothing_stale_makes_no_request(self, mocker):
+        mocker.patch.object(DiffbotSession, "get")
+        store = EntityStore(max_age=60)
+        store.put({"id": "E1"})
+
+        report = await RefreshScheduler(
+            DiffbotSearchClient(token=TOKEN), store
+        ).run_once()
+
+        DiffbotSession.get.assert_not_called()
+        assert report.refreshed == 0
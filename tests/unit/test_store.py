@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+
+import pytest
+from diffbot_kg.store import EntityStore, homepage_domain
+
+DIFFBOT = {
+    "id": "E1",
+    "type": "Organization",
+    "name": "Diffbot",
+    "homepageUri": "www.diffbot.com",
+}
+APPLE = {
+    "id": "E2",
+    "type": "Organization",
+    "name": "Apple",
+    "homepageUri": "https://www.apple.com/",
+}
+
+
+@pytest.fixture
+def store():
+    with EntityStore() as store:
+        store.put_many([DIFFBOT, APPLE])
+        yield store
+
+
+@pytest.mark.parametrize(
+    "url, domain",
+    [
+        ("www.diffbot.com", "diffbot.com"),
+        ("https://WWW.Apple.com/iphone", "apple.com"),
+        ("diffbot.com", "diffbot.com"),
+        (None, None),
+    ],
+)
+def test_homepage_domain(url, domain):
+    assert homepage_domain(url) == domain
+
+
+class TestEntityStore:
+    def test_lookup(self, store):
+        assert store.lookup("E1") == DIFFBOT
+        assert store.lookup("missing") is None
+
+    def test_lookup_respects_max_age(self, store):
+        store.put({"id": "E3"}, fetched_at=time.time() - 100)
+
+        assert store.lookup("E3", max_age=timedelta(seconds=10)) is None
+        assert store.lookup("E3", max_age=1000) == {"id": "E3"}
+
+    def test_put_replaces(self, store):
+        store.put({**DIFFBOT, "name": "Diffbot Technologies"})
+
+        assert store.lookup("E1")["name"] == "Diffbot Technologies"
+        assert len(store) == 2
+
+    def test_find_by_name_is_case_insensitive(self, store):
+        assert store.find(type="Organization", name="diffbot") == [DIFFBOT]
+
+    def test_find_by_domain(self, store):
+        assert store.find(domain="http://apple.com") == [APPLE]
+
+    def test_find_requires_criterion(self, store):
+        with pytest.raises(ValueError):
+            store.find()
+
+    def test_mapping_interface(self, store):
+        store["E3"] = {"name": "Acme"}
+
+        assert store["E3"] == {"id": "E3", "name": "Acme"}
+        assert set(store) == {"E1", "E2", "E3"}
+        del store["E3"]
+        with pytest.raises(KeyError):
+            store["E3"]
+
+    def test_mapping_hides_stale_entities(self):
+        store = EntityStore(max_age=10)
+        store.put({"id": "E1"}, fetched_at=time.time() - 100)
+
+        assert store.get("E1") is None
+        assert len(store) == 0
+        assert store.fetched_at("E1") is not None
+
+    def test_records_access(self, store):
+        store.lookup("E1")
+        store.lookup("E1")
+
+        count = store._db.execute(
+            "SELECT access_count FROM entities WHERE id = 'E1'"
+        ).fetchone()[0]
+        assert count == 2
+
+
+class TestReadThrough:
+    @pytest.fixture
+    def store(self):
+        store = EntityStore(read_through=True)
+        store.put_many([DIFFBOT, APPLE])
+        return store
+
+    def test_disabled_by_default(self):
+        store = EntityStore()
+        store.put(DIFFBOT)
+
+        assert store.answer_search({"query": 'id:"E1"'}) is None
+        assert store.answer_enhance({"id": "E1"}) is None
+
+    def test_answer_search_by_ids(self, store):
+        assert store.answer_search({"query": 'id:or("E2","E1")'}) == [APPLE, DIFFBOT]
+        assert store.answer_search({"query": 'id:or("E1","E9")'}) is None
+
+    def test_answer_search_size_must_cover_ids(self, store):
+        query = 'id:or("E1","E2")'
+
+        assert store.answer_search({"query": query, "size": 2}) == [DIFFBOT, APPLE]
+        assert store.answer_search({"query": query, "size": 1}) is None
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"query": 'type:Organization name:"Diffbot"'},
+            {"query": 'type:Organization id:"E1"'},
+            {"query": "nbEmployees>10"},
+            {"query": 'id:"E1"', "from": 10},
+            {"query": 'id:"E1"', "filter": "name"},
+        ],
+    )
+    def test_answer_search_only_answers_id_lookups(self, store, params):
+        assert store.answer_search(params) is None
+
+    def test_answer_enhance_by_id(self, store):
+        assert store.answer_enhance({"id": "E2"}) == APPLE
+        assert store.answer_enhance({"id": "E2", "size": 1}) == APPLE
+        assert store.answer_enhance({"id": "E9"}) is None
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"type": "Organization", "name": "Apple"},
+            {"url": "apple.com"},
+            {"id": "E2", "threshold": 0.5},
+        ],
+    )
+    def test_answer_enhance_only_answers_id_lookups(self, store, params):
+        assert store.answer_enhance(params) is None
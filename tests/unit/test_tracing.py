@@ -0,0 +1,109 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from diffbot_kg.clients.session import DiffbotSession, _trace_backoff
+from diffbot_kg.tracing import Tracer, span
+
+
+def _names(tracer):
+    return [e["name"] for e in tracer.events]
+
+
+class TestTracer:
+    def test_span_records_complete_event(self):
+        tracer = Tracer()
+
+        with tracer.span("work", cat="test", size=3) as args:
+            args["extra"] = True
+
+        (event,) = tracer.events
+        assert event["ph"] == "X"
+        assert event["cat"] == "test"
+        assert event["args"] == {"size": 3, "extra": True}
+        assert event["dur"] >= 0
+
+    def test_span_records_error(self):
+        tracer = Tracer()
+
+        with pytest.raises(ValueError), tracer.span("work"):
+            raise ValueError("boom")
+
+        assert "ValueError" in tracer.events[0]["args"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_tasks_get_separate_lanes(self):
+        tracer = Tracer()
+
+        async def work():
+            with tracer.span("work"):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(work(), work())
+
+        assert len({e["tid"] for e in tracer.events}) == 2
+
+    @pytest.mark.asyncio
+    async def test_finished_task_lanes_are_reused(self):
+        tracer = Tracer()
+
+        async def work():
+            with tracer.span("work"):
+                await asyncio.sleep(0)
+
+        for _ in range(20):
+            await asyncio.gather(work(), work())
+
+        assert {e["tid"] for e in tracer.events} == {1, 2}
+
+    def test_dump(self, tmp_path):
+        tracer = Tracer(process_name="test")
+        tracer.instant("started")
+        path = tmp_path / "trace.json"
+
+        tracer.dump(path)
+
+        trace = json.loads(path.read_text())
+        assert trace["traceEvents"][0]["args"] == {"name": "test"}
+        assert trace["traceEvents"][1]["name"] == "started"
+
+    def test_span_without_tracer_is_noop(self):
+        with span(None, "work", size=1) as args:
+            assert args == {"size": 1}
+
+
+class TestSessionTracing:
+    @pytest.mark.asyncio
+    async def test_request_breakdown(self):
+        async def handler(request):
+            return web.json_response({"hits": 0, "data": []})
+
+        app = web.Application()
+        app.router.add_get("/dql", handler)
+        tracer = Tracer()
+
+        async with TestServer(app) as server, DiffbotSession(tracer=tracer) as session:
+            resp = await session.get(server.make_url("/dql"))
+
+        assert resp.content == {"hits": 0, "data": []}
+        names = _names(tracer)
+        for name in ("queued", "connecting", "waiting", "reading", "decoding"):
+            assert name in names
+        request = next(e for e in tracer.events if e["name"] == "request")
+        assert request["args"]["method"] == "GET"
+
+    def test_retry_backoff_span(self):
+        tracer = Tracer()
+        state = MagicMock()
+        state.args = (DiffbotSession(tracer=tracer),)
+        state.next_action.sleep = 2.5
+        state.attempt_number = 1
+
+        _trace_backoff(state)
+
+        (event,) = tracer.events
+        assert event["name"] == "retry backoff"
+        assert event["dur"] == pytest.approx(2.5e6)
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from diffbot_kg.models.lookup import EntityLookupResult
+from diffbot_kg.traversal import (
+    KnowledgeGraphTraversal,
+    entity_id_from_uri,
+    related_ids,
+)
+
+
+def _ref(entity_id):
+    return {"diffbotUri": f"http://diffbot.com/entity/{entity_id}", "name": entity_id}
+
+
+GRAPH = {
+    "A": {"id": "A", "subsidiaries": [_ref("B"), _ref("C")], "ceo": _ref("P")},
+    "B": {"id": "B", "parentCompany": _ref("A"), "subsidiaries": [_ref("D")]},
+    "C": {"id": "C", "parentCompany": _ref("A")},
+    "D": {"id": "D", "parentCompany": _ref("B")},
+    "P": {"id": "P"},
+}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    async def get_entities(self, ids, cache=None, batch_size=100):
+        self.calls.append(list(ids))
+        await asyncio.sleep(0)
+        found = {i: GRAPH[i] for i in ids if i in GRAPH}
+        return EntityLookupResult(found, [i for i in ids if i not in GRAPH], requests=1)
+
+
+def test_entity_id_from_uri():
+    assert entity_id_from_uri("http://diffbot.com/entity/EabC/") == "EabC"
+
+
+def test_related_ids_filters_edge_types():
+    assert related_ids(GRAPH["A"]) == [
+        ("subsidiaries", "B"),
+        ("subsidiaries", "C"),
+        ("ceo", "P"),
+    ]
+    assert related_ids(GRAPH["A"], {"ceo"}) == [("ceo", "P")]
+
+
+class TestKnowledgeGraphTraversal:
+    @pytest.mark.asyncio
+    async def test_bfs_batches_levels_and_dedupes(self):
+        client = FakeClient()
+        traversal = KnowledgeGraphTraversal(
+            client, ["A"], max_depth=2, edge_types={"subsidiaries", "parentCompany"}
+        )
+
+        nodes = [node async for node in traversal]
+
+        assert [(n.id, n.depth) for n in nodes] == [
+            ("A", 0),
+            ("B", 1),
+            ("C", 1),
+            ("D", 2),
+        ]
+        assert client.calls == [["A"], ["B", "C"], ["D"]]
+        assert traversal.requests == 3
+
+    @pytest.mark.asyncio
+    async def test_depth_limit(self):
+        client = FakeClient()
+
+        nodes = [n async for n in KnowledgeGraphTraversal(client, ["A"], max_depth=0)]
+
+        assert [n.id for n in nodes] == ["A"]
+        assert nodes[0].edges[0] == ("subsidiaries", "B")
+        assert client.calls == [["A"]]
+
+    @pytest.mark.asyncio
+    async def test_dfs_yields_subtrees_before_siblings(self):
+        client = FakeClient()
+        traversal = KnowledgeGraphTraversal(
+            client, ["A", "X"], max_depth=3, order="dfs"
+        )
+
+        nodes = [(n.id, n.depth) async for n in traversal]
+
+        assert nodes == [("A", 0), ("B", 1), ("D", 2), ("C", 1), ("P", 1)]
+        assert client.calls == [["A", "X"], ["B", "C", "P"], ["D"]]
+        assert traversal.missing == ["X"]
+
+    @pytest.mark.asyncio
+    async def test_dfs_prefetches_children(self):
+        client = FakeClient()
+        traversal = KnowledgeGraphTraversal(client, ["B"], max_depth=1, order="dfs")
+
+        iterator = aiter(traversal)
+        first = await anext(iterator)
+        await asyncio.sleep(0)
+
+        assert first.id == "B"
+        assert client.calls == [["B"], ["A", "D"]]
+        await iterator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_prefetches_next_frontier(self):
+        client = FakeClient()
+        traversal = KnowledgeGraphTraversal(client, ["A"], max_depth=1)
+
+        iterator = aiter(traversal)
+        first = await anext(iterator)
+        await asyncio.sleep(0)
+
+        assert first.id == "A"
+        assert client.calls == [["A"], ["B", "C", "P"]]
+        await iterator.aclose()
+
+    def test_invalid_order_raises(self):
+        with pytest.raises(ValueError, match="order"):
+            KnowledgeGraphTraversal(FakeClient(), ["A"], order="random")  # type: ignore
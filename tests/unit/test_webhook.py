@@ -0,0 +1,154 @@
+import asyncio
+
+import aiohttp
+import pytest
+from diffbot_kg.clients import DiffbotEnhanceClient
+from diffbot_kg.clients.session import DiffbotSession
+from diffbot_kg.models.response import DiffbotBulkJobStatusResponse
+from diffbot_kg.models.response.base import BaseDiffbotResponse
+from diffbot_kg.webhook import WebhookReceiver
+
+# trunk-ignore(bandit/B105)
+TOKEN = "valid_token"
+
+
+async def _notify(url, body):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=body) as resp:
+            return resp.status
+
+
+class TestWebhookReceiver:
+    @pytest.mark.asyncio
+    async def test_notification_wakes_waiter(self):
+        async with WebhookReceiver() as receiver:
+            receiver.expect("job-1")
+            waiter = asyncio.create_task(receiver.notified("job-1", timeout=5))
+            await asyncio.sleep(0)
+
+            status = await _notify(receiver.url, {"job_id": "job-1"})
+
+            assert status == 204
+            assert await waiter
+
+    @pytest.mark.asyncio
+    async def test_nested_id_and_early_notification(self):
+        async with WebhookReceiver() as receiver:
+            await _notify(receiver.url, {"content": {"bulkjobId": "job-2"}})
+
+            # The notification arrived before anyone waited for it.
+            assert await receiver.notified("job-2", timeout=0.1)
+            assert not await receiver.notified("job-2", timeout=0.01)
+
+    @pytest.mark.asyncio
+    async def test_unclaimed_early_notifications_expire(self, mocker):
+        clock = mocker.patch("diffbot_kg.webhook.time.monotonic", return_value=0)
+        async with WebhookReceiver(early_ttl=10) as receiver:
+            await _notify(receiver.url, {"job_id": "stale"})
+            await _notify(receiver.url, {"job_id": "claimed"})
+            receiver.expect("claimed")
+
+            clock.return_value = 11
+            await _notify(receiver.url, {"job_id": "fresh"})
+
+            assert set(receiver._events) == {"claimed", "fresh"}
+            assert await receiver.notified("claimed", timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_notification_without_id_wakes_everyone(self):
+        async with WebhookReceiver() as receiver:
+            receiver.expect("a")
+            receiver.expect("b")
+
+            await _notify(receiver.url, {"status": "COMPLETE"})
+
+            assert await receiver.notified("a", timeout=0.1)
+            assert await receiver.notified("b", timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_is_rejected(self):
+        async with WebhookReceiver() as receiver:
+            receiver.expect("job-1")
+            url = receiver.url.with_query(secret="guess")
+
+            assert await _notify(url, {"job_id": "job-1"}) == 403
+            assert not await receiver.notified("job-1", timeout=0.01)
+
+    def test_url_requires_start(self):
+        with pytest.raises(RuntimeError):
+            _ = WebhookReceiver().url
+
+        public = WebhookReceiver(public_url="https://hooks.example.com")
+        assert str(public.url).startswith("https://hooks.example.com/diffbot/bulkjob?")
+
+
+class TestEnhanceClientWebhook:
+    @pytest.mark.asyncio
+    async def test_create_registers_and_wait_uses_notifications(self, mocker):
+        states = iter(["RUNNING", "COMPLETE"])
+        status_calls = []
+
+        async def bulkjob_status(self, bulkjobId, raw=False):
+            status_calls.append(bulkjobId)
+            content = {"content": {"status": next(states)}}
+            return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+        mocker.patch.object(
+            DiffbotSession,
+            "post",
+            return_value=BaseDiffbotResponse(202, {}, {"job_id": "job-1"}),  # type: ignore
+        )
+        mocker.patch.object(DiffbotEnhanceClient, "bulkjob_status", bulkjob_status)
+
+        async with WebhookReceiver(fallback_interval=60) as receiver:
+            client = DiffbotEnhanceClient(token=TOKEN)
+            client.webhook = receiver
+
+            await client.create_bulkjob([{"name": "Diffbot"}])
+            params = DiffbotSession.post.call_args.kwargs["params"]
+            assert params["notifyWebhook"] == str(receiver.url)
+
+            waiter = asyncio.create_task(client.wait_for_bulkjob("job-1", interval=0))
+            await asyncio.sleep(0.05)
+            assert status_calls == ["job-1"]
+
+            await _notify(receiver.url, {"job_id": "job-1"})
+            status = await asyncio.wait_for(waiter, timeout=5)
+
+        assert status.complete
+        assert status_calls == ["job-1", "job-1"]
+
+    @pytest.mark.asyncio
+    async def test_wait_falls_back_to_polling(self, mocker):
+        states = iter(["RUNNING", "RUNNING", "COMPLETE"])
+
+        async def bulkjob_status(self, bulkjobId, raw=False):
+            content = {"content": {"status": next(states)}}
+            return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+        mocker.patch.object(DiffbotEnhanceClient, "bulkjob_status", bulkjob_status)
+
+        async with WebhookReceiver(fallback_interval=0.01) as receiver:
+            client = DiffbotEnhanceClient(token=TOKEN)
+            client.webhook = receiver
+
+            status = await asyncio.wait_for(client.wait_for_bulkjob("job-1"), 5)
+
+        assert status.complete
+
+    @pytest.mark.asyncio
+    async def test_wait_forgets_job_on_timeout(self, mocker):
+        async def bulkjob_status(self, bulkjobId, raw=False):
+            content = {"content": {"status": "RUNNING"}}
+            return DiffbotBulkJobStatusResponse(200, {}, content)  # type: ignore
+
+        mocker.patch.object(DiffbotEnhanceClient, "bulkjob_status", bulkjob_status)
+
+        async with WebhookReceiver(fallback_interval=60) as receiver:
+            client = DiffbotEnhanceClient(token=TOKEN)
+            client.webhook = receiver
+
+            with pytest.raises(TimeoutError):
+                await client.wait_for_bulkjob("job-1", timeout=0.05)
+
+            assert "job-1" not in receiver._events